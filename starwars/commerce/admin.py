@@ -61,3 +61,10 @@ class AddressAdmin(admin.ModelAdmin):
 @admin.register(models.Item)
 class ItemAdmin(admin.ModelAdmin):
     search_fields = ["name"]
+
+
+@admin.register(models.AccessToken)
+class AccessTokenAdmin(admin.ModelAdmin):
+    list_display = ["user", "created_at"]
+    search_fields = ["user__username"]
+    readonly_fields = ["key"]
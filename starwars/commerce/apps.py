@@ -1,5 +1,34 @@
 from django.apps import AppConfig
+from django.core import signals as core_signals
+from django.db.backends import signals
+from django.db.models import signals as model_signals
 
 
 class CommerceConfig(AppConfig):
     name = "commerce"
+
+    def ready(self):
+        from . import caching, db, models, profiling, slowlog
+
+        signals.connection_created.connect(
+            db.configure_connection, dispatch_uid="commerce.db"
+        )
+        signals.connection_created.connect(
+            slowlog.install, dispatch_uid="commerce.slowlog"
+        )
+        core_signals.request_finished.connect(
+            profiling.finish, dispatch_uid="commerce.profiling"
+        )
+
+        for signal in (model_signals.post_save, model_signals.post_delete):
+            signal.connect(
+                caching.order_changed,
+                sender=models.Order,
+                dispatch_uid="commerce.caching.order",
+            )
+        for sender in (models.Item, models.Address):
+            model_signals.post_save.connect(
+                caching.order_part_changed,
+                sender=sender,
+                dispatch_uid=f"commerce.caching.{sender.__name__}",
+            )
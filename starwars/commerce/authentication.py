@@ -0,0 +1,255 @@
+""" Authentication
+
+This module is responsible to authenticate the API requests.
+"""
+
+import collections
+import copy
+import datetime
+import hmac
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.utils import timezone
+
+from rest_framework import authentication
+from rest_framework import exceptions
+from rest_framework import permissions
+
+from . import services
+
+
+class TTLCache:
+    """ TTL Cache
+
+    A small thread-safe in-process cache whose entries expire after `ttl`
+    seconds. The oldest entries are dropped beyond `maxsize`.
+    """
+
+    def __init__(self, ttl: float, maxsize: int):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class AdvertiserAuthenticationMixin:
+    """ Advertiser Authentication Mixin
+
+    Resolves the advertiser of the authenticated user once per request and
+    attaches it to `request.advertiser`, so views hand it to the services
+    instead of looking it up again.
+    """
+
+    def authenticate(self, request):
+        """ Authenticate.
+
+        Args:
+            request: Request.
+
+        Returns:
+            A tuple (user, auth) or None if not authenticated.
+        """
+
+        user_auth = super().authenticate(request)
+        if user_auth is not None:
+            request.advertiser = services.get_advertiser_by_user(user_auth[0])
+        return user_auth
+
+
+class BasicAuthentication(
+    AdvertiserAuthenticationMixin, authentication.BasicAuthentication
+):
+    """ Basic Authentication """
+
+
+class CsrfExemptSessionAuthentication(
+    AdvertiserAuthenticationMixin, authentication.SessionAuthentication
+):
+    """ CSRF Exempt Session Authentication
+
+    Note:
+        The purpose of it is disable the CSRF token.
+    """
+
+    def enforce_csrf(self, request):
+        """ Enforce CSRF.
+
+        Args:
+            request: Request.
+        """
+        pass
+
+
+class TokenAuthentication(authentication.BaseAuthentication):
+    """ Token Authentication
+
+    Authenticates `Authorization: Bearer <token>` requests. The user and
+    advertiser of a token are kept in an in-process TTL cache, so repeated
+    calls cost no password hashing and no queries. A revoked token stops
+    working at once in the process that revoked it, and within
+    settings.ACCESS_TOKEN_CACHE_TTL seconds in the others. Tokens expire
+    settings.ACCESS_TOKEN_TTL seconds after they are issued.
+    """
+
+    keyword = "Bearer"
+
+    principals = TTLCache(
+        ttl=settings.ACCESS_TOKEN_CACHE_TTL,
+        maxsize=settings.ACCESS_TOKEN_CACHE_MAXSIZE,
+    )
+
+    def authenticate(self, request):
+        """ Authenticate.
+
+        Args:
+            request: Request.
+
+        Returns:
+            A tuple (user, token) or None if there is no bearer token.
+
+        Raises:
+            exceptions.AuthenticationFailed: if the token is not valid.
+        """
+
+        header = authentication.get_authorization_header(request).split()
+        if not header or header[0].lower() != self.keyword.lower().encode():
+            return None
+
+        if len(header) != 2:
+            raise exceptions.AuthenticationFailed("Invalid token header.")
+
+        try:
+            token = header[1].decode("ascii")
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed("Invalid token header.")
+
+        principal = self.principals.get(token)
+        if principal is None:
+            principal = self._load_principal(token)
+            self.principals.set(token, principal)
+
+        user, advertiser, expires_at = principal
+        if expires_at <= timezone.now():
+            self.principals.delete(token)
+            raise exceptions.AuthenticationFailed("Token expired.")
+
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed("User inactive or deleted.")
+
+        # Deep copies, so a request changes neither the instances nor their
+        # related objects cache (`_state.fields_cache`) that other requests
+        # share through the cache.
+        user = copy.deepcopy(user)
+        if advertiser is not None:
+            advertiser = copy.deepcopy(advertiser)
+            advertiser.user = user
+
+        request.advertiser = advertiser
+        return user, token
+
+    def authenticate_header(self, request):
+        return f'{self.keyword} realm="api"'
+
+    @classmethod
+    def revoke(cls, token: str) -> bool:
+        """ Revoke.
+
+        Args:
+            token: A bearer token.
+
+        Returns:
+            True if the token existed.
+        """
+
+        cls.principals.delete(token)
+        return services.revoke_access_token(token)
+
+    def _load_principal(self, token: str):
+        access_token = services.get_access_token(token)
+        if access_token is None:
+            raise exceptions.AuthenticationFailed("Invalid token.")
+
+        user = access_token.user
+        expires_at = access_token.created_at + datetime.timedelta(
+            seconds=settings.ACCESS_TOKEN_TTL
+        )
+        return user, services.get_advertiser_by_user(user), expires_at
+
+
+class MetricsScrapeAuthentication(authentication.BaseAuthentication):
+    """ Metrics Scrape Authentication
+
+    Authenticates `Authorization: Bearer <settings.METRICS_SCRAPE_TOKEN>`
+    requests, a static secret for the Prometheus scrape config that, unlike
+    access tokens, never expires. The request gets no user, so only views
+    allowing IsMetricsScraper accept it; other bearer tokens are left to
+    TokenAuthentication.
+    """
+
+    def authenticate(self, request):
+        """ Authenticate.
+
+        Args:
+            request: Request.
+
+        Returns:
+            A tuple (AnonymousUser, None) or None if the request does not
+            carry the scrape token.
+        """
+
+        scrape_token = settings.METRICS_SCRAPE_TOKEN
+        if not scrape_token:
+            return None
+
+        header = authentication.get_authorization_header(request).split()
+        if len(header) != 2 or header[0].lower() != b"bearer":
+            return None
+        if not hmac.compare_digest(header[1], scrape_token.encode()):
+            return None
+        return AnonymousUser(), None
+
+    def authenticate_header(self, request):
+        return 'Bearer realm="api"'
+
+
+class IsMetricsScraper(permissions.BasePermission):
+    """ Is Metrics Scraper
+
+    Allows requests authenticated by MetricsScrapeAuthentication.
+    """
+
+    def has_permission(self, request, view):
+        return isinstance(
+            request.successful_authenticator, MetricsScrapeAuthentication
+        )
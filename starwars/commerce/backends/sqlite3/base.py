@@ -0,0 +1,15 @@
+""" SQLite Backend
+
+This module is responsible to start every SQLite transaction with BEGIN
+IMMEDIATE. A deferred transaction reads from a snapshot, and once another
+connection commits it can no longer upgrade to writing: it fails at once
+with "database is locked" instead of waiting for the busy timeout. Taking
+the write lock up front makes read-then-write transactions queue instead.
+"""
+
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute("BEGIN IMMEDIATE")
@@ -0,0 +1,476 @@
+""" Bench
+
+This module is responsible to measure the API performance. Scenarios and
+the services suite run against whatever database is active, so run them
+through the `benchmark` and `benchmark_suite` management commands, which
+create a throwaway test database.
+"""
+
+import contextlib
+import random
+import statistics
+import time
+import types
+import typing
+import uuid
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.db import connection
+from django.db.models import Count
+from django.test import utils
+
+from rest_framework.test import APIClient
+
+from . import memory, models, seeding, serializers, services
+
+
+ORDER_DATA = {
+    "item": {"name": "engine", "description": "engine c3po"},
+    "shipping_address": {
+        "state": "SP",
+        "address": "Bench Address",
+        "neighborhood": "Bench Neighborhood",
+        "number": "111",
+        "complement": "Bench Complement",
+        "city": "Bench City",
+        "cep": "01000-000",
+    },
+}
+
+
+@contextlib.contextmanager
+def test_database():
+    """ Test Database.
+
+    Creates a test database for the duration of the block, like the test
+    runner does, and destroys it afterwards.
+    """
+
+    utils.setup_test_environment()
+    old_name = connection.creation.create_test_db(
+        verbosity=0, autoclobber=True
+    )
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        utils.teardown_test_environment()
+
+
+def logged_client() -> APIClient:
+    """ Logged Client.
+
+    Returns:
+        An APIClient logged in as a new advertiser.
+    """
+
+    password = "BenchPassword"
+    user = models.User.objects.create_user(
+        username=str(uuid.uuid4()), password=password
+    )
+    models.Advertiser.objects.create(user=user, phone="Bench Phone")
+
+    client = APIClient()
+    client.login(username=user.username, password=password)
+    return client
+
+
+def bench_bulk_create(size: int) -> dict:
+    """ Bench Bulk Create.
+
+    Compares `size` single POSTs to /order/ with one POST of `size` orders
+    to /order/bulk/.
+
+    Args:
+        size: Number of orders.
+
+    Returns:
+        A dict with the elapsed seconds of each approach and the speed-up.
+    """
+
+    client = logged_client()
+
+    started = time.perf_counter()
+    for _ in range(size):
+        client.post("/order/", ORDER_DATA, format="json")
+    single_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    client.post("/order/bulk/", [ORDER_DATA] * size, format="json")
+    bulk_seconds = time.perf_counter() - started
+
+    return {
+        "size": size,
+        "single_seconds": single_seconds,
+        "bulk_seconds": bulk_seconds,
+        "speedup": single_seconds / bulk_seconds,
+    }
+
+
+def bench_login(size: int) -> dict:
+    """ Bench Login.
+
+    POSTs `size` logins to /user-auth/, counting the password checks.
+
+    Args:
+        size: Number of logins.
+
+    Returns:
+        A dict with the logins per second and password checks per login.
+    """
+
+    password = "BenchPassword"
+    user = models.User.objects.create_user(
+        username=str(uuid.uuid4()), password=password
+    )
+    data = {"username": user.username, "password": password}
+    client = APIClient()
+
+    verify = hashers.PBKDF2PasswordHasher.verify
+    with mock.patch.object(
+        hashers.PBKDF2PasswordHasher,
+        "verify",
+        autospec=True,
+        side_effect=verify,
+    ) as patched_verify:
+        started = time.perf_counter()
+        for _ in range(size):
+            client.post("/user-auth/", data, format="json")
+        seconds = time.perf_counter() - started
+
+    return {
+        "size": size,
+        "seconds": seconds,
+        "logins_per_second": size / seconds,
+        "checks_per_login": patched_verify.call_count / size,
+    }
+
+
+SCENARIOS = {
+    "bulk_create": bench_bulk_create,
+    "login": bench_login,
+}
+
+
+# Services suite
+
+SEED_ADVERTISERS = 10
+
+SEED_BATCH_SIZE = 10000
+
+
+def seed_orders(size: int) -> types.SimpleNamespace:
+    """ Seed Orders.
+
+    Tops the database up to `size` orders, spread over SEED_ADVERTISERS
+    advertisers, so growing datasets reuse the rows already seeded.
+
+    Args:
+        size: Total number of orders wanted.
+
+    Returns:
+        A namespace with the advertiser owning most orders, used by the
+        suite, and the ids of its orders.
+    """
+
+    advertiser_ids = list(
+        models.Advertiser.objects.order_by("pk").values_list("pk", flat=True)
+    )
+    if not advertiser_ids:
+        advertiser_ids = seeding.seed_advertisers(
+            SEED_ADVERTISERS, "BenchPassword"
+        )
+
+    missing = size - models.Order.objects.count()
+    seeding.seed_orders(advertiser_ids, missing, batch_size=SEED_BATCH_SIZE)
+
+    advertiser = (
+        models.Advertiser.objects.select_related("user")
+        .annotate(orders=Count("order"))
+        .order_by("-orders", "pk")
+        .first()
+    )
+    return types.SimpleNamespace(
+        advertiser=advertiser,
+        order_ids=list(
+            models.Order.objects.filter(advertiser=advertiser).values_list(
+                "pk", flat=True
+            )
+        ),
+    )
+
+
+def _first_page(advertiser) -> list:
+    orders = services.list_orders(advertiser).order_by("created_at", "id")
+    return list(orders[: settings.ORDER_PAGE_SIZE])
+
+
+def setup_create_order(context):
+    return lambda: services.create_order(dict(ORDER_DATA), context.advertiser)
+
+
+def setup_get_order(context):
+    order_id = random.choice(context.order_ids)
+    return lambda: services.get_order(order_id, context.advertiser)
+
+
+def setup_list_orders(context):
+    return lambda: _first_page(context.advertiser)
+
+
+def setup_update_order(context):
+    order = services.get_order(
+        random.choice(context.order_ids), context.advertiser
+    )
+    validated_data = {
+        "status": models.Order.STATUS_FINISHED,
+        "item": {"name": "updated engine"},
+        "shipping_address": {"state": "RJ"},
+    }
+    return lambda: services.update_order(order, validated_data)
+
+
+def setup_delete_order(context):
+    order = services.create_order(dict(ORDER_DATA), context.advertiser)
+    return lambda: services.delete_order(order.pk, context.advertiser)
+
+
+def setup_create_advertiser(context):
+    validated_data = {
+        "user": {"username": str(uuid.uuid4()), "password": "BenchPassword"},
+        "phone": "Bench Phone",
+    }
+    return lambda: services.create_advertiser(validated_data)
+
+
+def setup_serialize_orders(context):
+    page = _first_page(context.advertiser)
+    return lambda: serializers.OrderSerializer(page, many=True).data
+
+
+def setup_validate_order(context):
+    return lambda: serializers.OrderCreateSerializer(data=ORDER_DATA).is_valid(
+        raise_exception=True
+    )
+
+
+SUITE = {
+    "create_order": setup_create_order,
+    "get_order": setup_get_order,
+    "list_orders": setup_list_orders,
+    "update_order": setup_update_order,
+    "delete_order": setup_delete_order,
+    "create_advertiser": setup_create_advertiser,
+    "serialize_orders": setup_serialize_orders,
+    "validate_order": setup_validate_order,
+}
+
+
+def run_suite(
+    datasets: typing.List[int], repeat: int, names: typing.List[str] = None
+) -> dict:
+    """ Run Suite.
+
+    Every benchmark is set up and timed `repeat` times; only the call
+    returned by its setup is timed.
+
+    Args:
+        datasets: Numbers of orders to seed, smallest first.
+        repeat: Runs per benchmark.
+        names: Benchmarks to run, all of SUITE by default.
+
+    Returns:
+        A dict {dataset: {benchmark: {"seconds", "min_seconds",
+        "queries"}}}, with the median and fastest run of each benchmark.
+        Dataset keys are strings, so the result round-trips through JSON.
+    """
+
+    results = {}
+    for size in sorted(datasets):
+        context = seed_orders(size)
+        results[str(size)] = {
+            name: _measure(SUITE[name], context, repeat)
+            for name in names or SUITE
+        }
+    return results
+
+
+def _measure(setup, context, repeat: int) -> dict:
+    timings = []
+    queries = 0
+    for _ in range(repeat):
+        run = setup(context)
+        with utils.CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - started)
+        queries = max(queries, len(captured))
+
+    return {
+        "seconds": statistics.median(timings),
+        "min_seconds": min(timings),
+        "queries": queries,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list:
+    """ Compare.
+
+    Args:
+        baseline: A run_suite result, usually loaded from a file.
+        current: A run_suite result.
+        threshold: Accepted slowdown, e.g. 0.2 for 20%.
+
+    Returns:
+        A list of messages, one per regression: a fastest run slower than
+        the threshold allows, or any extra query. Benchmarks missing from
+        the baseline are skipped.
+    """
+
+    regressions = []
+    for size, benchmarks in current.items():
+        for name, result in benchmarks.items():
+            before = baseline.get(size, {}).get(name)
+            if before is None:
+                continue
+
+            # The fastest run is the least disturbed by the machine.
+            seconds = result["min_seconds"]
+            before_seconds = before["min_seconds"]
+            if seconds > before_seconds * (1 + threshold):
+                regressions.append(
+                    f"{size} {name}: {seconds:.6f}s, was "
+                    f"{before_seconds:.6f}s"
+                )
+            if result["queries"] > before["queries"]:
+                regressions.append(
+                    f"{size} {name}: {result['queries']} queries, was "
+                    f"{before['queries']}"
+                )
+    return regressions
+
+
+# Memory suite
+
+
+def superuser_client(advertiser) -> APIClient:
+    """ Superuser Client.
+
+    Args:
+        advertiser: The advertiser to promote, with its user loaded.
+
+    Returns:
+        An APIClient logged in as the advertiser, made a superuser, so it
+        reads every order.
+    """
+
+    advertiser.user.is_superuser = True
+    advertiser.user.save(update_fields=["is_superuser"])
+    client = APIClient()
+    client.force_login(advertiser.user)
+    return client
+
+
+def _get_streamed(client, path) -> int:
+    response = client.get(path, HTTP_ACCEPT="application/x-ndjson")
+    # Chunk by chunk, as a client would read it, not holding the body.
+    return sum(len(chunk) for chunk in response.streaming_content)
+
+
+def memory_order_list(context):
+    return context.client.get("/order/")
+
+
+def memory_order_list_max_page(context):
+    return context.client.get(
+        f"/order/?page_size={settings.ORDER_MAX_PAGE_SIZE}"
+    )
+
+
+def memory_order_list_stream(context):
+    return _get_streamed(context.client, "/order/")
+
+
+def memory_order_detail(context):
+    return context.client.get(f"/order/{context.order_ids[0]}")
+
+
+def memory_list_all_orders(context):
+    # Every order visible to a superuser at once, as an unpaginated list
+    # would hold them.
+    return list(services.list_orders(context.advertiser))
+
+
+MEMORY_SUITE = {
+    "order_list": memory_order_list,
+    "order_list_max_page": memory_order_list_max_page,
+    "order_list_stream": memory_order_list_stream,
+    "order_detail": memory_order_detail,
+    "list_all_orders": memory_list_all_orders,
+}
+
+
+def run_memory_suite(
+    datasets: typing.List[int], top: int, names: typing.List[str] = None
+) -> dict:
+    """ Run Memory Suite.
+
+    Every benchmark runs once to warm up, then once traced by tracemalloc
+    as a superuser, who reads the orders of every advertiser. What it
+    returns is kept until the trace ends, so it counts as allocated.
+
+    Args:
+        datasets: Numbers of orders to seed, smallest first.
+        top: Number of allocation sites to report per benchmark.
+        names: Benchmarks to run, all of MEMORY_SUITE by default.
+
+    Returns:
+        A dict {dataset: {benchmark: {"peak_bytes", "allocated_bytes",
+        "live_at_end"}}}, see memory.Trace. Dataset keys are strings, so the
+        result round-trips through JSON.
+    """
+
+    results = {}
+    with utils.override_settings(ORDER_CACHE_ENABLED=False):
+        for size in sorted(datasets):
+            context = seed_orders(size)
+            context.client = superuser_client(context.advertiser)
+            results[str(size)] = {}
+            for name in names or MEMORY_SUITE:
+                MEMORY_SUITE[name](context)
+                with memory.trace(top) as trace:
+                    kept = MEMORY_SUITE[name](context)
+                del kept
+                results[str(size)][name] = trace.as_dict()
+    return results
+
+
+def compare_memory(baseline: dict, current: dict, threshold: float) -> list:
+    """ Compare Memory.
+
+    Args:
+        baseline: A run_memory_suite result, usually loaded from a file.
+        current: A run_memory_suite result.
+        threshold: Accepted growth of the peak, e.g. 0.2 for 20%.
+
+    Returns:
+        A list of messages, one per peak grown past the threshold.
+        Benchmarks missing from the baseline are skipped.
+    """
+
+    regressions = []
+    for size, benchmarks in current.items():
+        for name, result in benchmarks.items():
+            before = baseline.get(size, {}).get(name)
+            if before is None:
+                continue
+
+            peak = result["peak_bytes"]
+            before_peak = before["peak_bytes"]
+            if peak > before_peak * (1 + threshold):
+                regressions.append(
+                    f"{size} {name}: peak {peak} bytes, was {before_peak}"
+                )
+    return regressions
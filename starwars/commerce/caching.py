@@ -0,0 +1,207 @@
+""" Caching
+
+This module is responsible to cache serialized orders. Entries are keyed
+by per-advertiser generation counters, so writes invalidate them by
+bumping a counter instead of finding and deleting keys. Services bump them
+for bulk writes, model signals for every other save and delete, e.g. in
+the admin.
+"""
+
+import hashlib
+import threading
+import time
+import typing
+
+from django.conf import settings
+from django.core import cache
+from django.db import transaction
+
+from . import models
+
+
+NOT_FOUND = "__not_found__"
+
+KEY_PREFIX = "commerce:orders"
+
+# Superusers see every order, so their entries follow a global generation.
+SCOPE_ALL = "all"
+
+# Bumped when a write touches orders of unknown advertisers.
+SCOPE_EPOCH = "epoch"
+
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def get_cache():
+    return cache.caches[settings.ORDER_CACHE_ALIAS]
+
+
+def lookup(advertiser, *parts) -> typing.Tuple[str, typing.Any]:
+    """ Lookup.
+
+    Args:
+        advertiser: A models.Advertiser, the request.advertiser.
+        parts: Values identifying the entry, e.g. the order id.
+
+    Returns:
+        A tuple (key, entry). The key is None if caching is disabled, and
+        the entry is None on a miss or NOT_FOUND for a cached 404. Store
+        fresh entries under that same key: if a write bumps the generation
+        meanwhile, they land on a key nobody reads anymore.
+    """
+
+    if not settings.ORDER_CACHE_ENABLED or not advertiser:
+        return None, None
+
+    scope = SCOPE_ALL if advertiser.user.is_superuser else advertiser.pk
+    generations = _get_generations([SCOPE_EPOCH, scope])
+    digest = hashlib.md5(
+        "|".join(str(part) for part in parts).encode("utf-8")
+    ).hexdigest()
+    key = (
+        f"{KEY_PREFIX}:{generations[SCOPE_EPOCH]}:{scope}:"
+        f"{generations[scope]}:{digest}"
+    )
+
+    entry = get_cache().get(key)
+    _count("hits" if entry is not None else "misses")
+    return key, entry
+
+
+def store(key: str, entry):
+    """ Store.
+
+    Args:
+        key: Key from lookup.
+        entry: A picklable value.
+    """
+
+    if key is None:
+        return
+
+    get_cache().set(key, entry, settings.ORDER_CACHE_TIMEOUT)
+
+
+def store_not_found(key: str):
+    """ Store Not Found.
+
+    Args:
+        key: Key from lookup.
+    """
+
+    if key is None:
+        return
+
+    get_cache().set(key, NOT_FOUND, settings.ORDER_CACHE_NOT_FOUND_TIMEOUT)
+
+
+def invalidate(advertiser_id: int = None):
+    """ Invalidate.
+
+    Bumps now and again once the transaction commits, so a read racing
+    the write cannot keep stale data cached.
+
+    Args:
+        advertiser_id: Owner of the changed orders, or None if unknown.
+    """
+
+    if not settings.ORDER_CACHE_ENABLED:
+        return
+
+    if advertiser_id is None:
+        scopes = [SCOPE_EPOCH]
+    else:
+        scopes = [advertiser_id, SCOPE_ALL]
+
+    _bump(scopes)
+    transaction.on_commit(lambda: _bump(scopes))
+
+
+def order_changed(sender, instance, **kwargs):
+    """ Order Changed.
+
+    Receiver of post_save and post_delete for models.Order.
+
+    Args:
+        sender: models.Order.
+        instance: The saved or deleted order.
+    """
+
+    invalidate(instance.advertiser_id)
+
+
+def order_part_changed(sender, instance, created: bool = False, **kwargs):
+    """ Order Part Changed.
+
+    Receiver of post_save for models.Item and models.Address, which are
+    serialized within their orders. Deleting them deletes the orders,
+    which send their own signals.
+
+    Args:
+        sender: models.Item or models.Address.
+        instance: The saved item or address.
+        created: Whether it is new, and so in no order yet.
+    """
+
+    if not settings.ORDER_CACHE_ENABLED or created:
+        return
+
+    if sender is models.Item:
+        orders = models.Order.objects.filter(item_id=instance.pk)
+    else:
+        orders = models.Order.objects.filter(shipping_address_id=instance.pk)
+    for advertiser_id in set(orders.values_list("advertiser_id", flat=True)):
+        invalidate(advertiser_id)
+
+
+def stats() -> typing.Dict[str, int]:
+    """ Stats.
+
+    Returns:
+        Hits and misses counted by this process.
+    """
+
+    with _lock:
+        return dict(_stats)
+
+
+def reset_stats():
+    with _lock:
+        for name in _stats:
+            _stats[name] = 0
+
+
+def _count(name: str):
+    with _lock:
+        _stats[name] += 1
+
+
+def _generation_key(scope) -> str:
+    return f"{KEY_PREFIX}:generation:{scope}"
+
+
+def _get_generations(scopes: list) -> typing.Dict[typing.Any, int]:
+    backend = get_cache()
+    keys = {_generation_key(scope): scope for scope in scopes}
+    found = backend.get_many(list(keys))
+
+    generations = {}
+    for key, scope in keys.items():
+        if key not in found:
+            # Never restart from 0 after an eviction, old entries would
+            # come back to life.
+            backend.add(key, time.time_ns(), None)
+            found[key] = backend.get(key)
+        generations[scope] = found[key]
+    return generations
+
+
+def _bump(scopes: list):
+    backend = get_cache()
+    for scope in scopes:
+        key = _generation_key(scope)
+        try:
+            backend.incr(key)
+        except ValueError:
+            backend.add(key, time.time_ns(), None)
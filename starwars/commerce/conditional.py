@@ -0,0 +1,73 @@
+""" Conditional
+
+This module is responsible to answer conditional GETs (ETag and
+Last-Modified) before the payload is loaded and serialized.
+"""
+
+import datetime
+import hashlib
+
+from django.utils import cache
+from django.utils import http
+
+
+class Validators:
+    """ Validators
+
+    The ETag and Last-Modified of a resource version.
+    """
+
+    def __init__(self, *version, last_modified: datetime.datetime = None):
+        """ Validators.
+
+        Args:
+            version: Values identifying the resource version.
+            last_modified: When the resource last changed, if known.
+        """
+
+        digest = hashlib.md5(
+            "|".join(str(value) for value in version).encode("utf-8")
+        ).hexdigest()
+        self.etag = http.quote_etag(digest)
+        self.last_modified = last_modified
+
+    @property
+    def timestamp(self) -> int:
+        if self.last_modified is None:
+            return None
+        return int(self.last_modified.timestamp())
+
+    def not_modified(self, request):
+        """ Not Modified.
+
+        Args:
+            request: Request with If-None-Match/If-Modified-Since headers.
+
+        Returns:
+            A 304 response if the client copy is fresh, None otherwise.
+        """
+
+        not_modified = cache.get_conditional_response(
+            request, etag=self.etag, last_modified=self.timestamp
+        )
+        if not_modified is None:
+            return None
+
+        return self.apply(not_modified)
+
+    def apply(self, response):
+        """ Apply.
+
+        Args:
+            response: Response.
+
+        Returns:
+            The response with the ETag and Last-Modified headers. Clients
+            must revalidate before reusing it.
+        """
+
+        response["ETag"] = self.etag
+        if self.last_modified is not None:
+            response["Last-Modified"] = http.http_date(self.timestamp)
+        cache.patch_cache_control(response, private=True, no_cache=True)
+        return response
@@ -0,0 +1,103 @@
+""" DB
+
+This module is responsible to tune the database connections. SQLite
+defaults favour safety over concurrency: readers block writers and a busy
+database fails at once, so every new connection gets its pragmas here.
+"""
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+
+
+JOURNAL_MODES = ("delete", "truncate", "persist", "memory", "wal", "off")
+
+SYNCHRONOUS_MODES = ("off", "normal", "full", "extra")
+
+
+def sqlite_pragmas() -> list:
+    """ SQLite Pragmas.
+
+    Returns:
+        The PRAGMA statements built from settings.SQLITE_*.
+
+    Raises:
+        ImproperlyConfigured: if a journal or synchronous mode is unknown.
+    """
+
+    journal_mode = settings.SQLITE_JOURNAL_MODE.lower()
+    if journal_mode not in JOURNAL_MODES:
+        raise ImproperlyConfigured(
+            f"SQLITE_JOURNAL_MODE must be one of: {', '.join(JOURNAL_MODES)}"
+        )
+
+    synchronous = settings.SQLITE_SYNCHRONOUS.lower()
+    if synchronous not in SYNCHRONOUS_MODES:
+        raise ImproperlyConfigured(
+            "SQLITE_SYNCHRONOUS must be one of: "
+            f"{', '.join(SYNCHRONOUS_MODES)}"
+        )
+
+    return [
+        f"PRAGMA journal_mode = {journal_mode}",
+        f"PRAGMA synchronous = {synchronous}",
+        f"PRAGMA mmap_size = {int(settings.SQLITE_MMAP_SIZE)}",
+        f"PRAGMA cache_size = {int(settings.SQLITE_CACHE_SIZE)}",
+    ]
+
+
+def configure_connection(sender, connection, **kwargs):
+    """ Configure Connection.
+
+    Receiver of the connection_created signal.
+
+    Args:
+        sender: Database wrapper class.
+        connection: The new database wrapper.
+    """
+
+    if connection.vendor != "sqlite":
+        return
+
+    with connection.cursor() as cursor:
+        for pragma in sqlite_pragmas():
+            cursor.execute(pragma)
+
+
+def reserve_ids(model, count: int) -> int:
+    """ Reserve IDs.
+
+    Advances the AUTOINCREMENT sequence of the model table past `count`
+    keys, so they are never handed out again, not even once their rows
+    are deleted. Must run inside a transaction, which holds the write lock
+    from its start, see commerce/backends/sqlite3/base.py.
+
+    Args:
+        model: Model class, with an AutoField primary key.
+        count: Number of keys to reserve.
+
+    Returns:
+        The first reserved key, the others follow it.
+    """
+
+    opts = model._meta
+    table = opts.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "UPDATE sqlite_sequence SET seq = seq + %s WHERE name = %s",
+            [count, table],
+        )
+        if not cursor.rowcount:
+            # The sequence row is only created by the first insert.
+            pk_column = connection.ops.quote_name(opts.pk.column)
+            cursor.execute(
+                "INSERT INTO sqlite_sequence (name, seq) "
+                f"SELECT %s, COALESCE(MAX({pk_column}), 0) + %s "
+                f"FROM {connection.ops.quote_name(table)}",
+                [table, count],
+            )
+        cursor.execute(
+            "SELECT seq FROM sqlite_sequence WHERE name = %s", [table]
+        )
+        last_id = cursor.fetchone()[0]
+    return last_id - count + 1
@@ -0,0 +1,213 @@
+""" Group Commit
+
+This module is responsible to share one transaction among concurrent
+writes. The first caller becomes the leader: it waits a short window for
+followers, runs every queued write in its own savepoint and commits them
+all at once, so a busy process pays one commit (one fsync) per batch
+instead of one per write.
+"""
+
+import threading
+import typing
+
+from django.db import transaction
+
+
+class _Entry:
+    __slots__ = (
+        "func",
+        "args",
+        "kwargs",
+        "result",
+        "error",
+        "leader",
+        "started",
+        "abandoned",
+        "done",
+    )
+
+    def __init__(self, func, args, kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.result = None
+        self.error = None
+        self.leader = False
+        self.started = False
+        self.abandoned = False
+        self.done = threading.Event()
+
+
+class GroupCommitter:
+    """ Group Committer
+
+    Leader/follower queue of writes. Callers block until the transaction
+    holding their write commits, and each one gets back its own result or
+    exception: a failing write rolls back to its savepoint without
+    affecting the others. A follower gives up after `timeout` seconds.
+    """
+
+    def __init__(
+        self,
+        window: float,
+        max_batch: int,
+        using: str = None,
+        timeout: float = 30,
+    ):
+        """ Group Committer.
+
+        Args:
+            window: Seconds the leader waits for followers.
+            max_batch: Writes per transaction. A full batch commits at once.
+            using: Database alias.
+            timeout: Seconds a follower waits for its write to commit.
+        """
+
+        self.window = window
+        self.max_batch = max_batch
+        self.using = using
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._full = threading.Event()
+        self._pending = []
+        self._leading = False
+
+    def submit(self, func: typing.Callable, *args, **kwargs):
+        """ Submit.
+
+        Must not be called inside a transaction: the write would run on
+        the leader's connection, outside of it.
+
+        Args:
+            func: Callable doing the write.
+            args: Positional arguments for func.
+            kwargs: Keyword arguments for func.
+
+        Returns:
+            What func returned, once committed.
+
+        Raises:
+            The exception raised by func, or by the commit.
+            TimeoutError: if the write did not commit within the timeout.
+                It is dropped if it had not started, otherwise it may still
+                commit.
+        """
+
+        entry = _Entry(func, args, kwargs)
+        with self._lock:
+            self._pending.append(entry)
+            if not self._leading:
+                self._leading = True
+                entry.leader = True
+            elif len(self._pending) >= self.max_batch:
+                self._full.set()
+
+        if not entry.leader and not entry.done.wait(self.timeout):
+            self._abandon(entry)
+
+        # Woken up either with the result or to lead the next batch, which
+        # then starts with this entry.
+        if entry.leader:
+            self._lead()
+
+        if entry.error is not None:
+            raise entry.error
+        return entry.result
+
+    def _abandon(self, entry: _Entry):
+        with self._lock:
+            if entry.done.is_set():
+                # Woken up while the timeout expired.
+                return
+
+            entry.abandoned = True
+            if entry in self._pending:
+                self._pending.remove(entry)
+            started = entry.started
+
+        if started:
+            raise TimeoutError(
+                "Group commit timed out, the write may still commit."
+            )
+        raise TimeoutError("Group commit timed out, the write was dropped.")
+
+    def _lead(self):
+        batch = []
+        try:
+            self._full.wait(self.window)
+
+            with self._lock:
+                batch = self._pending[: self.max_batch]
+                del self._pending[: self.max_batch]
+                if len(self._pending) < self.max_batch:
+                    self._full.clear()
+
+            self._commit(batch)
+        except BaseException as error:
+            for entry in batch:
+                entry.result = None
+                entry.error = entry.error or error
+            raise
+        finally:
+            # Even if this leader failed: its followers must not wait for
+            # it, and the queue needs a new leader.
+            for entry in batch:
+                entry.leader = False
+                entry.done.set()
+
+            with self._lock:
+                if self._pending:
+                    successor = self._pending[0]
+                    successor.leader = True
+                    successor.done.set()
+                else:
+                    self._leading = False
+
+    def _commit(self, batch: typing.List[_Entry]):
+        try:
+            with transaction.atomic(using=self.using):
+                for entry in batch:
+                    with self._lock:
+                        if entry.abandoned:
+                            continue
+                        entry.started = True
+
+                    try:
+                        with transaction.atomic(using=self.using):
+                            entry.result = entry.func(
+                                *entry.args, **entry.kwargs
+                            )
+                    except Exception as error:
+                        entry.error = error
+        except Exception as error:
+            for entry in batch:
+                entry.result = None
+                entry.error = entry.error or error
+
+
+_committers = {}
+_committers_lock = threading.Lock()
+
+
+def get_committer(
+    window: float, max_batch: int, using: str = None, timeout: float = 30
+) -> GroupCommitter:
+    """ Get Committer.
+
+    Args:
+        window: Seconds the leader waits for followers.
+        max_batch: Writes per transaction.
+        using: Database alias.
+        timeout: Seconds a follower waits for its write to commit.
+
+    Returns:
+        The GroupCommitter of this process for these parameters.
+    """
+
+    key = (window, max_batch, using, timeout)
+    with _committers_lock:
+        if key not in _committers:
+            _committers[key] = GroupCommitter(
+                window, max_batch, using, timeout
+            )
+        return _committers[key]
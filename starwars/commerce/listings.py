@@ -0,0 +1,184 @@
+""" Listings
+
+This module is responsible to keep models.OrderListing in step with the
+orders. Every write to orders writes its listing in the same transaction,
+whether or not settings.ORDER_LISTING_ENABLED, so the order list can read
+one narrow table instead of joining items and addresses. The check command
+compares the listings with the orders, the rebuild command copies them
+again.
+"""
+
+import typing
+
+from django.db import connection
+from django.db import transaction
+from django.db.models import QuerySet
+
+from . import models
+
+
+# Listing fields, and the order fields they are copied from.
+FIELDS = (
+    ("order_id", "pk"),
+    ("advertiser_id", "advertiser_id"),
+    ("status", "status"),
+    ("item_name", "item__name"),
+    ("city", "shipping_address__city"),
+    ("state", "shipping_address__state"),
+    ("cep", "shipping_address__cep"),
+    ("created_at", "created_at"),
+    ("last_change", "last_change"),
+)
+
+
+def build(order: models.Order) -> models.OrderListing:
+    """ Build.
+
+    Args:
+        order: A saved models.Order with item and shipping_address loaded.
+
+    Returns:
+        Its unsaved models.OrderListing.
+    """
+
+    return models.OrderListing(
+        order_id=order.pk,
+        advertiser_id=order.advertiser_id,
+        status=order.status,
+        item_name=order.item.name,
+        city=order.shipping_address.city,
+        state=order.shipping_address.state,
+        cep=order.shipping_address.cep,
+        created_at=order.created_at,
+        last_change=order.last_change,
+    )
+
+
+def add(orders: typing.Iterable[models.Order]):
+    """ Add.
+
+    Args:
+        orders: New models.Order with item and shipping_address loaded.
+    """
+
+    models.OrderListing.objects.bulk_create([build(order) for order in orders])
+
+
+def save(order: models.Order):
+    """ Save.
+
+    Updates the listing of a changed order, or creates it if the order was
+    written outside of the services.
+
+    Args:
+        order: A saved models.Order with item and shipping_address loaded.
+    """
+
+    build(order).save()
+
+
+def update(orders: QuerySet, **values):
+    """ Update.
+
+    Must run before the orders themselves are updated, while `orders`
+    still matches them.
+
+    Args:
+        orders: A models.Order queryset.
+        **values: Listing fields to set, as given to QuerySet.update.
+    """
+
+    models.OrderListing.objects.filter(
+        order__in=orders.order_by().values("pk")
+    ).update(**values)
+
+
+def copy(orders: QuerySet) -> int:
+    """ Copy.
+
+    Writes the listings of the orders with a single INSERT ... SELECT, so
+    the rows never leave the database. The orders must not have listings.
+
+    Args:
+        orders: A models.Order queryset.
+
+    Returns:
+        The number of listings written.
+    """
+
+    select = orders.order_by().values_list(*[field for _, field in FIELDS])
+    sql, params = select.query.get_compiler(using=select.db).as_sql()
+
+    opts = models.OrderListing._meta
+    columns = ", ".join(
+        connection.ops.quote_name(opts.get_field(field).column)
+        for field, _ in FIELDS
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {connection.ops.quote_name(opts.db_table)} "
+            f"({columns}) {sql}",
+            params,
+        )
+        return cursor.rowcount
+
+
+def check(chunk_size: int = 2000) -> typing.Dict[str, typing.List[int]]:
+    """ Check.
+
+    Walks the orders and the listings side by side, in primary key order,
+    so memory stays flat however many there are.
+
+    Args:
+        chunk_size: Rows fetched at a time from each table.
+
+    Returns:
+        The order IDs with a "missing" listing, a "stale" listing, whose
+        fields differ from the order, and "orphaned" listings without
+        their order.
+    """
+
+    expected = _rows(models.Order.objects, [f for _, f in FIELDS], chunk_size)
+    actual = _rows(
+        models.OrderListing.objects, [f for f, _ in FIELDS], chunk_size
+    )
+    problems = {"missing": [], "stale": [], "orphaned": []}
+
+    order = next(expected, None)
+    listing = next(actual, None)
+    while order is not None or listing is not None:
+        if listing is None or (order is not None and order[0] < listing[0]):
+            problems["missing"].append(order[0])
+            order = next(expected, None)
+        elif order is None or listing[0] < order[0]:
+            problems["orphaned"].append(listing[0])
+            listing = next(actual, None)
+        else:
+            if order != listing:
+                problems["stale"].append(order[0])
+            order = next(expected, None)
+            listing = next(actual, None)
+
+    return problems
+
+
+def _rows(objects, fields: typing.List[str], chunk_size: int):
+    return (
+        objects.order_by("pk")
+        .values_list(*fields)
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def rebuild() -> int:
+    """ Rebuild.
+
+    Copies every listing again from the orders, in one transaction.
+
+    Returns:
+        The number of listings.
+    """
+
+    with transaction.atomic():
+        models.OrderListing.objects.all().delete()
+        return copy(models.Order.objects.all())
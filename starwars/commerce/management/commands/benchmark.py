@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from commerce import bench
+
+
+class Command(BaseCommand):
+    help = "Run performance scenarios against a throwaway test database."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "scenarios",
+            nargs="*",
+            help=(
+                "Scenarios to run, out of: "
+                f"{', '.join(sorted(bench.SCENARIOS))}. "
+                "Runs all of them by default."
+            ),
+        )
+        parser.add_argument(
+            "--size",
+            type=int,
+            default=1000,
+            help="Number of rows handled by each scenario.",
+        )
+
+    def handle(self, *args, **options):
+        scenarios = options["scenarios"] or sorted(bench.SCENARIOS)
+        unknown = set(scenarios) - set(bench.SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(unknown)}")
+
+        with bench.test_database():
+            for name in scenarios:
+                result = bench.SCENARIOS[name](options["size"])
+                self.stdout.write(self._format(name, result))
+
+    def _format(self, name: str, result: dict) -> str:
+        values = ", ".join(
+            f"{key}={value:.4f}"
+            if isinstance(value, float)
+            else f"{key}={value}"
+            for key, value in result.items()
+        )
+        return f"{name}: {values}"
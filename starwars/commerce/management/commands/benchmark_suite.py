@@ -0,0 +1,85 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from commerce import bench
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the services and serializers at growing dataset sizes, save "
+        "a JSON baseline or compare against one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "benchmarks",
+            nargs="*",
+            help=(
+                "Benchmarks to run, out of: "
+                f"{', '.join(sorted(bench.SUITE))}. "
+                "Runs all of them by default."
+            ),
+        )
+        parser.add_argument(
+            "--datasets",
+            nargs="+",
+            type=int,
+            default=[1000],
+            help="Numbers of orders to seed, e.g. 1000 100000 1000000.",
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=20, help="Runs per benchmark."
+        )
+        parser.add_argument("--save", help="Write the results to this file.")
+        parser.add_argument(
+            "--compare", help="Compare the results with this baseline file."
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.2,
+            help="Accepted slowdown when comparing, 0.2 is 20%%.",
+        )
+
+    def handle(self, *args, **options):
+        names = options["benchmarks"] or list(bench.SUITE)
+        unknown = set(names) - set(bench.SUITE)
+        if unknown:
+            raise CommandError(f"Unknown benchmarks: {', '.join(unknown)}")
+
+        baseline = None
+        if options["compare"]:
+            baseline = self._load(options["compare"])
+
+        with bench.test_database():
+            results = bench.run_suite(
+                options["datasets"], options["repeat"], names
+            )
+
+        for size, benchmarks in results.items():
+            for name, result in benchmarks.items():
+                self.stdout.write(
+                    f"{size} {name}: seconds={result['seconds']:.6f}, "
+                    f"min_seconds={result['min_seconds']:.6f}, "
+                    f"queries={result['queries']}"
+                )
+
+        if options["save"]:
+            with open(options["save"], "w") as file:
+                json.dump(results, file, indent=2, sort_keys=True)
+
+        if baseline is not None:
+            regressions = bench.compare(
+                baseline, results, options["threshold"]
+            )
+            if regressions:
+                raise CommandError("Regressions:\n" + "\n".join(regressions))
+            self.stdout.write("No regressions.")
+
+    def _load(self, path: str) -> dict:
+        try:
+            with open(path) as file:
+                return json.load(file)
+        except (OSError, ValueError) as error:
+            raise CommandError(f"Cannot read {path}: {error}")
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from commerce import listings
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the order listings with the orders, failing if any is "
+        "missing, stale or orphaned."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=10,
+            help="Order IDs to show per kind of problem.",
+        )
+
+    def handle(self, *args, **options):
+        problems = listings.check()
+        if not any(problems.values()):
+            self.stdout.write("Order listings are consistent.")
+            return
+
+        for kind, order_ids in problems.items():
+            if order_ids:
+                shown = ", ".join(map(str, order_ids[: options["limit"]]))
+                self.stdout.write(f"{len(order_ids)} {kind}: {shown}")
+        raise CommandError(
+            "Order listings are inconsistent, run rebuild_order_listings."
+        )
@@ -0,0 +1,93 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from commerce import bench
+
+
+class Command(BaseCommand):
+    help = (
+        "Trace the memory of the order read paths with tracemalloc at "
+        "growing dataset sizes, save a JSON baseline or compare against one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "benchmarks",
+            nargs="*",
+            help=(
+                "Benchmarks to run, out of: "
+                f"{', '.join(sorted(bench.MEMORY_SUITE))}. "
+                "Runs all of them by default."
+            ),
+        )
+        parser.add_argument(
+            "--datasets",
+            nargs="+",
+            type=int,
+            default=[1000],
+            help="Numbers of orders to seed, e.g. 1000 100000.",
+        )
+        parser.add_argument(
+            "--top",
+            type=int,
+            default=10,
+            help="Allocation sites live at the end to report per benchmark.",
+        )
+        parser.add_argument("--save", help="Write the results to this file.")
+        parser.add_argument(
+            "--compare", help="Compare the results with this baseline file."
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.2,
+            help="Accepted growth of the peak when comparing, 0.2 is 20%%.",
+        )
+
+    def handle(self, *args, **options):
+        names = options["benchmarks"] or list(bench.MEMORY_SUITE)
+        unknown = set(names) - set(bench.MEMORY_SUITE)
+        if unknown:
+            raise CommandError(f"Unknown benchmarks: {', '.join(unknown)}")
+
+        baseline = None
+        if options["compare"]:
+            baseline = self._load(options["compare"])
+
+        with bench.test_database():
+            results = bench.run_memory_suite(
+                options["datasets"], options["top"], names
+            )
+
+        for size, benchmarks in results.items():
+            for name, result in benchmarks.items():
+                self.stdout.write(
+                    f"{size} {name}: peak={result['peak_bytes'] / 1024:.1f}"
+                    f" KiB, allocated={result['allocated_bytes'] / 1024:.1f}"
+                    " KiB"
+                )
+                for site in result["live_at_end"]:
+                    self.stdout.write(
+                        f"    {site['size_bytes'] / 1024:>10.1f} KiB "
+                        f"{site['count']:>7} {site['site']}"
+                    )
+
+        if options["save"]:
+            with open(options["save"], "w") as file:
+                json.dump(results, file, indent=2, sort_keys=True)
+
+        if baseline is not None:
+            regressions = bench.compare_memory(
+                baseline, results, options["threshold"]
+            )
+            if regressions:
+                raise CommandError("Regressions:\n" + "\n".join(regressions))
+            self.stdout.write("No regressions.")
+
+    def _load(self, path: str) -> dict:
+        try:
+            with open(path) as file:
+                return json.load(file)
+        except (OSError, ValueError) as error:
+            raise CommandError(f"Cannot read {path}: {error}")
@@ -0,0 +1,69 @@
+import collections
+import json
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from commerce import serializers, services
+
+
+class Command(BaseCommand):
+    help = (
+        "Create advertisers in bulk from a JSON list shaped like the "
+        "POST /advertiser/ body."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path", help="JSON file to read, or - to read from stdin."
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Processes hashing the passwords.",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=500, help="Rows per INSERT.",
+        )
+
+    def handle(self, *args, **options):
+        data = self._load(options["path"])
+
+        serializer = serializers.AdvertiserSerializer(data=data, many=True)
+        if not serializer.is_valid():
+            errors = {
+                index: error
+                for index, error in enumerate(serializer.errors)
+                if error
+            }
+            raise CommandError(f"Invalid advertisers: {errors}")
+
+        usernames = collections.Counter(
+            item["user"]["username"] for item in serializer.validated_data
+        )
+        repeated = [name for name, count in usernames.items() if count > 1]
+        if repeated:
+            raise CommandError(f"Repeated usernames: {', '.join(repeated)}")
+
+        advertisers = services.bulk_create_advertisers(
+            serializer.validated_data,
+            workers=options["workers"],
+            batch_size=options["batch_size"],
+        )
+        self.stdout.write(f"Created {len(advertisers)} advertisers.")
+
+    def _load(self, path: str) -> list:
+        try:
+            if path == "-":
+                data = json.load(sys.stdin)
+            else:
+                with open(path) as file:
+                    data = json.load(file)
+        except (OSError, ValueError) as error:
+            raise CommandError(f"Cannot read {path}: {error}")
+
+        if not isinstance(data, list):
+            raise CommandError("Expected a JSON list of advertisers.")
+        return data
@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from commerce import services
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired sessions in batches. Schedule it, e.g. hourly, "
+        "when sessions are stored in the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.SESSION_PRUNE_BATCH_SIZE,
+            help="Sessions deleted per batch.",
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive.")
+
+        deleted = services.prune_sessions(options["batch_size"])
+        self.stdout.write(f"Deleted {deleted} expired sessions.")
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from commerce import listings
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the order listings again from the orders, e.g. after orders "
+        "were written outside of the services."
+    )
+
+    def handle(self, *args, **options):
+        copied = listings.rebuild()
+        self.stdout.write(f"Rebuilt {copied} order listings.")
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from commerce import rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount the order rollups from the orders, e.g. to backfill them "
+        "or after writing orders outside of the services."
+    )
+
+    def handle(self, *args, **options):
+        buckets = rollups.rebuild()
+        self.stdout.write(f"Rebuilt {buckets} order rollups.")
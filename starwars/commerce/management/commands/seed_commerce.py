@@ -0,0 +1,77 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from commerce import seeding
+
+
+class Command(BaseCommand):
+    help = "Fill the database with fake advertisers and orders."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--advertisers",
+            type=int,
+            default=100,
+            help="Number of advertisers to create.",
+        )
+        parser.add_argument(
+            "--orders",
+            type=int,
+            default=100000,
+            help="Number of orders to create.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=10000,
+            help="Orders per transaction.",
+        )
+        parser.add_argument(
+            "--days", type=int, default=365, help="Age of the oldest order."
+        )
+        parser.add_argument(
+            "--password",
+            default="SeedPassword",
+            help="Password shared by every advertiser.",
+        )
+        parser.add_argument(
+            "--seed", type=int, help="Random seed, for reproducible data."
+        )
+        parser.add_argument(
+            "--restore-indexes",
+            action="store_true",
+            help="Only create the indexes a killed run left dropped.",
+        )
+
+    def handle(self, *args, **options):
+        if options["restore_indexes"]:
+            created = seeding.restore_indexes()
+            self.stdout.write(f"Restored {len(created)} indexes.")
+            return
+
+        if options["advertisers"] < 1:
+            raise CommandError("--advertisers must be positive.")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive.")
+
+        rng = random.Random(options["seed"])
+        started = time.perf_counter()
+
+        advertiser_ids = seeding.seed_advertisers(
+            options["advertisers"], options["password"], rng
+        )
+        orders = seeding.seed_orders(
+            advertiser_ids,
+            options["orders"],
+            batch_size=options["batch_size"],
+            days=options["days"],
+            rng=rng,
+        )
+
+        seconds = time.perf_counter() - started
+        self.stdout.write(
+            f"Seeded {len(advertiser_ids)} advertisers and {orders} orders "
+            f"in {seconds:.1f}s ({orders / seconds:.0f} orders/s)."
+        )
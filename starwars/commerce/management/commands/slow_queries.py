@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from commerce import slowlog
+
+
+class Command(BaseCommand):
+    help = "Rank the logged slow queries by their total time."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--file",
+            default=settings.SLOW_QUERY_LOG_FILE,
+            help="The slow query log. Its rotated files are read too.",
+        )
+        parser.add_argument(
+            "--limit", type=int, default=10, help="Queries to show."
+        )
+        parser.add_argument(
+            "--plans", action="store_true", help="Show the query plans."
+        )
+
+    def handle(self, *args, **options):
+        if options["limit"] < 1:
+            raise CommandError("--limit must be positive.")
+
+        rows = slowlog.summarize(slowlog.read_entries(options["file"]))
+        if not rows:
+            self.stdout.write("No slow queries logged.")
+            return
+
+        self.stdout.write(
+            f"{'total ms':>12} {'count':>7} {'mean ms':>10} {'max ms':>10}"
+        )
+        for row in rows[: options["limit"]]:
+            self.stdout.write(
+                f"{row['total_ms']:>12.1f} {row['count']:>7} "
+                f"{row['mean_ms']:>10.1f} {row['max_ms']:>10.1f}"
+            )
+            self.stdout.write(f"    {row['sql']}")
+            if row["callers"]:
+                self.stdout.write(f"    from {', '.join(row['callers'])}")
+            if options["plans"] and row["plan"]:
+                for line in row["plan"]:
+                    self.stdout.write(f"      {line}")
+        self.stdout.write(f"{len(rows)} distinct slow queries.")
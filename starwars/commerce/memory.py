@@ -0,0 +1,133 @@
+""" Memory
+
+This module is responsible to measure the memory allocated by a block of
+code with tracemalloc: the peak over what was allocated before it, and the
+lines holding the most memory still live when the block ends. Those are
+not the lines behind the peak: memory freed within the block shows in the
+peak only. The memory_profile command measures the
+order read endpoints with it, and MemoryTraceMiddleware live requests.
+"""
+
+import contextlib
+import gc
+import os
+import threading
+import tracemalloc
+import typing
+
+from django.conf import settings
+
+
+# Allocations of tracemalloc itself and of imports are noise.
+_IGNORED = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+)
+
+# The peak is global to the process, so one trace runs at a time.
+_lock = threading.Lock()
+
+
+class Trace:
+    """ Trace
+
+    Memory allocated within a `trace` block, filled once it exits.
+    """
+
+    def __init__(self):
+        self.peak_bytes = None
+        self.allocated_bytes = None
+        self.live_at_end = []
+
+    def as_dict(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "peak_bytes": self.peak_bytes,
+            "allocated_bytes": self.allocated_bytes,
+            "live_at_end": self.live_at_end,
+        }
+
+
+@contextlib.contextmanager
+def trace(top: int, blocking: bool = True):
+    """ Trace.
+
+    Starts tracemalloc for the block unless it is already tracing, and
+    clears its traces first: that zeroes the current and peak sizes, so
+    they measure the block alone (tracemalloc.reset_peak needs Python
+    3.9). Other threads allocating meanwhile are counted too, memory freed
+    in the block but allocated before it is not.
+
+    Args:
+        top: Number of allocation sites live at the end of the block to
+            report.
+        blocking: Whether to wait for a trace running in another thread,
+            or to yield None instead.
+
+    Returns:
+        A context manager yielding the Trace of its block.
+    """
+
+    if not _lock.acquire(blocking=blocking):
+        yield None
+        return
+
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start(settings.MEMORY_TRACE_FRAMES)
+    try:
+        result = Trace()
+        # Cycles left by earlier code would otherwise be freed, or not,
+        # in the middle of the block.
+        gc.collect()
+        tracemalloc.clear_traces()
+        try:
+            yield result
+        finally:
+            peak = tracemalloc.get_traced_memory()[1]
+            # Before collecting, so the sites include the cycles the block
+            # left behind.
+            snapshot = tracemalloc.take_snapshot().filter_traces(_IGNORED)
+            gc.collect()
+            current = tracemalloc.get_traced_memory()[0]
+            result.peak_bytes = peak
+            result.allocated_bytes = current
+            result.live_at_end = top_sites(snapshot.statistics("lineno"), top)
+    finally:
+        if started:
+            tracemalloc.stop()
+        _lock.release()
+
+
+def top_sites(statistics: list, top: int) -> typing.List[dict]:
+    """ Top Sites.
+
+    Args:
+        statistics: tracemalloc.Statistic list, by line, largest first.
+        top: How many sites to keep.
+
+    Returns:
+        The lines holding the most memory, as dicts with "site",
+        "size_bytes" and "count".
+    """
+
+    sites = []
+    for statistic in statistics[:top]:
+        frame = statistic.traceback[0]
+        sites.append(
+            {
+                "site": f"{_short_path(frame.filename)}:{frame.lineno}",
+                "size_bytes": statistic.size,
+                "count": statistic.count,
+            }
+        )
+    return sites
+
+
+def _short_path(filename: str) -> str:
+    marker = f"site-packages{os.sep}"
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    if filename.startswith(settings.BASE_DIR + os.sep):
+        return os.path.relpath(filename, settings.BASE_DIR)
+    return filename
@@ -0,0 +1,387 @@
+""" Metrics
+
+This module is responsible to publish request metrics in the Prometheus
+text format. Every worker process keeps its own counters in memory and
+writes them to a file of its own in settings.METRICS_DIR; the endpoint
+adds up the files of all workers, so any of them can answer a scrape.
+The files of dead workers are merged into one, so restarts do not pile
+them up.
+"""
+
+import contextlib
+import fcntl
+import json
+import math
+import os
+import threading
+import time
+import typing
+
+from django.conf import settings
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+
+METRICS = {
+    "commerce_http_requests_total": ("counter", "Requests handled."),
+    "commerce_http_request_duration_seconds": (
+        "histogram",
+        "Time to handle a request.",
+    ),
+    "commerce_http_request_queries": (
+        "histogram",
+        "Database queries run by a request.",
+    ),
+    "commerce_http_requests_in_flight": ("gauge", "Requests being handled.",),
+}
+
+# Counters and histograms of the dead processes, see compact.
+ARCHIVE = "dead.json"
+
+LOCK = "compact.lock"
+
+
+class Registry:
+    """ Registry
+
+    Metrics of this process, flushed to `<pid>-<start>.json` at most once
+    per settings.METRICS_FLUSH_INTERVAL seconds.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path = os.path.join(
+            directory, f"{os.getpid()}-{time.time_ns()}.json"
+        )
+        self.counters = {}
+        self.histograms = {}
+        self.gauges = {}
+        self._lock = threading.Lock()
+        self._flushed_at = 0.0
+        self._timer = None
+
+    def inc(self, name: str, labels: dict, value: float = 1):
+        key = (name, _freeze(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def add(self, name: str, labels: dict, value: float):
+        """ Add, to a gauge. """
+
+        key = (name, _freeze(labels))
+        with self._lock:
+            self.gauges[key] = self.gauges.get(key, 0) + value
+
+    def observe(self, name: str, labels: dict, value: float, buckets):
+        key = (name, _freeze(labels))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = {
+                    "buckets": list(buckets),
+                    "counts": [0] * len(buckets),
+                    "sum": 0,
+                    "count": 0,
+                }
+            for index, bound in enumerate(histogram["buckets"]):
+                if value <= bound:
+                    histogram["counts"][index] += 1
+                    break
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    def flush(self, force: bool = False):
+        """ Flush.
+
+        Writes now if forced or the interval elapsed, otherwise makes sure
+        a write is scheduled, so an idle worker is never stale for longer
+        than the interval.
+        """
+
+        interval = settings.METRICS_FLUSH_INTERVAL
+        with self._lock:
+            wait = self._flushed_at + interval - time.monotonic()
+            if not force and wait > 0:
+                if self._timer is None:
+                    self._timer = threading.Timer(wait, self.flush, [True])
+                    self._timer.daemon = True
+                    self._timer.start()
+                return
+
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._flushed_at = time.monotonic()
+            data = self._dump()
+
+        os.makedirs(self.directory, exist_ok=True)
+        _write(self.path, data)
+
+    def _dump(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "counters": _unfreeze(self.counters),
+            "histograms": _unfreeze(self.histograms),
+            "gauges": _unfreeze(self.gauges),
+        }
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def get_registry() -> Registry:
+    """ Get Registry.
+
+    Returns:
+        The Registry of this process for settings.METRICS_DIR.
+    """
+
+    key = (os.getpid(), settings.METRICS_DIR)
+    with _registries_lock:
+        if key not in _registries:
+            _registries[key] = Registry(settings.METRICS_DIR)
+        return _registries[key]
+
+
+def compact(directory: str) -> int:
+    """ Compact.
+
+    Adds the counters and histograms of dead processes to ARCHIVE and
+    removes their files; their gauges are dropped. Holds LOCK exclusively,
+    so two scrapes never merge the same file twice, and collect never
+    reads the archive and the files halfway.
+
+    Args:
+        directory: Where the processes write their files.
+
+    Returns:
+        The number of files removed.
+    """
+
+    with _locked(directory, fcntl.LOCK_EX) as locked:
+        if not locked:
+            return 0
+
+        archive_path = os.path.join(directory, ARCHIVE)
+        archive = _load(archive_path) or {}
+        counters = {}
+        histograms = {}
+        _add(counters, histograms, archive)
+
+        # Files merged by a run that stopped before removing them; the
+        # names of removed files are forgotten.
+        merged = {
+            name
+            for name in archive.get("merged", ())
+            if os.path.exists(os.path.join(directory, name))
+        }
+        dead = []
+        for name, data in _read_files(directory):
+            if name == ARCHIVE or name in merged or _is_alive(data["pid"]):
+                continue
+            _add(counters, histograms, data)
+            dead.append(name)
+
+        if dead:
+            merged.update(dead)
+            _write(
+                archive_path,
+                {
+                    "pid": None,
+                    "counters": _unfreeze(counters),
+                    "histograms": _unfreeze(histograms),
+                    "gauges": [],
+                    "merged": sorted(merged),
+                },
+            )
+        return _remove(directory, merged)
+
+
+def collect(directory: str) -> str:
+    """ Collect.
+
+    Counters and histograms of every process, dead ones included, are
+    added up; gauges only count processes still alive.
+
+    Args:
+        directory: Where the processes write their files.
+
+    Returns:
+        The metrics in the Prometheus text format.
+    """
+
+    # Shared with other scrapes, but not with compact: a file read before
+    # it was merged would be counted again in the rewritten archive.
+    with _locked(directory, fcntl.LOCK_SH):
+        files = dict(_read_files(directory))
+    # Already in the archive, compact did not get to remove them.
+    merged = files.get(ARCHIVE, {}).get("merged", ())
+
+    counters = {}
+    histograms = {}
+    gauges = {}
+    for name, data in files.items():
+        if name in merged:
+            continue
+
+        _add(counters, histograms, data)
+        if _is_alive(data["pid"]):
+            for name, labels, value in data["gauges"]:
+                key = (name, _freeze(labels))
+                gauges[key] = gauges.get(key, 0) + value
+
+    lines = []
+    for name, (kind, description) in METRICS.items():
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {kind}")
+        if kind == "histogram":
+            for (metric, labels), histogram in sorted(histograms.items()):
+                if metric == name:
+                    lines.extend(_histogram_lines(name, labels, histogram))
+        else:
+            values = counters if kind == "counter" else gauges
+            for (metric, labels), value in sorted(values.items()):
+                if metric == name:
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+@contextlib.contextmanager
+def _locked(directory: str, operation: int):
+    try:
+        lock = open(os.path.join(directory, LOCK), "a")
+    except FileNotFoundError:
+        yield False
+        return
+
+    with lock:
+        # Released when the file is closed.
+        fcntl.flock(lock, operation)
+        yield True
+
+
+def _histogram_lines(name: str, labels: tuple, histogram: dict) -> list:
+    lines = []
+    cumulative = 0
+    for bound, count in zip(histogram["buckets"], histogram["counts"]):
+        cumulative += count
+        bucket_labels = labels + (("le", _format_bound(bound)),)
+        lines.append(
+            f"{name}_bucket{_format_labels(bucket_labels)} {cumulative}"
+        )
+    lines.append(
+        f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} "
+        f"{histogram['count']}"
+    )
+    lines.append(f"{name}_sum{_format_labels(labels)} {histogram['sum']}")
+    lines.append(f"{name}_count{_format_labels(labels)} {histogram['count']}")
+    return lines
+
+
+def _add(counters: dict, histograms: dict, data: dict):
+    for name, labels, value in data.get("counters", ()):
+        key = (name, _freeze(labels))
+        counters[key] = counters.get(key, 0) + value
+
+    for name, labels, histogram in data.get("histograms", ()):
+        key = (name, _freeze(labels))
+        total = histograms.setdefault(
+            key,
+            {
+                "buckets": histogram["buckets"],
+                "counts": [0] * len(histogram["buckets"]),
+                "sum": 0,
+                "count": 0,
+            },
+        )
+        for index, count in enumerate(histogram["counts"]):
+            total["counts"][index] += count
+        total["sum"] += histogram["sum"]
+        total["count"] += histogram["count"]
+
+
+def _unfreeze(values: dict) -> list:
+    return [
+        [name, dict(labels), value] for (name, labels), value in values.items()
+    ]
+
+
+def _read_files(directory: str) -> typing.Iterator[typing.Tuple[str, dict]]:
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return
+
+    for name in names:
+        if not name.endswith(".json"):
+            continue
+        data = _load(os.path.join(directory, name))
+        if data is not None:
+            yield name, data
+
+
+def _load(path: str) -> dict:
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        # Removed or being replaced meanwhile.
+        return None
+
+
+def _write(path: str, data: dict):
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as file:
+        json.dump(data, file)
+    os.replace(temporary, path)
+
+
+def _remove(directory: str, names: typing.Iterable[str]) -> int:
+    removed = 0
+    for name in names:
+        try:
+            os.remove(os.path.join(directory, name))
+        except FileNotFoundError:
+            continue
+        removed += 1
+    return removed
+
+
+def _is_alive(pid: int) -> bool:
+    if pid is None:
+        # The archive of the dead processes.
+        return False
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _freeze(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _format_bound(bound: float) -> str:
+    if math.isinf(bound):
+        return "+Inf"
+    return repr(float(bound))
+
+
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels)
+    return "{" + pairs + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
@@ -0,0 +1,185 @@
+""" Middleware
+
+This module is responsible to instrument every request.
+"""
+
+import contextlib
+import json
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.db import connections
+
+from . import memory, metrics, timing
+
+
+logger = logging.getLogger("commerce.timing")
+
+memory_logger = logging.getLogger("commerce.memory")
+
+
+class ServerTimingMiddleware:
+    """ Server Timing Middleware
+
+    Reports where the time of each request went in a `Server-Timing`
+    header: auth, db (with the query count), serialize, render and total.
+    A sample of the requests, settings.SERVER_TIMING_LOG_SAMPLE_RATE, is
+    also logged as JSON to the "commerce.timing" logger.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.SERVER_TIMING_ENABLED:
+            return self.get_response(request)
+
+        timings = timing.start()
+        try:
+            with contextlib.ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(timings.execute_wrapper)
+                    )
+                response = self.get_response(request)
+        finally:
+            timing.stop(timings)
+
+        response["Server-Timing"] = timings.header()
+
+        if random.random() < settings.SERVER_TIMING_LOG_SAMPLE_RATE:
+            logger.info(
+                json.dumps(
+                    {
+                        "method": request.method,
+                        "path": request.path,
+                        "status": response.status_code,
+                        **timings.as_dict(),
+                    }
+                )
+            )
+
+        return response
+
+
+class MetricsMiddleware:
+    """ Metrics Middleware
+
+    Counts requests, their latency and queries, and the requests in
+    flight, labelled by view class and HTTP method. See metrics.
+    """
+
+    METHODS = ("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS")
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+
+        registry = metrics.get_registry()
+        method = request.method if request.method in self.METHODS else "other"
+        # The view is only known once resolved, see process_view.
+        request.metrics_labels = {"view": "unmatched", "method": method}
+        request.metrics_in_flight = False
+        counter = _QueryCounter()
+
+        started = time.perf_counter()
+        try:
+            with contextlib.ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(counter))
+                response = self.get_response(request)
+        finally:
+            if request.metrics_in_flight:
+                registry.add(
+                    "commerce_http_requests_in_flight",
+                    request.metrics_labels,
+                    -1,
+                )
+
+        labels = request.metrics_labels
+        registry.observe(
+            "commerce_http_request_duration_seconds",
+            labels,
+            time.perf_counter() - started,
+            metrics.DURATION_BUCKETS,
+        )
+        registry.observe(
+            "commerce_http_request_queries",
+            labels,
+            counter.count,
+            metrics.QUERY_BUCKETS,
+        )
+        registry.inc(
+            "commerce_http_requests_total",
+            {**labels, "status": str(response.status_code)},
+        )
+        registry.flush()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not hasattr(request, "metrics_labels"):
+            return None
+
+        view_class = getattr(view_func, "view_class", None)
+        request.metrics_labels["view"] = (
+            view_class.__name__ if view_class else view_func.__name__
+        )
+        metrics.get_registry().add(
+            "commerce_http_requests_in_flight", request.metrics_labels, 1
+        )
+        request.metrics_in_flight = True
+        return None
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MemoryTraceMiddleware:
+    """ Memory Trace Middleware
+
+    Traces the memory of a sample of the requests,
+    settings.MEMORY_TRACE_SAMPLE_RATE, with tracemalloc, and logs their
+    peak and top allocation sites as JSON to the "commerce.memory" logger.
+    One request is traced at a time; streamed bodies are not covered.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not (
+            settings.MEMORY_TRACE_ENABLED
+            and random.random() < settings.MEMORY_TRACE_SAMPLE_RATE
+        ):
+            return self.get_response(request)
+
+        with memory.trace(settings.MEMORY_TRACE_TOP, blocking=False) as trace:
+            response = self.get_response(request)
+        if trace is None:
+            return response
+
+        match = request.resolver_match
+        view_class = getattr(match.func, "view_class", None) if match else None
+        memory_logger.info(
+            json.dumps(
+                {
+                    "method": request.method,
+                    "path": request.path,
+                    "view": view_class.__name__ if view_class else None,
+                    "status": response.status_code,
+                    **trace.as_dict(),
+                }
+            )
+        )
+        return response
@@ -0,0 +1,39 @@
+# Generated by Django 3.0.8 on 2026-10-18 16:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("commerce", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["advertiser", "status", "created_at"],
+                name="order_adv_status_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["advertiser", "created_at", "id"],
+                name="order_adv_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["created_at", "id"], name="order_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["last_change"], name="order_last_change_idx"
+            ),
+        ),
+    ]
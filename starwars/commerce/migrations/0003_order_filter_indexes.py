@@ -0,0 +1,28 @@
+# Generated by Django 3.0.8 on 2026-10-18 16:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("commerce", "0002_order_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="address",
+            index=models.Index(fields=["state"], name="address_state_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="address",
+            index=models.Index(fields=["cep"], name="address_cep_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["advertiser", "last_change"],
+                name="order_adv_last_change_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 3.0.8 on 2026-10-18 16:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("commerce", "0004_accesstoken"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OrderRollup",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                (
+                    "state",
+                    models.CharField(
+                        blank=True,
+                        choices=[
+                            ("AC", "AC"),
+                            ("AL", "AL"),
+                            ("AP", "AP"),
+                            ("AM", "AM"),
+                            ("BA", "BA"),
+                            ("CE", "CE"),
+                            ("DF", "DF"),
+                            ("ES", "ES"),
+                            ("GO", "GO"),
+                            ("MA", "MA"),
+                            ("MT", "MT"),
+                            ("MS", "MS"),
+                            ("MG", "MG"),
+                            ("PA", "PA"),
+                            ("PB", "PB"),
+                            ("PR", "PR"),
+                            ("PE", "PE"),
+                            ("PI", "PI"),
+                            ("RJ", "RJ"),
+                            ("RN", "RN"),
+                            ("RS", "RS"),
+                            ("RO", "RO"),
+                            ("RR", "RR"),
+                            ("SC", "SC"),
+                            ("SP", "SP"),
+                            ("SE", "SE"),
+                            ("TO", "TO"),
+                        ],
+                        default="",
+                        max_length=2,
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[("open", "Open"), ("finished", "Finished")],
+                        max_length=20,
+                    ),
+                ),
+                ("total", models.IntegerField(default=0)),
+                (
+                    "advertiser",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="commerce.Advertiser",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="orderrollup",
+            index=models.Index(fields=["day"], name="order_rollup_day_idx"),
+        ),
+        migrations.AddConstraint(
+            model_name="orderrollup",
+            constraint=models.UniqueConstraint(
+                fields=("advertiser", "day", "state", "status"),
+                name="order_rollup_bucket_uniq",
+            ),
+        ),
+    ]
@@ -0,0 +1,132 @@
+# Generated by Django 3.0.8 on 2026-10-18 16:55
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("commerce", "0005_orderrollup"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OrderListing",
+            fields=[
+                (
+                    "order",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="listing",
+                        serialize=False,
+                        to="commerce.Order",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[("open", "Open"), ("finished", "Finished")],
+                        max_length=20,
+                    ),
+                ),
+                ("item_name", models.CharField(max_length=50)),
+                (
+                    "city",
+                    models.CharField(blank=True, max_length=50, null=True),
+                ),
+                (
+                    "state",
+                    models.CharField(
+                        blank=True,
+                        choices=[
+                            ("AC", "AC"),
+                            ("AL", "AL"),
+                            ("AP", "AP"),
+                            ("AM", "AM"),
+                            ("BA", "BA"),
+                            ("CE", "CE"),
+                            ("DF", "DF"),
+                            ("ES", "ES"),
+                            ("GO", "GO"),
+                            ("MA", "MA"),
+                            ("MT", "MT"),
+                            ("MS", "MS"),
+                            ("MG", "MG"),
+                            ("PA", "PA"),
+                            ("PB", "PB"),
+                            ("PR", "PR"),
+                            ("PE", "PE"),
+                            ("PI", "PI"),
+                            ("RJ", "RJ"),
+                            ("RN", "RN"),
+                            ("RS", "RS"),
+                            ("RO", "RO"),
+                            ("RR", "RR"),
+                            ("SC", "SC"),
+                            ("SP", "SP"),
+                            ("SE", "SE"),
+                            ("TO", "TO"),
+                        ],
+                        max_length=2,
+                        null=True,
+                    ),
+                ),
+                (
+                    "cep",
+                    models.CharField(blank=True, max_length=12, null=True),
+                ),
+                ("created_at", models.DateTimeField()),
+                ("last_change", models.DateTimeField()),
+                (
+                    "advertiser",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="commerce.Advertiser",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="orderlisting",
+            index=models.Index(
+                fields=["advertiser", "status", "created_at"],
+                name="listing_adv_status_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="orderlisting",
+            index=models.Index(
+                fields=["advertiser", "created_at", "order"],
+                name="listing_adv_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="orderlisting",
+            index=models.Index(
+                fields=["created_at", "order"], name="listing_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="orderlisting",
+            index=models.Index(
+                fields=["last_change"], name="listing_last_change_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="orderlisting",
+            index=models.Index(
+                fields=["advertiser", "last_change"],
+                name="listing_adv_last_change_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="orderlisting",
+            index=models.Index(fields=["state"], name="listing_state_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="orderlisting",
+            index=models.Index(fields=["cep"], name="listing_cep_idx"),
+        ),
+    ]
@@ -0,0 +1,56 @@
+import collections
+
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def backfill(apps, schema_editor):
+    """ Counts the orders written before the rollups existed.
+
+    A frozen copy of rollups.count, bucketing by advertiser, the day in the
+    current time zone, the shipping state ("" without one) and status.
+    """
+
+    Order = apps.get_model("commerce", "Order")
+    OrderRollup = apps.get_model("commerce", "OrderRollup")
+    db_alias = schema_editor.connection.alias
+
+    rows = (
+        Order.objects.using(db_alias)
+        .annotate(rollup_day=TruncDate("created_at"))
+        .values_list(
+            "advertiser_id", "rollup_day", "shipping_address__state", "status"
+        )
+        .annotate(orders=Count("id"))
+        .order_by()
+    )
+    counts = collections.Counter()
+    for advertiser_id, day, state, status, orders in rows:
+        counts[(advertiser_id, day, state or "", status)] += orders
+
+    OrderRollup.objects.using(db_alias).all().delete()
+    OrderRollup.objects.using(db_alias).bulk_create(
+        [
+            OrderRollup(
+                advertiser_id=advertiser_id,
+                day=day,
+                state=state,
+                status=status,
+                total=total,
+            )
+            for (advertiser_id, day, state, status), total in counts.items()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("commerce", "0006_orderlisting"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+from django.db import migrations
+
+
+# Listing columns, and the order fields they are copied from, as of this
+# migration.
+COLUMNS = (
+    ("order_id", "pk"),
+    ("advertiser_id", "advertiser_id"),
+    ("status", "status"),
+    ("item_name", "item__name"),
+    ("city", "shipping_address__city"),
+    ("state", "shipping_address__state"),
+    ("cep", "shipping_address__cep"),
+    ("created_at", "created_at"),
+    ("last_change", "last_change"),
+)
+
+
+def backfill(apps, schema_editor):
+    """ Copies the listings of the orders written before they existed,
+    with a single INSERT ... SELECT.
+    """
+
+    Order = apps.get_model("commerce", "Order")
+    OrderListing = apps.get_model("commerce", "OrderListing")
+    connection = schema_editor.connection
+    quote = connection.ops.quote_name
+
+    OrderListing.objects.using(connection.alias).all().delete()
+
+    select = (
+        Order.objects.using(connection.alias)
+        .order_by()
+        .values_list(*[field for _, field in COLUMNS])
+    )
+    sql, params = select.query.get_compiler(using=connection.alias).as_sql()
+    columns = ", ".join(quote(column) for column, _ in COLUMNS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {quote(OrderListing._meta.db_table)} "
+            f"({columns}) {sql}",
+            params,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("commerce", "0007_backfill_order_rollups"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -51,6 +51,12 @@ class Address(models.Model):
     city = models.CharField(max_length=50, null=True, blank=True)
     cep = models.CharField(max_length=12, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["state"], name="address_state_idx"),
+            models.Index(fields=["cep"], name="address_cep_idx"),
+        ]
+
     def __str__(self):
         return f"{self.city}/{self.state} - CEP: {self.cep}"
 
@@ -63,6 +69,15 @@ class Advertiser(BaseModel):
         return f"{self.user} - {self.phone}"
 
 
+class AccessToken(BaseModel):
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    # SHA-256 of the token, the token itself is only shown once.
+    key = models.CharField(max_length=64, unique=True)
+
+    def __str__(self):
+        return f"{self.user} - {self.created_at}"
+
+
 class Item(BaseModel):
     name = models.CharField(max_length=50, null=False, blank=False)
     description = models.TextField(null=False, blank=False)
@@ -97,5 +112,129 @@ class Order(BaseModel):
         default=STATUS_OPEN,
     )
 
+    class Meta:
+        indexes = [
+            # Advertiser orders, optionally by status, sorted by recency.
+            models.Index(
+                fields=["advertiser", "status", "created_at"],
+                name="order_adv_status_created_idx",
+            ),
+            # Advertiser orders paginated on (created_at, id).
+            models.Index(
+                fields=["advertiser", "created_at", "id"],
+                name="order_adv_created_idx",
+            ),
+            # All orders paginated on (created_at, id), for superusers.
+            models.Index(
+                fields=["created_at", "id"], name="order_created_idx"
+            ),
+            # Orders changed since the last sync.
+            models.Index(fields=["last_change"], name="order_last_change_idx"),
+            models.Index(
+                fields=["advertiser", "last_change"],
+                name="order_adv_last_change_idx",
+            ),
+        ]
+
     def __str__(self):
         return f"{self.item} - {self.status}"
+
+
+class OrderRollup(models.Model):
+    """ Order Rollup
+
+    Orders counted by advertiser, day of creation, shipping state and
+    status, kept up to date by services, see rollups. An order without a
+    state counts under "".
+    """
+
+    advertiser = models.ForeignKey(
+        Advertiser, on_delete=models.CASCADE, null=False, blank=False
+    )
+    day = models.DateField(null=False, blank=False)
+    state = models.CharField(
+        max_length=2,
+        choices=Address.STATE_CHOICES,
+        null=False,
+        blank=True,
+        default="",
+    )
+    status = models.CharField(
+        max_length=20, choices=Order.STATUS_CHOICES, null=False, blank=False,
+    )
+    total = models.IntegerField(null=False, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["advertiser", "day", "state", "status"],
+                name="order_rollup_bucket_uniq",
+            ),
+        ]
+        indexes = [
+            # Every advertiser's buckets over a range of days.
+            models.Index(fields=["day"], name="order_rollup_day_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.state} {self.status}: {self.total}"
+
+
+class OrderListing(models.Model):
+    """ Order Listing
+
+    An order flattened with the columns its list shows, so listing orders
+    reads one narrow table instead of joining item and shipping_address.
+    Kept up to date by services, see listings. Read by the order list
+    with settings.ORDER_LISTING_ENABLED.
+    """
+
+    order = models.OneToOneField(
+        Order,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="listing",
+    )
+    advertiser = models.ForeignKey(
+        Advertiser, on_delete=models.CASCADE, null=False, blank=False
+    )
+    status = models.CharField(
+        max_length=20, choices=Order.STATUS_CHOICES, null=False, blank=False,
+    )
+    item_name = models.CharField(max_length=50, null=False, blank=False)
+    city = models.CharField(max_length=50, null=True, blank=True)
+    state = models.CharField(
+        max_length=2, choices=Address.STATE_CHOICES, null=True, blank=True
+    )
+    cep = models.CharField(max_length=12, null=True, blank=True)
+    # Copied from the order, not set on save.
+    created_at = models.DateTimeField(null=False)
+    last_change = models.DateTimeField(null=False)
+
+    class Meta:
+        # The same lookups as the Order and Address indexes serve.
+        indexes = [
+            models.Index(
+                fields=["advertiser", "status", "created_at"],
+                name="listing_adv_status_idx",
+            ),
+            models.Index(
+                fields=["advertiser", "created_at", "order"],
+                name="listing_adv_created_idx",
+            ),
+            models.Index(
+                fields=["created_at", "order"], name="listing_created_idx"
+            ),
+            models.Index(
+                fields=["last_change"], name="listing_last_change_idx"
+            ),
+            models.Index(
+                fields=["advertiser", "last_change"],
+                name="listing_adv_last_change_idx",
+            ),
+            models.Index(fields=["state"], name="listing_state_idx"),
+            models.Index(fields=["cep"], name="listing_cep_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.item_name} - {self.status}"
@@ -0,0 +1,223 @@
+""" Pagination
+
+This module is responsible to paginate the API lists.
+"""
+
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import dateparse
+
+from rest_framework import exceptions
+from rest_framework import pagination
+from rest_framework import response
+from rest_framework.utils import urls
+
+
+class OrderCursorPagination(pagination.BasePagination):
+    """ Order Cursor Pagination
+
+    Keyset pagination ordered on (ordering, id), (created_at, id) by
+    default. The cursor holds the position of the last row seen, so every
+    page is a single index range scan no matter how deep it is.
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    invalid_cursor_message = "Invalid cursor"
+
+    def __init__(self, ordering: str = "created_at"):
+        """ Order Cursor Pagination.
+
+        Args:
+            ordering: A datetime field, prefixed by "-" for descending.
+        """
+
+        self.ordering = ordering
+        self.field = ordering.lstrip("-")
+        self.descending = ordering.startswith("-")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """ Paginate Queryset.
+
+        Args:
+            queryset: A models.Order or models.OrderListing queryset.
+            request: Request.
+            view: View.
+
+        Returns:
+            A list with the orders of the requested page.
+        """
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+
+        cursor = self.decode_cursor(request)
+        if cursor is None:
+            position, pk, reverse = None, None, False
+        else:
+            position, pk, reverse = cursor
+
+        # Walking backwards is walking the opposite ordering forwards.
+        descending = self.descending != reverse
+        queryset = self.order_queryset(queryset, reverse)
+
+        if position is not None:
+            queryset = self._filter_after(queryset, position, pk, descending)
+
+        # Fetch one more row to know if there is a following page.
+        results = list(queryset[: self.page_size + 1])
+        has_following = len(results) > self.page_size
+        results = results[: self.page_size]
+
+        if reverse:
+            results.reverse()
+            self.has_next = position is not None
+            self.has_previous = has_following
+        else:
+            self.has_next = has_following
+            self.has_previous = position is not None
+
+        self.page = results
+        return results
+
+    def order_queryset(self, queryset, reverse: bool = False):
+        """ Order Queryset.
+
+        Args:
+            queryset: A models.Order or models.OrderListing queryset.
+            reverse: True to walk the ordering backwards.
+
+        Returns:
+            The queryset ordered on (ordering, pk).
+        """
+
+        if self.descending != reverse:
+            return queryset.order_by(f"-{self.field}", "-pk")
+        return queryset.order_by(self.field, "pk")
+
+    def get_paginated_response(self, data):
+        """ Get Paginated Response.
+
+        Args:
+            data: Serialized page.
+
+        Returns:
+            A response.Response with next/previous cursors and results.
+        """
+
+        return response.Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_page_size(self, request) -> int:
+        """ Get Page Size.
+
+        Args:
+            request: Request.
+
+        Returns:
+            The requested page size, capped by settings.ORDER_MAX_PAGE_SIZE.
+        """
+
+        page_size = settings.ORDER_PAGE_SIZE
+        requested = request.query_params.get(self.page_size_query_param)
+        if requested:
+            try:
+                page_size = int(requested)
+            except ValueError:
+                page_size = settings.ORDER_PAGE_SIZE
+
+        if page_size < 1:
+            page_size = settings.ORDER_PAGE_SIZE
+
+        return min(page_size, settings.ORDER_MAX_PAGE_SIZE)
+
+    def get_next_link(self) -> str:
+        if not self.has_next:
+            return None
+
+        last = self.page[-1]
+        return self._link(getattr(last, self.field), last.pk, False)
+
+    def get_previous_link(self) -> str:
+        if not self.has_previous:
+            return None
+
+        first = self.page[0]
+        return self._link(getattr(first, self.field), first.pk, True)
+
+    def decode_cursor(self, request):
+        """ Decode Cursor.
+
+        Args:
+            request: Request.
+
+        Returns:
+            A tuple (position, id, reverse) or None if there is no cursor.
+
+        Raises:
+            exceptions.NotFound: if the cursor is not valid.
+        """
+
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            raw = base64.urlsafe_b64decode(encoded.encode("ascii"))
+            cursor = json.loads(raw.decode("utf-8"))
+            position = dateparse.parse_datetime(cursor["p"])
+            pk = int(cursor["i"])
+            reverse = bool(cursor["r"])
+            ordering = cursor["o"]
+        except (
+            binascii.Error,
+            KeyError,
+            TypeError,
+            UnicodeError,
+            ValueError,
+        ):
+            raise exceptions.NotFound(self.invalid_cursor_message)
+
+        # A cursor only makes sense for the ordering that issued it.
+        if position is None or ordering != self.ordering:
+            raise exceptions.NotFound(self.invalid_cursor_message)
+
+        return position, pk, reverse
+
+    def encode_cursor(self, position, pk: int, reverse: bool) -> str:
+        cursor = {
+            "o": self.ordering,
+            "p": position.isoformat(),
+            "i": pk,
+            "r": int(reverse),
+        }
+        raw = json.dumps(cursor, separators=(",", ":")).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii")
+
+    def _link(self, position, pk: int, reverse: bool) -> str:
+        cursor = self.encode_cursor(position, pk, reverse)
+        return urls.replace_query_param(
+            self.base_url, self.cursor_query_param, cursor
+        )
+
+    def _filter_after(self, queryset, position, pk: int, descending: bool):
+        # The first condition alone bounds an index range scan; the second
+        # one breaks ties between rows sharing the same position.
+        if descending:
+            return queryset.filter(**{f"{self.field}__lte": position}).filter(
+                Q(**{f"{self.field}__lt": position}) | Q(pk__lt=pk)
+            )
+
+        return queryset.filter(**{f"{self.field}__gte": position}).filter(
+            Q(**{f"{self.field}__gt": position}) | Q(pk__gt=pk)
+        )
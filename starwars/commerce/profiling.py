@@ -0,0 +1,188 @@
+""" Profiling
+
+This module is responsible to profile single requests with cProfile. A
+superuser asks for it with the X-Profile header or the profile query
+parameter, and a settings.PROFILING_SAMPLE_RATE share of every request is
+profiled too. Each profile is saved to settings.PROFILING_DIR as a pstats
+dump plus a text summary of its top functions.
+
+It is off by default, and bounded: one request at a time per process, at
+most one every settings.PROFILING_MIN_INTERVAL seconds, and the oldest
+profiles are deleted beyond settings.PROFILING_MAX_FILES.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import random
+import threading
+import time
+import typing
+
+from django.conf import settings
+from django.utils import timezone
+
+
+HEADER = "X-Profile"
+
+QUERY_PARAM = "profile"
+
+# cProfile supports one active profiler per thread, and profiling two
+# requests at once would slow the process down further.
+_lock = threading.Lock()
+_last_started = None
+
+# The running profile of the request served by this thread, for finish.
+_local = threading.local()
+
+
+class Profile:
+    """ Profile
+
+    A running profile of one request.
+    """
+
+    def __init__(self, name: str, request):
+        self.name = name
+        self.request = request
+        self.status_code = None
+        self.profiler = cProfile.Profile()
+        self.started = time.perf_counter()
+        self.stopped = False
+
+
+def requested(request) -> bool:
+    """ Requested.
+
+    Args:
+        request: An authenticated rest_framework Request.
+
+    Returns:
+        Whether the request asks to be profiled and may: only superusers
+        can.
+    """
+
+    flag = request.headers.get(HEADER) or request.query_params.get(QUERY_PARAM)
+    return flag in ("1", "true") and request.user.is_superuser
+
+
+def start(request, view_name: str) -> typing.Optional[Profile]:
+    """ Start.
+
+    Args:
+        request: An authenticated rest_framework Request.
+        view_name: Name of the view, part of the file names.
+
+    Returns:
+        The started Profile, or None if the request is not profiled.
+    """
+
+    global _last_started
+
+    if not settings.PROFILING_ENABLED:
+        return None
+    if not (
+        random.random() < settings.PROFILING_SAMPLE_RATE or requested(request)
+    ):
+        return None
+    if not _lock.acquire(blocking=False):
+        return None
+
+    now = time.monotonic()
+    if (
+        _last_started is not None
+        and now - _last_started < settings.PROFILING_MIN_INTERVAL
+    ):
+        _lock.release()
+        return None
+    _last_started = now
+
+    timestamp = timezone.now().strftime("%Y%m%dT%H%M%S%f")
+    profile = Profile(
+        f"{timestamp}-{os.getpid()}-{view_name}-{request.method.lower()}",
+        request,
+    )
+    _local.profile = profile
+    profile.profiler.enable()
+    return profile
+
+
+def stop(profile: Profile, request, status_code: int):
+    """ Stop.
+
+    Saves the profile and deletes the oldest ones beyond the limit. Does
+    nothing if already stopped.
+
+    Args:
+        profile: The Profile returned by start.
+        request: Its request.
+        status_code: The response status.
+    """
+
+    if profile.stopped:
+        return
+
+    try:
+        profile.profiler.disable()
+    finally:
+        profile.stopped = True
+        if getattr(_local, "profile", None) is profile:
+            _local.profile = None
+        _lock.release()
+    duration = time.perf_counter() - profile.started
+
+    directory = settings.PROFILING_DIR
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, profile.name)
+    profile.profiler.dump_stats(f"{path}.prof")
+
+    summary = io.StringIO()
+    summary.write(
+        f"{request.method} {request.get_full_path()} -> {status_code}\n"
+        f"user: {request.user.pk}, duration: {duration * 1000:.1f} ms\n"
+    )
+    stats = pstats.Stats(profile.profiler, stream=summary)
+    stats.sort_stats("cumulative").print_stats(settings.PROFILING_TOP)
+    with open(f"{path}.txt", "w") as file:
+        file.write(summary.getvalue())
+
+    prune(directory, settings.PROFILING_MAX_FILES)
+
+
+def finish(sender, **kwargs):
+    """ Finish.
+
+    Receiver of the request_finished signal. Stops the profile of the
+    request this thread served if nothing did, e.g. the response was
+    never rendered, so the lock is never held past its request.
+
+    Args:
+        sender: Handler class.
+    """
+
+    profile = getattr(_local, "profile", None)
+    if profile is not None:
+        stop(profile, profile.request, profile.status_code)
+
+
+def prune(directory: str, max_profiles: int):
+    """ Prune.
+
+    Args:
+        directory: Where the profiles are saved.
+        max_profiles: How many profiles to keep, the newest.
+    """
+
+    names = sorted(
+        name[: -len(".prof")]
+        for name in os.listdir(directory)
+        if name.endswith(".prof")
+    )
+    # The names start with their timestamp, so they sort oldest first.
+    for name in names[: max(len(names) - max_profiles, 0)]:
+        for extension in (".prof", ".txt"):
+            try:
+                os.remove(os.path.join(directory, name + extension))
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,166 @@
+""" Rollups
+
+This module is responsible to keep models.OrderRollup in step with the
+orders. Every write to orders adds its changes to the buckets it moves
+orders in and out of, in the same transaction, so counting orders by
+status, state and day reads a few buckets instead of every order. The
+rebuild command recounts them from the orders.
+"""
+
+import collections
+import datetime
+import typing
+
+from django.db import connection
+from django.db import transaction
+from django.db.models import Count
+from django.db.models import QuerySet
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from . import models
+
+
+Key = typing.Tuple[int, datetime.date, str, str]
+
+
+def key(order: models.Order) -> Key:
+    """ Key.
+
+    Args:
+        order: A saved models.Order with its shipping_address loaded.
+
+    Returns:
+        The (advertiser_id, day, state, status) bucket of the order, the
+        day in the current time zone, as TruncDate computes it.
+    """
+
+    created_at = order.created_at
+    if timezone.is_aware(created_at):
+        day = timezone.localdate(created_at)
+    else:
+        day = created_at.date()
+    return (
+        order.advertiser_id,
+        day,
+        order.shipping_address.state or "",
+        order.status,
+    )
+
+
+def count(orders: QuerySet) -> typing.Counter[Key]:
+    """ Count.
+
+    Args:
+        orders: A models.Order queryset.
+
+    Returns:
+        The number of orders per bucket, counted by the database.
+    """
+
+    rows = (
+        orders.annotate(rollup_day=TruncDate("created_at"))
+        .values_list(
+            "advertiser_id", "rollup_day", "shipping_address__state", "status"
+        )
+        .annotate(orders=Count("id"))
+        .order_by()
+    )
+    counts = collections.Counter()
+    for advertiser_id, day, state, status, orders_count in rows:
+        counts[(advertiser_id, day, state or "", status)] += orders_count
+    return counts
+
+
+def apply(deltas: typing.Mapping[Key, int]):
+    """ Apply.
+
+    Adds the deltas to their buckets with one batched upsert, creating
+    the missing buckets. Must run in the transaction changing the orders.
+
+    Args:
+        deltas: Orders to add to, or remove from, each bucket.
+    """
+
+    adapt = connection.ops.adapt_datefield_value
+    rows = [
+        (advertiser_id, adapt(day), state, status, delta)
+        for (advertiser_id, day, state, status), delta in deltas.items()
+        if delta
+    ]
+    if not rows:
+        return
+
+    table = connection.ops.quote_name(models.OrderRollup._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {table} "
+            "(advertiser_id, day, state, status, total) "
+            "VALUES (%s, %s, %s, %s, %s) "
+            "ON CONFLICT (advertiser_id, day, state, status) "
+            f"DO UPDATE SET total = {table}.total + excluded.total",
+            rows,
+        )
+
+
+def add(orders: typing.Iterable[models.Order], sign: int = 1):
+    """ Add.
+
+    Args:
+        orders: Saved models.Order with their shipping_address loaded.
+        sign: 1 to count the orders in, -1 to count them out.
+    """
+
+    deltas = collections.Counter()
+    for order in orders:
+        deltas[key(order)] += sign
+    apply(deltas)
+
+
+def move(before: Key, after: Key):
+    """ Move.
+
+    Args:
+        before: The bucket of an order before it changed.
+        after: Its bucket now.
+    """
+
+    if before != after:
+        apply({before: -1, after: 1})
+
+
+def moved(
+    counts: typing.Mapping[Key, int], status: str
+) -> typing.Counter[Key]:
+    """ Moved.
+
+    Args:
+        counts: Orders per bucket, from count.
+        status: The status they all move to.
+
+    Returns:
+        The deltas taking the orders out of their buckets and into the
+        same buckets with the new status.
+    """
+
+    deltas = collections.Counter()
+    for (advertiser_id, day, state, old_status), orders in counts.items():
+        deltas[(advertiser_id, day, state, old_status)] -= orders
+        deltas[(advertiser_id, day, state, status)] += orders
+    return deltas
+
+
+def rebuild() -> int:
+    """ Rebuild.
+
+    Recounts every bucket from the orders, in one transaction.
+
+    Returns:
+        The number of buckets.
+    """
+
+    with transaction.atomic():
+        models.OrderRollup.objects.all().delete()
+        counts = count(models.Order.objects.all())
+        apply(counts)
+    return len(counts)
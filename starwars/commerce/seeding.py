@@ -0,0 +1,509 @@
+""" Seeding
+
+This module is responsible to fill the database with realistic fake data
+for capacity tests. Rows are generated as plain tuples with explicit ids
+and written with one executemany per table and batch, skipping model
+instances, signals and per-row password hashing. The order rollups are
+counted while the rows are built, and the listings copied by the
+database, once per batch.
+"""
+
+import collections
+import contextlib
+import datetime
+import itertools
+import random
+import typing
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.db import connection
+from django.db import transaction
+from django.utils import timezone
+
+from . import caching, db, listings, models, rollups
+
+
+# Share of the population, in percent, so most orders ship to SP.
+STATE_WEIGHTS = {
+    "SP": 21.9,
+    "MG": 10.1,
+    "RJ": 8.2,
+    "BA": 7.0,
+    "PR": 5.5,
+    "RS": 5.4,
+    "PE": 4.5,
+    "CE": 4.3,
+    "PA": 4.1,
+    "SC": 3.5,
+    "MA": 3.4,
+    "GO": 3.4,
+    "AM": 2.0,
+    "ES": 1.9,
+    "PB": 1.9,
+    "RN": 1.7,
+    "MT": 1.7,
+    "AL": 1.6,
+    "PI": 1.6,
+    "DF": 1.4,
+    "MS": 1.3,
+    "SE": 1.1,
+    "RO": 0.8,
+    "TO": 0.8,
+    "AC": 0.4,
+    "AP": 0.4,
+    "RR": 0.3,
+}
+
+# Capital first, it gets half of the orders of its state.
+CITIES = {
+    "AC": ("Rio Branco", "Cruzeiro do Sul"),
+    "AL": ("Maceió", "Arapiraca"),
+    "AP": ("Macapá", "Santana"),
+    "AM": ("Manaus", "Parintins"),
+    "BA": ("Salvador", "Feira de Santana", "Vitória da Conquista"),
+    "CE": ("Fortaleza", "Caucaia", "Juazeiro do Norte"),
+    "DF": ("Brasília",),
+    "ES": ("Vitória", "Vila Velha", "Serra"),
+    "GO": ("Goiânia", "Aparecida de Goiânia", "Anápolis"),
+    "MA": ("São Luís", "Imperatriz"),
+    "MT": ("Cuiabá", "Várzea Grande"),
+    "MS": ("Campo Grande", "Dourados"),
+    "MG": ("Belo Horizonte", "Uberlândia", "Contagem", "Juiz de Fora"),
+    "PA": ("Belém", "Ananindeua", "Santarém"),
+    "PB": ("João Pessoa", "Campina Grande"),
+    "PR": ("Curitiba", "Londrina", "Maringá"),
+    "PE": ("Recife", "Jaboatão dos Guararapes", "Olinda"),
+    "PI": ("Teresina", "Parnaíba"),
+    "RJ": ("Rio de Janeiro", "São Gonçalo", "Duque de Caxias", "Niterói"),
+    "RN": ("Natal", "Mossoró"),
+    "RS": ("Porto Alegre", "Caxias do Sul", "Pelotas"),
+    "RO": ("Porto Velho", "Ji-Paraná"),
+    "RR": ("Boa Vista",),
+    "SC": ("Florianópolis", "Joinville", "Blumenau"),
+    "SP": ("São Paulo", "Guarulhos", "Campinas", "Santos", "Osasco"),
+    "SE": ("Aracaju", "Nossa Senhora do Socorro"),
+    "TO": ("Palmas", "Araguaína"),
+}
+
+# First two CEP digits of each state.
+CEP_PREFIXES = {
+    "AC": (69, 69),
+    "AL": (57, 57),
+    "AP": (68, 68),
+    "AM": (69, 69),
+    "BA": (40, 48),
+    "CE": (60, 63),
+    "DF": (70, 73),
+    "ES": (29, 29),
+    "GO": (72, 76),
+    "MA": (65, 65),
+    "MT": (78, 78),
+    "MS": (79, 79),
+    "MG": (30, 39),
+    "PA": (66, 68),
+    "PB": (58, 58),
+    "PR": (80, 87),
+    "PE": (50, 56),
+    "PI": (64, 64),
+    "RJ": (20, 28),
+    "RN": (59, 59),
+    "RS": (90, 99),
+    "RO": (76, 76),
+    "RR": (69, 69),
+    "SC": (88, 89),
+    "SP": (1, 19),
+    "SE": (49, 49),
+    "TO": (77, 77),
+}
+
+ITEMS = (
+    ("engine", "Ion engine"),
+    ("hyperdrive", "Class 2 hyperdrive motivator"),
+    ("droid", "Astromech droid"),
+    ("blaster", "DL-44 heavy blaster pistol"),
+    ("lightsaber", "Lightsaber hilt"),
+    ("shield", "Deflector shield generator"),
+    ("speeder", "Landspeeder repulsorlift"),
+    ("comlink", "Encrypted comlink"),
+)
+
+STREETS = ("Rua", "Avenida", "Travessa", "Alameda")
+
+# Distinct addresses per state.
+ADDRESS_POOL_SIZE = 500
+
+# Orders older than this are mostly finished.
+SETTLED_AGE = datetime.timedelta(days=14)
+
+# Tables whose Meta.indexes are built once at the end of a large run.
+# Foreign key indexes and unique constraints are kept.
+BULK_INDEXED_MODELS = (models.Address, models.Order, models.OrderListing)
+
+USER_FIELDS = (
+    "id",
+    "password",
+    "last_login",
+    "is_superuser",
+    "username",
+    "first_name",
+    "last_name",
+    "email",
+    "is_staff",
+    "is_active",
+    "date_joined",
+)
+ADVERTISER_FIELDS = ("id", "created_at", "last_change", "user_id", "phone")
+ITEM_FIELDS = ("id", "created_at", "last_change", "name", "description")
+ADDRESS_FIELDS = (
+    "id",
+    "state",
+    "address",
+    "neighborhood",
+    "number",
+    "complement",
+    "city",
+    "cep",
+)
+ORDER_FIELDS = (
+    "id",
+    "created_at",
+    "last_change",
+    "advertiser_id",
+    "shipping_address_id",
+    "item_id",
+    "status",
+)
+
+
+def seed_advertisers(
+    count: int, password: str, rng: random.Random = None
+) -> typing.List[int]:
+    """ Seed Advertisers.
+
+    The password is hashed once and shared by every user.
+
+    Args:
+        count: Number of advertisers.
+        password: Raw password of every user.
+        rng: Random generator, for reproducible data.
+
+    Returns:
+        The ids of the new advertisers.
+    """
+
+    rng = rng or random.Random()
+    encoded = hashers.make_password(password)
+    run = uuid.UUID(int=rng.getrandbits(128)).hex[:8]
+    now = _adapt(timezone.now())
+
+    with transaction.atomic():
+        first_user_id = db.reserve_ids(models.User, count)
+        first_advertiser_id = db.reserve_ids(models.Advertiser, count)
+        users = []
+        advertisers = []
+        for index in range(count):
+            user_id = first_user_id + index
+            username = f"seed-{run}-{user_id}"
+            users.append(
+                (
+                    user_id,
+                    encoded,
+                    None,
+                    False,
+                    username,
+                    "",
+                    "",
+                    f"{username}@example.com",
+                    False,
+                    True,
+                    now,
+                )
+            )
+            advertisers.append(
+                (
+                    first_advertiser_id + index,
+                    now,
+                    now,
+                    user_id,
+                    f"+55 11 9{rng.randrange(10 ** 8):08d}",
+                )
+            )
+
+        _insert(models.User, USER_FIELDS, users)
+        _insert(models.Advertiser, ADVERTISER_FIELDS, advertisers)
+
+    return [row[0] for row in advertisers]
+
+
+def seed_orders(
+    advertiser_ids: typing.List[int],
+    count: int,
+    batch_size: int = 10000,
+    days: int = 365,
+    rng: random.Random = None,
+) -> int:
+    """ Seed Orders.
+
+    Orders are spread over the advertisers following a long tail, over
+    the states following their population, and over the last `days` days
+    with more recent orders than old ones. Old orders are mostly
+    finished. Every batch commits on its own. When the orders at least
+    double, the BULK_INDEXED_MODELS indexes are dropped and built again at
+    the end, so queries are slow while seeding runs; see restore_indexes
+    if the run is killed.
+
+    Args:
+        advertiser_ids: Owners of the orders.
+        count: Number of orders.
+        batch_size: Orders per transaction.
+        days: Age of the oldest order.
+        rng: Random generator, for reproducible data.
+
+    Returns:
+        Number of orders created.
+    """
+
+    if not advertiser_ids or count < 1:
+        return 0
+
+    rng = rng or random.Random()
+    now = timezone.now()
+    if settings.USE_TZ and not connection.features.supports_timezones:
+        # The backend would make every aware datetime naive one by one.
+        now = timezone.make_naive(now, connection.timezone)
+
+    # A few advertisers own most of the orders.
+    advertiser_weights = list(
+        itertools.accumulate(rng.paretovariate(1.2) for _ in advertiser_ids)
+    )
+    states = list(STATE_WEIGHTS)
+    state_weights = list(itertools.accumulate(STATE_WEIGHTS.values()))
+
+    # Sorted ages, oldest first, keep ids growing with created_at.
+    ages = sorted(
+        (days * (1 - rng.random() ** 0.5) for _ in range(count)), reverse=True,
+    )
+
+    random_ = rng.random
+    adapt = connection.ops.adapt_datetimefield_value
+    if adapt(now) == str(now):
+        # SQLite stores datetimes as text, str() is the same adaptation.
+        adapt = str
+    address_pools = _address_pools(rng)
+    items_count = len(ITEMS)
+    open_, finished = models.Order.STATUS_OPEN, models.Order.STATUS_FINISHED
+
+    # Building the indexes once at the end beats updating them row by row,
+    # unless the tables already hold more rows than are being added.
+    if count >= models.Order.objects.count():
+        indexes = _indexes_dropped(BULK_INDEXED_MODELS)
+    else:
+        indexes = contextlib.nullcontext()
+
+    # Ages only shrink, so the day of the orders only changes past its end.
+    day, day_end = None, now - datetime.timedelta(days=days + 1)
+
+    with indexes:
+        created = 0
+        while created < count:
+            size = min(batch_size, count - created)
+            with transaction.atomic():
+                first_item_id = db.reserve_ids(models.Item, size)
+                first_address_id = db.reserve_ids(models.Address, size)
+                first_order_id = db.reserve_ids(models.Order, size)
+
+                owners = rng.choices(
+                    advertiser_ids, cum_weights=advertiser_weights, k=size
+                )
+                order_states = rng.choices(
+                    states, cum_weights=state_weights, k=size
+                )
+
+                items = []
+                addresses = []
+                orders = []
+                buckets = collections.Counter()
+                for index in range(size):
+                    age = datetime.timedelta(days=ages[created + index])
+                    created_at = now - age
+                    if created_at >= day_end:
+                        day, day_end = _local_day(created_at)
+                    status = open_
+                    last_change = created_at
+                    settled = 0.9 if age > SETTLED_AGE else 0.4
+                    if random_() < settled:
+                        status = finished
+                        last_change = created_at + min(
+                            age, datetime.timedelta(days=random_() * 10)
+                        )
+                    created_at = adapt(created_at)
+                    last_change = adapt(last_change)
+
+                    item_id = first_item_id + index
+                    items.append(
+                        (item_id, created_at, created_at)
+                        + ITEMS[int(random_() * items_count)]
+                    )
+
+                    address_id = first_address_id + index
+                    state = order_states[index]
+                    pool = address_pools[state]
+                    addresses.append(
+                        (address_id,) + pool[int(random_() * len(pool))]
+                    )
+                    buckets[(owners[index], day, state, status)] += 1
+
+                    orders.append(
+                        (
+                            first_order_id + index,
+                            created_at,
+                            last_change,
+                            owners[index],
+                            address_id,
+                            item_id,
+                            status,
+                        )
+                    )
+
+                _insert(models.Item, ITEM_FIELDS, items)
+                _insert(models.Address, ADDRESS_FIELDS, addresses)
+                _insert(models.Order, ORDER_FIELDS, orders)
+                rollups.apply(buckets)
+                listings.copy(
+                    models.Order.objects.filter(
+                        pk__gte=first_order_id, pk__lt=first_order_id + size,
+                    )
+                )
+
+            created += size
+
+    caching.invalidate()
+    return created
+
+
+def _address_pools(rng: random.Random) -> typing.Dict[str, list]:
+    # Drawing from a pool per state is much cheaper than generating every
+    # address, and customers ordering twice are realistic anyway.
+    return {
+        state: [_build_address(state, rng) for _ in range(ADDRESS_POOL_SIZE)]
+        for state in STATE_WEIGHTS
+    }
+
+
+def _build_address(state: str, rng: random.Random) -> tuple:
+    cities = CITIES[state]
+    # Half of the orders go to the capital.
+    if len(cities) == 1 or rng.random() < 0.5:
+        city = cities[0]
+    else:
+        city = rng.choice(cities[1:])
+
+    low, high = CEP_PREFIXES[state]
+    cep = f"{rng.randint(low, high):02d}{rng.randrange(1000):03d}-"
+    cep += f"{rng.randrange(1000):03d}"
+
+    return (
+        state,
+        f"{rng.choice(STREETS)} {rng.randrange(1, 500)}",
+        f"Bairro {rng.randrange(1, 50)}",
+        str(rng.randrange(1, 3000)),
+        "",
+        city,
+        cep,
+    )
+
+
+def _local_day(
+    created_at: datetime.datetime,
+) -> typing.Tuple[datetime.date, datetime.datetime]:
+    # The day rollups.key gives an order, and when that day ends, in the
+    # same form as created_at: naive in the connection time zone when the
+    # backend does not store time zones.
+    if not settings.USE_TZ:
+        day = created_at.date()
+        return (
+            day,
+            datetime.datetime.combine(
+                day + datetime.timedelta(days=1), datetime.time()
+            ),
+        )
+
+    naive = timezone.is_naive(created_at)
+    if naive:
+        created_at = timezone.make_aware(created_at, connection.timezone)
+    day = timezone.localdate(created_at)
+    day_end = timezone.make_aware(
+        datetime.datetime.combine(
+            day + datetime.timedelta(days=1), datetime.time()
+        ),
+        is_dst=False,
+    )
+    if naive:
+        day_end = timezone.make_naive(day_end, connection.timezone)
+    return day, day_end
+
+
+def restore_indexes(models_: typing.Iterable = BULK_INDEXED_MODELS) -> list:
+    """ Restore Indexes.
+
+    Creates the Meta.indexes missing from the database, which is where a
+    killed seeding run leaves them.
+
+    Args:
+        models_: Model classes to check.
+
+    Returns:
+        The names of the indexes created.
+    """
+
+    # add_index runs its statement at once, the editor is not entered:
+    # that is not allowed inside a transaction on SQLite.
+    editor = connection.schema_editor()
+    created = []
+    for model in models_:
+        with connection.cursor() as cursor:
+            existing = connection.introspection.get_constraints(
+                cursor, model._meta.db_table
+            )
+        for index in model._meta.indexes:
+            if index.name not in existing:
+                editor.add_index(model, index)
+                created.append(index.name)
+    return created
+
+
+@contextlib.contextmanager
+def _indexes_dropped(models_: typing.Iterable):
+    # Only the indexes declared in Meta: foreign key indexes stay, so
+    # cascades and joins on a half-seeded database do not scan tables.
+    editor = connection.schema_editor()
+    restore_indexes(models_)
+    for model in models_:
+        for index in model._meta.indexes:
+            editor.remove_index(model, index)
+
+    try:
+        yield
+    finally:
+        restore_indexes(models_)
+
+
+def _adapt(value: datetime.datetime):
+    return connection.ops.adapt_datetimefield_value(value)
+
+
+def _insert(model, fields: typing.Tuple[str, ...], rows: list):
+    opts = model._meta
+    columns = ", ".join(
+        connection.ops.quote_name(opts.get_field(field).column)
+        for field in fields
+    )
+    placeholders = ", ".join(["%s"] * len(fields))
+    sql = (
+        f"INSERT INTO {connection.ops.quote_name(opts.db_table)} "
+        f"({columns}) VALUES ({placeholders})"
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
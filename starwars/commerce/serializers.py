@@ -4,40 +4,54 @@ from rest_framework import serializers
 
 from . import models
 from . import services
+from . import timing
 
 
-class ItemSerializer(serializers.ModelSerializer):
+class Serializer(timing.TimedSerializerMixin, serializers.Serializer):
+    pass
+
+
+class ModelSerializer(
+    timing.TimedSerializerMixin, serializers.ModelSerializer
+):
+    pass
+
+
+class ItemSerializer(ModelSerializer):
     class Meta:
         model = models.Item
         fields = ["name", "description"]
 
 
-class UserLoginSerializer(serializers.Serializer):
+class UserLoginSerializer(Serializer):
     username = serializers.CharField(required=True)
     password = serializers.CharField(required=True)
 
     def validate(self, data):
         username = data["username"]
         password = data["password"]
-        user = auth.authenticate(username=username, password=password)
+        user = auth.authenticate(
+            self.context.get("request"), username=username, password=password
+        )
         if not user:
             raise serializers.ValidationError("Invalid Credentials")
+        data["user"] = user
         return data
 
 
-class UserDetailSerializer(serializers.ModelSerializer):
+class UserDetailSerializer(ModelSerializer):
     class Meta:
         model = models.User
         fields = ["id", "username", "email"]
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(ModelSerializer):
     class Meta:
         model = models.User
         fields = ["username", "password", "email"]
 
 
-class AdvertiserGetSerializer(serializers.ModelSerializer):
+class AdvertiserGetSerializer(ModelSerializer):
     user = UserDetailSerializer(required=True)
 
     class Meta:
@@ -45,7 +59,7 @@ class AdvertiserGetSerializer(serializers.ModelSerializer):
         fields = ["user", "phone"]
 
 
-class AdvertiserSerializer(serializers.ModelSerializer):
+class AdvertiserSerializer(ModelSerializer):
     user = UserSerializer(required=True)
 
     class Meta:
@@ -56,7 +70,7 @@ class AdvertiserSerializer(serializers.ModelSerializer):
         return services.create_advertiser(validated_data)
 
 
-class AddressSerializer(serializers.ModelSerializer):
+class AddressSerializer(ModelSerializer):
     class Meta:
         model = models.Address
         fields = [
@@ -70,7 +84,7 @@ class AddressSerializer(serializers.ModelSerializer):
         ]
 
 
-class OrderPatchSerializer(serializers.ModelSerializer):
+class OrderPatchSerializer(ModelSerializer):
     item = ItemSerializer(required=False)
     shipping_address = AddressSerializer(required=False)
 
@@ -79,7 +93,7 @@ class OrderPatchSerializer(serializers.ModelSerializer):
         fields = ["item", "shipping_address", "status"]
 
 
-class OrderCreateSerializer(serializers.ModelSerializer):
+class OrderCreateSerializer(ModelSerializer):
     item = ItemSerializer(required=True)
     shipping_address = AddressSerializer(required=True)
 
@@ -88,10 +102,107 @@ class OrderCreateSerializer(serializers.ModelSerializer):
         fields = ["item", "shipping_address", "status"]
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(ModelSerializer):
     item = ItemSerializer(required=True)
     shipping_address = AddressSerializer(required=True)
 
     class Meta:
         model = models.Order
         fields = ["id", "item", "shipping_address", "status"]
+
+
+class OrderListingItemSerializer(Serializer):
+    name = serializers.CharField(source="item_name")
+
+
+class OrderListingAddressSerializer(Serializer):
+    state = serializers.CharField()
+    city = serializers.CharField()
+    cep = serializers.CharField()
+
+
+class OrderListingSerializer(ModelSerializer):
+    """ Order Listing Serializer
+
+    The shape of OrderSerializer, out of a models.OrderListing, so without
+    the item description nor the street address.
+    """
+
+    id = serializers.IntegerField(source="pk")
+    item = OrderListingItemSerializer(source="*")
+    shipping_address = OrderListingAddressSerializer(source="*")
+
+    class Meta:
+        model = models.OrderListing
+        fields = ["id", "item", "shipping_address", "status"]
+
+
+class OrderFilterSerializer(Serializer):
+    status = serializers.ChoiceField(
+        choices=models.Order.STATUS_CHOICES, required=False
+    )
+    shipping_address__state = serializers.ChoiceField(
+        choices=models.Address.STATE_CHOICES, required=False
+    )
+    cep = serializers.CharField(max_length=12, required=False)
+    created_after = serializers.DateTimeField(required=False)
+    created_before = serializers.DateTimeField(required=False)
+    changed_after = serializers.DateTimeField(required=False)
+    changed_before = serializers.DateTimeField(required=False)
+
+
+class OrderStatsQuerySerializer(Serializer):
+    GROUP_BY_CHOICES = ("status", "state", "day")
+
+    group_by = serializers.CharField(
+        default=",".join(GROUP_BY_CHOICES), allow_blank=True
+    )
+    status = serializers.ChoiceField(
+        choices=models.Order.STATUS_CHOICES, required=False
+    )
+    state = serializers.ChoiceField(
+        choices=models.Address.STATE_CHOICES, required=False
+    )
+    day_after = serializers.DateField(required=False)
+    day_before = serializers.DateField(required=False)
+
+    def validate_group_by(self, value):
+        group_by = [name for name in value.split(",") if name]
+        unknown = set(group_by) - set(self.GROUP_BY_CHOICES)
+        if unknown:
+            raise serializers.ValidationError(
+                f"Choose among: {', '.join(self.GROUP_BY_CHOICES)}."
+            )
+        # Repeated names would group by the same dimension twice.
+        return list(dict.fromkeys(group_by))
+
+
+class OrderListQuerySerializer(OrderFilterSerializer):
+    ORDERING_CHOICES = (
+        "created_at",
+        "-created_at",
+        "last_change",
+        "-last_change",
+    )
+
+    ordering = serializers.ChoiceField(
+        choices=ORDERING_CHOICES, default="created_at"
+    )
+
+
+class OrderBulkFinishSerializer(Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(), required=False, allow_empty=False
+    )
+    filter = OrderFilterSerializer(required=False)
+
+    def validate_filter(self, value):
+        # An empty filter would finish every open order.
+        if not any(value.values()):
+            raise serializers.ValidationError("Provide at least one filter.")
+        return value
+
+    def validate(self, data):
+        if "ids" not in data and "filter" not in data:
+            raise serializers.ValidationError("Provide ids or filter.")
+        return data
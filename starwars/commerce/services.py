@@ -4,162 +4,518 @@ This module is responsible to handle all interactions to the database
 and bussiness rules.
 """
 
+import datetime
+import hashlib
+import secrets
 import typing
+from concurrent import futures
 
+import django
+from django.conf import settings
 from django.contrib import auth
+from django.contrib.auth import hashers
+from django.contrib.sessions.models import Session
+from django.db import connection
+from django.db import transaction
+from django.db.models import Count
+from django.db.models import Max
+from django.db.models import QuerySet
+from django.db.models import Sum
+from django.utils import timezone
 
-from . import models
+from . import caching, db, group_commit, listings, models, rollups
 
 
-def get_order(order_id: int, user_id: int) -> models.Order:
+def get_order(order_id: int, advertiser: models.Advertiser) -> models.Order:
     """ Get Order.
 
     Args:
         order_id: Order ID.
-        user_id: User ID.
+        advertiser: A models.Advertiser, the request.advertiser.
 
     Returns:
-        A models.Order.
+        A models.Order with item and shipping_address already loaded.
     """
 
-    order = None
+    if not advertiser:
+        return None
+
+    orders = _orders_visible_to(advertiser)
     try:
-        order = models.Order.objects.get(pk=order_id)
+        return orders.get(pk=order_id)
     except models.Order.DoesNotExist:
         return None
 
-    advertiser = get_advertiser_by_user_id(user_id)
+
+def list_orders(
+    advertiser: models.Advertiser, filters: dict = None
+) -> QuerySet:
+    """ List Orders.
+
+    Args:
+        advertiser: A models.Advertiser, the request.advertiser.
+        filters: Dictionary containing order filters.
+
+    Returns:
+        A lazy queryset, so callers can paginate it in the database.
+        Filtered orders if user is not superuser.
+        All orders if user is superuser.
+    """
+
     if not advertiser:
-        return None
+        return models.Order.objects.none()
 
-    if advertiser.user.is_superuser:
-        return order
+    orders = _orders_visible_to(advertiser)
+    if filters:
+        orders = _filter_orders(orders, filters)
+
+    return orders
+
+
+def list_order_listings(
+    advertiser: models.Advertiser, filters: dict = None
+) -> QuerySet:
+    """ List Order Listings.
+
+    Like list_orders, but reads models.OrderListing, one narrow table, for
+    settings.ORDER_LISTING_ENABLED.
+
+    Args:
+        advertiser: A models.Advertiser, the request.advertiser.
+        filters: Dictionary containing order filters.
+
+    Returns:
+        A lazy models.OrderListing queryset. Own listings if user is not
+        superuser, all listings if user is superuser.
+    """
 
-    if order.advertiser.user.id != advertiser.user.pk:
+    if not advertiser:
+        return models.OrderListing.objects.none()
+
+    orders = models.OrderListing.objects.all()
+    if not advertiser.user.is_superuser:
+        orders = orders.filter(advertiser_id=advertiser.pk)
+    if filters:
+        orders = _filter_orders(orders, filters, prefix="")
+
+    return orders
+
+
+def get_order_version(
+    order_id: int, advertiser: models.Advertiser
+) -> typing.Dict[str, typing.Any]:
+    """ Get Order Version.
+
+    A cheap lookup to validate conditional requests before loading the
+    order.
+
+    Args:
+        order_id: Order ID.
+        advertiser: A models.Advertiser, the request.advertiser.
+
+    Returns:
+        A dict with the order `id` and `last_change`, or None if the order
+        is not visible to the advertiser.
+    """
+
+    if not advertiser:
         return None
 
-    return order
+    return (
+        _orders_visible_to(advertiser)
+        .filter(pk=order_id)
+        .values("id", "last_change")
+        .first()
+    )
 
 
-def list_orders(user_id: int) -> typing.List[models.Order]:
-    """ List Orders.
+def get_orders_version(orders: QuerySet) -> typing.Dict[str, typing.Any]:
+    """ Get Orders Version.
+
+    A single aggregate to validate conditional requests before loading the
+    orders. Counting catches deletions, which do not move last_change.
 
     Args:
-        user_id: User ID.
+        orders: A queryset from list_orders or list_order_listings.
 
     Returns:
-        Filtered orders if user is not superuser.
-        All orders if user is superuser.
+        A dict with the orders `count` and latest `last_change`.
     """
 
-    advertiser = get_advertiser_by_user_id(user_id)
+    return orders.order_by().aggregate(
+        count=Count("pk"), last_change=Max("last_change")
+    )
+
 
-    orders = models.Order.objects.filter(
-        advertiser__user__pk=advertiser.user.pk
-    ).all()
+def get_order_stats(
+    advertiser: models.Advertiser,
+    group_by: typing.List[str],
+    filters: dict = None,
+) -> typing.List[dict]:
+    """ Get Order Stats.
 
-    if advertiser.user.is_superuser:
-        return models.Order.objects.all()
+    Reads models.OrderRollup, so the cost grows with the number of
+    buckets, not of orders.
 
-    if not orders:
+    Args:
+        advertiser: A models.Advertiser, the request.advertiser.
+        group_by: Dimensions out of "status", "state" and "day".
+        filters: Dictionary with status, state, day_after and day_before.
+
+    Returns:
+        One dict per group, the group_by values plus "count", sorted by
+        group. Orders without a state have state None. Own orders if user
+        is not superuser, all orders if user is superuser.
+    """
+
+    if not advertiser:
         return []
 
-    return orders
+    buckets = models.OrderRollup.objects.all()
+    if not advertiser.user.is_superuser:
+        buckets = buckets.filter(advertiser_id=advertiser.pk)
+
+    filters = filters or {}
+    if filters.get("status"):
+        buckets = buckets.filter(status=filters["status"])
+    if filters.get("state"):
+        buckets = buckets.filter(state=filters["state"])
+    if filters.get("day_after"):
+        buckets = buckets.filter(day__gte=filters["day_after"])
+    if filters.get("day_before"):
+        buckets = buckets.filter(day__lt=filters["day_before"])
+
+    if not group_by:
+        count = buckets.aggregate(count=Sum("total"))["count"]
+        return [{"count": count}] if count else []
+
+    groups = (
+        buckets.values(*group_by)
+        .annotate(count=Sum("total"))
+        .filter(count__gt=0)
+        .order_by(*group_by)
+    )
+    stats = list(groups)
+    for group in stats:
+        if "state" in group:
+            group["state"] = group["state"] or None
+    return stats
 
 
-def create_order(validated_data: dict, user_id: int) -> models.Order:
+def _orders_visible_to(advertiser: models.Advertiser) -> QuerySet:
+    """ Orders Visible To.
+
+    Args:
+        advertiser: A models.Advertiser with its user loaded.
+
+    Returns:
+        Orders owned by the advertiser user, or all orders for superusers,
+        joined with item and shipping_address to serialize them without
+        extra queries.
+    """
+
+    orders = models.Order.objects.select_related("item", "shipping_address")
+    if advertiser.user.is_superuser:
+        return orders
+
+    return orders.filter(advertiser_id=advertiser.pk)
+
+
+def create_order(
+    validated_data: dict, advertiser: models.Advertiser
+) -> models.Order:
     """ Create Order.
 
+    With settings.ORDER_GROUP_COMMIT_ENABLED, concurrent creations in this
+    process share one transaction, see group_commit.
+
     Args:
         validated_data: Dictionary containing order information.
-        user_id: User ID.
+        advertiser: A models.Advertiser, the owner of the order.
 
     Returns:
         A models.Order.
     """
 
+    if settings.ORDER_GROUP_COMMIT_ENABLED:
+        committer = group_commit.get_committer(
+            settings.ORDER_GROUP_COMMIT_WINDOW,
+            settings.ORDER_GROUP_COMMIT_MAX_BATCH,
+            timeout=settings.ORDER_GROUP_COMMIT_TIMEOUT,
+        )
+        order = committer.submit(_save_order, validated_data, advertiser)
+    else:
+        with transaction.atomic():
+            order = _save_order(validated_data, advertiser)
+
+    return order
+
+
+def _save_order(
+    validated_data: dict, advertiser: models.Advertiser
+) -> models.Order:
     order = models.Order()
     order.status = models.Order.STATUS_OPEN
+    order.advertiser = advertiser
 
-    item = models.Item(
-        name=validated_data["item"]["name"],
-        description=validated_data["item"]["description"],
-    )
+    item = _build_item(validated_data["item"])
     item.save()
     order.item = item
 
-    shipping_address = models.Address(
-        state=validated_data["shipping_address"].get("state"),
-        address=validated_data["shipping_address"].get("address"),
-        neighborhood=validated_data["shipping_address"].get("neighborhood"),
-        number=validated_data["shipping_address"].get("number"),
-        complement=validated_data["shipping_address"].get("complement"),
-        city=validated_data["shipping_address"].get("city"),
-        cep=validated_data["shipping_address"].get("cep"),
-    )
+    shipping_address = _build_address(validated_data["shipping_address"])
     shipping_address.save()
     order.shipping_address = shipping_address
 
-    advertiser = get_advertiser_by_user_id(user_id)
-    order.advertiser = advertiser
-
     order.save()
+    rollups.add([order])
+    listings.add([order])
     return order
 
 
-def update_order(
-    order_id: int, validated_data: dict, user_id: int
-) -> models.Order:
+def bulk_create_orders(
+    validated_data_list: typing.List[dict], advertiser: models.Advertiser
+) -> typing.List[models.Order]:
+    """ Bulk Create Orders.
+
+    Items, addresses and orders are written with one batched INSERT per
+    table, all inside a single transaction.
+
+    Args:
+        validated_data_list: List of dictionaries containing order
+        information.
+        advertiser: A models.Advertiser, the owner of the orders.
+
+    Returns:
+        A list of models.Order, in the same order as validated_data_list.
+    """
+
+    items = [_build_item(data["item"]) for data in validated_data_list]
+    addresses = [
+        _build_address(data["shipping_address"])
+        for data in validated_data_list
+    ]
+
+    with transaction.atomic():
+        _bulk_create(models.Item, items)
+        _bulk_create(models.Address, addresses)
+
+        orders = [
+            models.Order(
+                advertiser=advertiser,
+                item=item,
+                shipping_address=shipping_address,
+                status=models.Order.STATUS_OPEN,
+            )
+            for item, shipping_address in zip(items, addresses)
+        ]
+        _bulk_create(models.Order, orders)
+        rollups.add(orders)
+        listings.add(orders)
+
+    caching.invalidate(advertiser.pk)
+    return orders
+
+
+def finish_orders(
+    advertiser: models.Advertiser,
+    ids: typing.List[int] = None,
+    filters: dict = None,
+) -> int:
+    """ Finish Orders.
+
+    Moves the matching open orders to finished with a single UPDATE.
+
+    Args:
+        advertiser: A models.Advertiser, the request.advertiser.
+        ids: Order IDs to finish.
+        filters: Dictionary containing order filters.
+
+    Returns:
+        The number of orders finished, none without ids nor filters.
+    """
+
+    if not advertiser or (ids is None and not filters):
+        return 0
+
+    orders = _orders_visible_to(advertiser).filter(
+        status=models.Order.STATUS_OPEN
+    )
+    if ids is not None:
+        orders = orders.filter(pk__in=ids)
+    if filters:
+        orders = _filter_orders(orders, filters)
+
+    # QuerySet.update skips auto_now, so last_change is set explicitly.
+    values = {
+        "status": models.Order.STATUS_FINISHED,
+        "last_change": timezone.now(),
+    }
+    with transaction.atomic():
+        counts = rollups.count(orders)
+        listings.update(orders, **values)
+        updated = orders.update(**values)
+
+        rollups.apply(rollups.moved(counts, models.Order.STATUS_FINISHED))
+
+    if advertiser.user.is_superuser:
+        caching.invalidate()
+    else:
+        caching.invalidate(advertiser.pk)
+    return updated
+
+
+def _filter_orders(
+    orders: QuerySet, filters: dict, prefix: str = "shipping_address__"
+) -> QuerySet:
+    """ Filter Orders.
+
+    Args:
+        orders: A models.Order or models.OrderListing queryset.
+        filters: Dictionary containing order filters.
+        prefix: Path from `orders` to the address fields, "" for listings.
+
+    Returns:
+        The filtered queryset.
+    """
+
+    if filters.get("status"):
+        orders = orders.filter(status=filters["status"])
+    if filters.get("shipping_address__state"):
+        orders = orders.filter(
+            **{f"{prefix}state": filters["shipping_address__state"]}
+        )
+    if filters.get("cep"):
+        # A range instead of LIKE 'prefix%', so an index on cep is usable.
+        cep = filters["cep"]
+        orders = orders.filter(
+            **{
+                f"{prefix}cep__gte": cep,
+                f"{prefix}cep__lt": cep[:-1] + chr(ord(cep[-1]) + 1),
+            }
+        )
+    if filters.get("created_after"):
+        orders = orders.filter(created_at__gte=filters["created_after"])
+    if filters.get("created_before"):
+        orders = orders.filter(created_at__lt=filters["created_before"])
+    if filters.get("changed_after"):
+        orders = orders.filter(last_change__gte=filters["changed_after"])
+    if filters.get("changed_before"):
+        orders = orders.filter(last_change__lt=filters["changed_before"])
+
+    return orders
+
+
+def _build_item(data: dict) -> models.Item:
+    return models.Item(name=data["name"], description=data["description"])
+
+
+def _build_address(data: dict) -> models.Address:
+    return models.Address(
+        state=data.get("state"),
+        address=data.get("address"),
+        neighborhood=data.get("neighborhood"),
+        number=data.get("number"),
+        complement=data.get("complement"),
+        city=data.get("city"),
+        cep=data.get("cep"),
+    )
+
+
+def _bulk_create(model, objs: list, batch_size: int = None) -> list:
+    """ Bulk Create.
+
+    Backends that cannot return the inserted rows (e.g. SQLite) leave the
+    objects without primary keys, so a block of keys is reserved first,
+    see db.reserve_ids. Must run inside a transaction.
+
+    Args:
+        model: Model class.
+        objs: Unsaved model instances.
+        batch_size: Rows per INSERT, None lets the backend decide.
+
+    Returns:
+        The instances, with their primary keys set.
+    """
+
+    if objs and not connection.features.can_return_rows_from_bulk_insert:
+        first_pk = db.reserve_ids(model, len(objs))
+        for pk, obj in enumerate(objs, start=first_pk):
+            obj.pk = pk
+
+    return model.objects.bulk_create(objs, batch_size=batch_size)
+
+
+def update_order(order: models.Order, validated_data: dict) -> models.Order:
     """ Update Order.
 
     Args:
-        order_id: Order ID.
+        order: A models.Order from get_order.
         validated_data: Dictionary containing order information.
-        user_id: User ID.
 
     Returns:
         A models.Order.
     """
 
-    order = get_order(order_id, user_id)
-    order.status = validated_data.get("status", order.status)
-    if validated_data.get("item"):
-        order.item.name = validated_data["item"].get("name", order.item.name)
-        order.item.description = validated_data["item"].get(
-            "description", order.item.description
+    with transaction.atomic():
+        # The bucket the order leaves is read in the transaction, where no
+        # other write can move it meanwhile.
+        bucket = rollups.key(
+            models.Order.objects.select_for_update()
+            .select_related("shipping_address")
+            .get(pk=order.pk)
         )
-        order.item.save()
+        order.status = validated_data.get("status", order.status)
+        if validated_data.get("item"):
+            order.item.name = validated_data["item"].get(
+                "name", order.item.name
+            )
+            order.item.description = validated_data["item"].get(
+                "description", order.item.description
+            )
+            order.item.save()
+
+        if validated_data.get("shipping_address"):
+            order.shipping_address.state = validated_data[
+                "shipping_address"
+            ].get("state", order.shipping_address.state)
+            order.shipping_address.save()
+
+        order.save()
+        rollups.move(bucket, rollups.key(order))
+        listings.save(order)
 
-    if validated_data.get("shipping_address"):
-        order.shipping_address.state = validated_data["shipping_address"].get(
-            "state", order.shipping_address.state
-        )
-        order.shipping_address.save()
-
-    if not order.advertiser:
-        advertiser = models.Advertiser.objects.get(pk=user_id)
-        order.advertiser = advertiser
-
-    order.save()
     return order
 
 
-def delete_order(order_id: int, user_id: int) -> models.Order:
+def delete_order(order_id: int, advertiser: models.Advertiser) -> models.Order:
     """ Delete Order.
 
     Args:
         order_id: Order ID.
-        user_id: User ID.
+        advertiser: A models.Advertiser, the request.advertiser.
 
     Returns:
         A models.Order.
     """
 
-    order = get_order(order_id, user_id)
+    order = get_order(order_id, advertiser)
     if not order:
         return None
 
-    order.delete()
+    with transaction.atomic():
+        # Counted out of the bucket it is in now, like in update_order.
+        try:
+            order = (
+                models.Order.objects.select_for_update()
+                .select_related("item", "shipping_address")
+                .get(pk=order.pk)
+            )
+        except models.Order.DoesNotExist:
+            return None
+        rollups.add([order], sign=-1)
+        # Deletes the listing too, if any.
+        order.delete()
+
     return order
 
 
@@ -190,41 +546,190 @@ def create_advertiser(validated_data: dict) -> models.Advertiser:
     return advertiser
 
 
-def get_advertiser_by_user_id(user_id: int) -> models.Advertiser:
-    """ Get Advertiser By User Id.
+def bulk_create_advertisers(
+    validated_data_list: typing.List[dict],
+    workers: int = 1,
+    batch_size: int = None,
+) -> typing.List[models.Advertiser]:
+    """ Bulk Create Advertisers.
+
+    Passwords are hashed up front across `workers` processes, then users
+    and advertisers are written with batched INSERTs, all inside a single
+    transaction. Nobody is logged in.
 
     Args:
-        user_id: User ID.
+        validated_data_list: List of dictionaries containing advertiser
+        information.
+        workers: Processes hashing the passwords, 1 hashes inline.
+        batch_size: Rows per INSERT, None lets the backend decide.
 
     Returns:
-        A models.Advertiser.
+        A list of models.Advertiser, in the same order as
+        validated_data_list.
+    """
+
+    passwords = _hash_passwords(
+        [data["user"]["password"] for data in validated_data_list], workers
+    )
+    users = [
+        models.User(
+            username=models.User.normalize_username(data["user"]["username"]),
+            email=models.User.objects.normalize_email(
+                data["user"].get("email")
+            ),
+            password=password,
+        )
+        for data, password in zip(validated_data_list, passwords)
+    ]
+
+    with transaction.atomic():
+        _bulk_create(models.User, users, batch_size)
+
+        advertisers = [
+            models.Advertiser(user=user, phone=data["phone"])
+            for data, user in zip(validated_data_list, users)
+        ]
+        _bulk_create(models.Advertiser, advertisers, batch_size)
+
+    return advertisers
+
+
+def _hash_passwords(passwords: typing.List[str], workers: int) -> list:
+    # Hashing is CPU bound and deliberately slow, threads would only
+    # take turns holding the GIL.
+    if workers <= 1 or len(passwords) <= 1:
+        return [hashers.make_password(password) for password in passwords]
+
+    chunksize = max(1, len(passwords) // (workers * 4))
+    with futures.ProcessPoolExecutor(
+        max_workers=workers, initializer=django.setup
+    ) as executor:
+        return list(
+            executor.map(hashers.make_password, passwords, chunksize=chunksize)
+        )
+
+
+def get_advertiser_by_user(user: models.User) -> models.Advertiser:
+    """ Get Advertiser By User.
+
+    Args:
+        user: An authenticated models.User.
+
+    Returns:
+        A models.Advertiser, sharing the given user instance.
     """
 
     try:
-        return models.Advertiser.objects.get(user__id=user_id)
+        advertiser = models.Advertiser.objects.get(user__id=user.pk)
     except models.Advertiser.DoesNotExist:
         return None
 
+    advertiser.user = user
+    return advertiser
+
+
+def create_access_token(user: models.User) -> str:
+    """ Create Access Token.
+
+    Args:
+        user: An authenticated models.User.
+
+    Returns:
+        A new bearer token. Only its digest is stored.
+    """
+
+    token = secrets.token_urlsafe(32)
+    models.AccessToken.objects.create(user=user, key=_token_digest(token))
+    return token
+
+
+def get_access_token(token: str) -> models.AccessToken:
+    """ Get Access Token.
+
+    Args:
+        token: A bearer token.
+
+    Returns:
+        The models.AccessToken, with its user loaded, or None if it does not
+        exist, was revoked or expired after settings.ACCESS_TOKEN_TTL
+        seconds.
+    """
+
+    issued_after = timezone.now() - datetime.timedelta(
+        seconds=settings.ACCESS_TOKEN_TTL
+    )
+    try:
+        return models.AccessToken.objects.select_related("user").get(
+            key=_token_digest(token), created_at__gt=issued_after
+        )
+    except models.AccessToken.DoesNotExist:
+        return None
+
+
+def revoke_access_token(token: str) -> bool:
+    """ Revoke Access Token.
+
+    Args:
+        token: A bearer token.
+
+    Returns:
+        True if the token existed.
+    """
+
+    deleted, _ = models.AccessToken.objects.filter(
+        key=_token_digest(token)
+    ).delete()
+    return bool(deleted)
+
+
+def _token_digest(token: str) -> str:
+    # Tokens are long and random, a fast hash is enough to store them.
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
 
-def user_login(request, username: str, password: str) -> models.User:
+
+def user_login(request, user: models.User) -> models.User:
     """ User Login.
 
     Args:
         request: A request.
-        username: A username.
-        password: A password.
+        user: A models.User, already authenticated or just created. The
+        password is not checked again.
 
     Returns:
         A models.User.
     """
 
-    user = auth.authenticate(request, username=username, password=password)
-    if not user:
-        return None
-
     auth.login(request, user)
     return user
 
 
 def user_logout(request):
     return auth.logout(request)
+
+
+def prune_sessions(batch_size: int) -> int:
+    """ Prune Sessions.
+
+    Deletes expired sessions `batch_size` rows at a time, each batch in
+    its own transaction, so the table is never locked for long.
+
+    Args:
+        batch_size: Sessions deleted per batch.
+
+    Returns:
+        Number of sessions deleted.
+    """
+
+    now = timezone.now()
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            keys = list(
+                Session.objects.filter(expire_date__lt=now).values_list(
+                    "session_key", flat=True
+                )[:batch_size]
+            )
+            if not keys:
+                return deleted
+            Session.objects.filter(session_key__in=keys).delete()
+        deleted += len(keys)
@@ -0,0 +1,243 @@
+""" Slow Log
+
+This module is responsible to log the queries slower than
+settings.SLOW_QUERY_THRESHOLD_MS, with the shape of their parameters, the
+services function that ran them and, for a sample of them, their query
+plan. The entries are JSON lines written by the "commerce.slowlog" logger,
+which settings.LOGGING sends to a file reopened whenever it is rotated
+outside of the process (WatchedFileHandler), and summarize ranks them.
+"""
+
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import typing
+
+from django.conf import settings
+from django.utils import timezone
+
+
+logger = logging.getLogger("commerce.slowlog")
+
+SERVICES_MODULE = "commerce.services"
+
+# Placeholders of an IN list, whatever its length, summarized as one.
+_PLACEHOLDERS = re.compile(r"%s(?:\s*,\s*%s)+")
+
+# Parameter types logged per query, the rest are only counted.
+PARAMS_LIMIT = 20
+
+_state = threading.local()
+
+
+def install(sender, connection, **kwargs):
+    """ Install.
+
+    Receiver of the connection_created signal, adds execute_wrapper to the
+    connection once.
+
+    Args:
+        sender: Database wrapper class.
+        connection: The new database wrapper.
+    """
+
+    if not settings.SLOW_QUERY_LOG_ENABLED:
+        return
+    if execute_wrapper in connection.execute_wrappers:
+        return
+
+    # First, so that connection.execute_wrapper, which pops the last one,
+    # keeps working when the connection is opened inside of it.
+    connection.execute_wrappers.insert(0, execute_wrapper)
+
+
+def execute_wrapper(execute, sql, params, many, context):
+    """ Execute Wrapper.
+
+    Times the query and logs it when slower than the threshold.
+    """
+
+    if getattr(_state, "explaining", False):
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        milliseconds = (time.perf_counter() - started) * 1000
+        if milliseconds >= settings.SLOW_QUERY_THRESHOLD_MS:
+            _log(sql, params, many, context, milliseconds)
+
+
+def _log(sql, params, many, context, milliseconds):
+    connection = context["connection"]
+    entry = {
+        "time": timezone.now().isoformat(),
+        "alias": connection.alias,
+        "duration_ms": round(milliseconds, 3),
+        "sql": sql,
+        "params": describe(params, many),
+        "many": many,
+        "caller": caller(),
+        "plan": None,
+    }
+    if random.random() < settings.SLOW_QUERY_EXPLAIN_SAMPLE_RATE:
+        entry["plan"] = explain(connection, sql, params, many)
+    logger.info(json.dumps(entry, default=str))
+
+
+def describe(params, many: bool) -> dict:
+    """ Describe.
+
+    Parameters hold password hashes, session data and tokens, and bulk
+    inserts thousands of them, so only their shape is logged.
+
+    Args:
+        params: The query parameters, a sequence or a mapping, or for
+            executemany a sequence of them.
+        many: Whether it was an executemany.
+
+    Returns:
+        A dict with the parameter "count" and the "types" of the first
+        PARAMS_LIMIT of them. For executemany, the number of "rows" too,
+        the others describing the first row.
+    """
+
+    description = {}
+    if many:
+        rows = params if isinstance(params, (list, tuple)) else []
+        description["rows"] = len(rows)
+        params = rows[0] if rows else ()
+    if isinstance(params, dict):
+        params = list(params.values())
+    params = params or ()
+    description["count"] = len(params)
+    description["types"] = [
+        type(param).__name__ for param in params[:PARAMS_LIMIT]
+    ]
+    return description
+
+
+def caller() -> typing.Optional[str]:
+    """ Caller.
+
+    Returns:
+        The innermost services function in the stack, e.g.
+        "services.list_orders", or None if the query ran elsewhere.
+    """
+
+    frame = sys._getframe(1)
+    while frame is not None:
+        if frame.f_globals.get("__name__") == SERVICES_MODULE:
+            return f"services.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+def explain(connection, sql: str, params, many: bool) -> typing.List[str]:
+    """ Explain.
+
+    Args:
+        connection: Database wrapper that ran the query.
+        sql: The query.
+        params: Its parameters.
+        many: Whether it was an executemany.
+
+    Returns:
+        The query plan lines, or None if the query is not a SELECT or the
+        plan could not be read.
+    """
+
+    if many or not sql.lstrip().upper().startswith("SELECT"):
+        return None
+
+    prefix = (
+        "EXPLAIN QUERY PLAN" if connection.vendor == "sqlite" else "EXPLAIN"
+    )
+    _state.explaining = True
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f"{prefix} {sql}", params)
+            return [str(row[-1]) for row in cursor.fetchall()]
+    except Exception:
+        logger.debug("Could not explain %s", sql, exc_info=True)
+        return None
+    finally:
+        _state.explaining = False
+
+
+def read_entries(path: str) -> typing.Iterator[dict]:
+    """ Read Entries.
+
+    Args:
+        path: The log file. Its rotated files, path.1, path.2..., are read
+            too.
+
+    Returns:
+        The logged entries, oldest file first. Lines that are not entries
+        are skipped.
+    """
+
+    directory, name = os.path.split(os.path.abspath(path))
+    rotated = re.compile(rf"^{re.escape(name)}(?:\.(\d+))?$")
+    files = []
+    for filename in os.listdir(directory) if os.path.isdir(directory) else []:
+        match = rotated.match(filename)
+        if match:
+            files.append((int(match.group(1) or 0), filename))
+
+    for _, filename in sorted(files, reverse=True):
+        with open(os.path.join(directory, filename)) as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(entry, dict) and "sql" in entry:
+                    yield entry
+
+
+def summarize(entries: typing.Iterable[dict]) -> typing.List[dict]:
+    """ Summarize.
+
+    Args:
+        entries: Logged entries.
+
+    Returns:
+        One row per query, with IN lists of any length taken as the same
+        query: its count, total, mean and max milliseconds, callers and
+        latest plan, slowest total first.
+    """
+
+    queries = {}
+    for entry in entries:
+        sql = _PLACEHOLDERS.sub("%s, ...", entry["sql"])
+        query = queries.setdefault(
+            sql,
+            {
+                "sql": sql,
+                "count": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "callers": set(),
+                "plan": None,
+            },
+        )
+        query["count"] += 1
+        query["total_ms"] += entry["duration_ms"]
+        query["max_ms"] = max(query["max_ms"], entry["duration_ms"])
+        if entry.get("caller"):
+            query["callers"].add(entry["caller"])
+        if entry.get("plan"):
+            query["plan"] = entry["plan"]
+
+    rows = sorted(queries.values(), key=lambda q: q["total_ms"], reverse=True)
+    for row in rows:
+        row["mean_ms"] = row["total_ms"] / row["count"]
+        row["callers"] = sorted(row["callers"])
+    return rows
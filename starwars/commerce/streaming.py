@@ -0,0 +1,94 @@
+""" Streaming
+
+This module is responsible to stream large API lists as newline delimited
+JSON, so memory use does not grow with the number of rows.
+"""
+
+import json
+
+from django import http
+
+from rest_framework import renderers
+from rest_framework.utils import encoders
+
+
+class NDJSONRenderer(renderers.BaseRenderer):
+    """ NDJSON Renderer
+
+    Selected by `Accept: application/x-ndjson` or `?format=ndjson`.
+    Lists render one JSON document per line.
+    """
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        if not isinstance(data, list):
+            data = [data]
+
+        return b"".join(_dump_line(item) for item in data)
+
+
+def is_requested(request) -> bool:
+    """ Is Requested.
+
+    Args:
+        request: Request already negotiated by the view.
+
+    Returns:
+        True if the client asked for a streamed NDJSON response.
+    """
+
+    renderer = getattr(request, "accepted_renderer", None)
+    return renderer is not None and renderer.format == NDJSONRenderer.format
+
+
+def stream_queryset(
+    queryset, serializer_class, chunk_size: int
+) -> http.StreamingHttpResponse:
+    """ Stream Queryset.
+
+    Args:
+        queryset: A queryset, already ordered.
+        serializer_class: Serializer used for every row.
+        chunk_size: Rows fetched and serialized at a time.
+
+    Returns:
+        A http.StreamingHttpResponse yielding one JSON line per row.
+    """
+
+    return http.StreamingHttpResponse(
+        _iter_lines(queryset, serializer_class, chunk_size),
+        content_type=NDJSONRenderer.media_type,
+    )
+
+
+def _iter_lines(queryset, serializer_class, chunk_size: int):
+    chunk = []
+    for instance in queryset.iterator(chunk_size=chunk_size):
+        chunk.append(instance)
+        if len(chunk) >= chunk_size:
+            yield _dump_chunk(chunk, serializer_class)
+            chunk = []
+
+    if chunk:
+        yield _dump_chunk(chunk, serializer_class)
+
+
+def _dump_chunk(chunk, serializer_class) -> bytes:
+    serializer = serializer_class(chunk, many=True)
+    return b"".join(_dump_line(item) for item in serializer.data)
+
+
+def _dump_line(item) -> bytes:
+    line = json.dumps(
+        item,
+        cls=encoders.JSONEncoder,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return line.encode("utf-8") + b"\n"
@@ -0,0 +1,25 @@
+import shutil
+import tempfile
+
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """ Test Runner
+
+    Points settings.METRICS_DIR at a directory of its own, removed at the
+    end, so test runs leave no metrics files behind nor read those of a
+    server running on the same machine.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.metrics_dir = tempfile.mkdtemp(prefix="starwars-metrics-")
+        self.metrics_settings = override_settings(METRICS_DIR=self.metrics_dir)
+        self.metrics_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.metrics_settings.disable()
+        shutil.rmtree(self.metrics_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
@@ -112,7 +112,7 @@ class TestAdministrador(APITestCase):
                 "status": order2.status,
             },
         ]
-        self.assertEqual(response.json(), expected_value)
+        self.assertEqual(response.json()["results"], expected_value)
 
     def test_delete_order(self):
         advertiser = test_util.create_fake_advertiser()
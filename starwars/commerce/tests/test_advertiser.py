@@ -1,5 +1,12 @@
+import io
+import json
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import hashers
+from django.core import management
 from rest_framework.test import APITestCase
-from commerce import models
+from commerce import models, services
 
 from . import test_util
 
@@ -40,6 +47,22 @@ class TestCreateAdvertiser(TestAdvertiserBase):
         }
         self.assertEqual(response.json(), expected_value)
 
+    def test_hashes_password_once(self):
+        with mock.patch.object(
+            hashers.PBKDF2PasswordHasher,
+            "encode",
+            autospec=True,
+            side_effect=hashers.PBKDF2PasswordHasher.encode,
+        ) as encode, mock.patch.object(
+            hashers.PBKDF2PasswordHasher, "verify", autospec=True
+        ) as verify:
+            response = self.client.post(
+                "/advertiser/", self.data, format="json"
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(encode.call_count, 1)
+        verify.assert_not_called()
+
     def test_allow_login_after_creation(self):
         self.client.post("/advertiser/", self.data, format="json")
 
@@ -77,3 +100,71 @@ class TestReadAdvertiser(TestAdvertiserBase):
         test_util.create_fake_advertiser()
         response = self.client.get("/advertiser/", {}, format="json")
         self.assertEqual(response.status_code, 302)
+
+
+class TestProvisionAdvertisers(TestAdvertiserBase):
+    def _data_list(self, size):
+        return [
+            {
+                "user": {
+                    "username": f"FakeUsername{index}",
+                    "password": f"FakePassword{index}",
+                    "email": "fake@email.com",
+                },
+                "phone": "Fake Phone",
+            }
+            for index in range(size)
+        ]
+
+    def _provision(self, data_list, *args):
+        with tempfile.NamedTemporaryFile("w", suffix=".json") as file:
+            json.dump(data_list, file)
+            file.flush()
+            stdout = io.StringIO()
+            management.call_command(
+                "provision_advertisers", file.name, *args, stdout=stdout
+            )
+        return stdout.getvalue()
+
+    def test_saves_on_db(self):
+        output = self._provision(self._data_list(3), "--workers", "1")
+
+        self.assertEqual(output.strip(), "Created 3 advertisers.")
+        self.assertEqual(models.Advertiser.objects.count(), 3)
+        advertiser = models.Advertiser.objects.get(
+            user__username="FakeUsername2"
+        )
+        self.assertEqual(advertiser.phone, "Fake Phone")
+        self.assertEqual(advertiser.user.email, "fake@email.com")
+
+    def test_allows_login(self):
+        self._provision(self._data_list(2), "--workers", "2")
+
+        for index in range(2):
+            self.assertTrue(
+                self.client.login(
+                    username=f"FakeUsername{index}",
+                    password=f"FakePassword{index}",
+                )
+            )
+
+    def test_does_not_verify_passwords(self):
+        with mock.patch.object(
+            hashers.PBKDF2PasswordHasher, "verify", autospec=True
+        ) as verify:
+            services.bulk_create_advertisers(self._data_list(3))
+        verify.assert_not_called()
+
+    def test_rejects_repeated_usernames(self):
+        data_list = self._data_list(2) + self._data_list(1)
+
+        with self.assertRaises(management.CommandError):
+            self._provision(data_list)
+        self.assertEqual(models.Advertiser.objects.count(), 0)
+
+    def test_rejects_existing_usernames(self):
+        self.client.post("/advertiser/", self.data, format="json")
+
+        with self.assertRaises(management.CommandError):
+            self._provision([self.data])
+        self.assertEqual(models.Advertiser.objects.count(), 1)
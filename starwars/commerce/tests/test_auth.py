@@ -1,4 +1,18 @@
+import base64
+import datetime
+import io
+import time
+import unittest
+import uuid
+from unittest import mock
+
+from django.contrib.auth import hashers
+from django.contrib.sessions.models import Session
+from django.core import management
+from django.test import override_settings
+from django.utils import timezone
 from rest_framework.test import APITestCase
+from commerce import authentication, models
 
 from . import test_util
 
@@ -29,6 +43,20 @@ class TestLogin(APITestCase):
         response = self.client.post("/user-auth/", self.data, format="json")
         self.assertEqual(response.status_code, 400)
 
+    def test_checks_password_once(self):
+        verify = hashers.PBKDF2PasswordHasher.verify
+        with mock.patch.object(
+            hashers.PBKDF2PasswordHasher,
+            "verify",
+            autospec=True,
+            side_effect=verify,
+        ) as patched_verify:
+            response = self.client.post(
+                "/user-auth/", self.data, format="json"
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(patched_verify.call_count, 1)
+
 
 class TestLogout(APITestCase):
     def test_returns_204(self):
@@ -52,3 +80,232 @@ class TestLogout(APITestCase):
         self.client.delete("/user-auth/", {}, format="json")
         response = self.client.get("/advertiser/", {}, format="json")
         self.assertEqual(response.status_code, 302)
+
+
+class TestBasicAuthentication(APITestCase):
+    def test_resolves_advertiser(self):
+        advertiser = test_util.create_fake_advertiser()
+        order = test_util.create_fake_order(advertiser_id=advertiser.pk)
+        credentials = base64.b64encode(
+            f"{advertiser.user.username}:FakePassword".encode()
+        ).decode()
+
+        response = self.client.get(
+            f"/order/{order.pk}", HTTP_AUTHORIZATION=f"Basic {credentials}"
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+class TestSessionBackends(APITestCase):
+    def _log_in(self):
+        advertiser = test_util.create_fake_advertiser()
+        self.client.login(
+            username=advertiser.user.username,
+            password=advertiser.user.test_password,
+        )
+
+    def test_db_session_reads_the_session_table(self):
+        self._log_in()
+
+        with self.assertNumQueries(3):
+            response = self.client.get("/advertiser/")
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(
+        SESSION_ENGINE="django.contrib.sessions.backends.cached_db"
+    )
+    def test_cached_db_session_skips_the_session_table(self):
+        self._log_in()
+
+        with self.assertNumQueries(2):
+            response = self.client.get("/advertiser/")
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(
+        SESSION_ENGINE="django.contrib.sessions.backends.signed_cookies"
+    )
+    def test_signed_cookies_session_skips_the_session_table(self):
+        self._log_in()
+
+        with self.assertNumQueries(2):
+            response = self.client.get("/advertiser/")
+        self.assertEqual(response.status_code, 200)
+
+
+class TestPruneSessions(APITestCase):
+    def _create_sessions(self, quantity, expire_date):
+        for _ in range(quantity):
+            Session.objects.create(
+                session_key=str(uuid.uuid4()),
+                session_data="",
+                expire_date=expire_date,
+            )
+
+    def test_deletes_only_expired_sessions(self):
+        now = timezone.now()
+        self._create_sessions(5, now - datetime.timedelta(days=1))
+        self._create_sessions(2, now + datetime.timedelta(days=1))
+
+        stdout = io.StringIO()
+        management.call_command(
+            "prune_sessions", "--batch-size", "2", stdout=stdout
+        )
+
+        self.assertEqual(
+            stdout.getvalue().strip(), "Deleted 5 expired sessions."
+        )
+        self.assertEqual(Session.objects.count(), 2)
+        self.assertFalse(Session.objects.filter(expire_date__lt=now).exists())
+
+
+class TestTokenAuthentication(APITestCase):
+    def setUp(self):
+        authentication.TokenAuthentication.principals.clear()
+        self.advertiser = test_util.create_fake_advertiser()
+        self.order = test_util.create_fake_order(
+            advertiser_id=self.advertiser.pk
+        )
+
+    def _issue_token(self):
+        response = self.client.post(
+            "/user-auth/token/",
+            {
+                "username": self.advertiser.user.username,
+                "password": self.advertiser.user.test_password,
+            },
+            format="json",
+        )
+        return response.json()["token"]
+
+    def test_issue_token_returns_201(self):
+        response = self.client.post(
+            "/user-auth/token/",
+            {
+                "username": self.advertiser.user.username,
+                "password": self.advertiser.user.test_password,
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            response.json()["user"]["id"], self.advertiser.user.pk
+        )
+
+    def test_issue_token_with_invalid_credentials_returns_400(self):
+        response = self.client.post(
+            "/user-auth/token/",
+            {"username": self.advertiser.user.username, "password": "Wrong"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_stores_only_the_token_digest(self):
+        token = self._issue_token()
+        self.assertFalse(models.AccessToken.objects.filter(key=token).exists())
+
+    def test_token_grants_access(self):
+        token = self._issue_token()
+
+        response = self.client.get(
+            f"/order/{self.order.pk}", HTTP_AUTHORIZATION=f"Bearer {token}"
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_cached_token_skips_hashing_and_auth_queries(self):
+        token = self._issue_token()
+        url = f"/order/{self.order.pk}"
+        self.client.get(url, HTTP_AUTHORIZATION=f"Bearer {token}")
+
+        with mock.patch.object(
+            models.User, "check_password"
+        ) as check_password:
+            # Only the order version and the order itself.
+            with self.assertNumQueries(2):
+                response = self.client.get(
+                    url, HTTP_AUTHORIZATION=f"Bearer {token}"
+                )
+        self.assertEqual(response.status_code, 200)
+        check_password.assert_not_called()
+
+    def test_invalid_token_returns_401(self):
+        response = self.client.get(
+            f"/order/{self.order.pk}", HTTP_AUTHORIZATION="Bearer invalid"
+        )
+        self.assertEqual(response.status_code, 401)
+
+    def test_revoked_token_returns_401(self):
+        token = self._issue_token()
+        url = f"/order/{self.order.pk}"
+        self.client.get(url, HTTP_AUTHORIZATION=f"Bearer {token}")
+
+        response = self.client.delete(
+            "/user-auth/token/", HTTP_AUTHORIZATION=f"Bearer {token}"
+        )
+        self.assertEqual(response.status_code, 204)
+
+        response = self.client.get(url, HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.assertEqual(response.status_code, 401)
+
+    def test_revoke_without_token_returns_401(self):
+        response = self.client.delete("/user-auth/token/")
+        self.assertEqual(response.status_code, 401)
+
+    def test_expired_token_returns_401(self):
+        token = self._issue_token()
+        models.AccessToken.objects.update(
+            created_at=timezone.now() - datetime.timedelta(days=2)
+        )
+
+        response = self.client.get(
+            f"/order/{self.order.pk}", HTTP_AUTHORIZATION=f"Bearer {token}"
+        )
+        self.assertEqual(response.status_code, 401)
+
+    def test_cached_token_expires(self):
+        token = self._issue_token()
+        url = f"/order/{self.order.pk}"
+        self.client.get(url, HTTP_AUTHORIZATION=f"Bearer {token}")
+
+        later = timezone.now() + datetime.timedelta(seconds=11)
+        with self.settings(ACCESS_TOKEN_TTL=10):
+            authentication.TokenAuthentication.principals.clear()
+            self.client.get(url, HTTP_AUTHORIZATION=f"Bearer {token}")
+            with mock.patch.object(timezone, "now", return_value=later):
+                response = self.client.get(
+                    url, HTTP_AUTHORIZATION=f"Bearer {token}"
+                )
+        self.assertEqual(response.status_code, 401)
+
+    def test_requests_do_not_share_cached_instances(self):
+        token = self._issue_token()
+        request = mock.Mock()
+        request.META = {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+        auth = authentication.TokenAuthentication()
+
+        first_user, _ = auth.authenticate(request)
+        first_advertiser = request.advertiser
+        first_user.first_name = "Changed"
+        first_advertiser._state.fields_cache["changed"] = first_user
+        second_user, _ = auth.authenticate(request)
+
+        self.assertNotEqual(second_user.first_name, "Changed")
+        self.assertNotIn("changed", request.advertiser._state.fields_cache)
+        self.assertIsNot(second_user._state, first_user._state)
+
+
+class TestTTLCache(unittest.TestCase):
+    def test_entries_expire(self):
+        cache = authentication.TTLCache(ttl=10, maxsize=10)
+        cache.set("key", "value")
+        self.assertEqual(cache.get("key"), "value")
+
+        with mock.patch("time.monotonic", return_value=time.monotonic() + 11):
+            self.assertIsNone(cache.get("key"))
+
+    def test_drops_oldest_entries(self):
+        cache = authentication.TTLCache(ttl=10, maxsize=2)
+        for key in ["a", "b", "c"]:
+            cache.set(key, key)
+
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("c"), "c")
@@ -0,0 +1,62 @@
+import unittest
+
+from rest_framework.test import APITestCase
+
+from commerce import bench, models
+
+
+class TestRunSuite(APITestCase):
+    def test_measures_every_benchmark(self):
+        results = bench.run_suite([20], repeat=2)
+
+        self.assertEqual(list(results), ["20"])
+        self.assertEqual(set(results["20"]), set(bench.SUITE))
+        self.assertEqual(results["20"]["get_order"]["queries"], 1)
+        self.assertGreaterEqual(models.Order.objects.count(), 20)
+
+    def test_reuses_seeded_orders(self):
+        bench.seed_orders(20)
+        bench.seed_orders(30)
+
+        self.assertEqual(models.Order.objects.count(), 30)
+        self.assertEqual(
+            models.Advertiser.objects.count(), bench.SEED_ADVERTISERS
+        )
+
+
+class TestCompare(unittest.TestCase):
+    def setUp(self):
+        self.baseline = {
+            "1000": {"get_order": {"min_seconds": 0.001, "queries": 1}}
+        }
+
+    def _current(self, min_seconds, queries):
+        return {
+            "1000": {
+                "get_order": {"min_seconds": min_seconds, "queries": queries}
+            }
+        }
+
+    def test_accepts_results_within_threshold(self):
+        regressions = bench.compare(
+            self.baseline, self._current(0.0011, 1), threshold=0.2
+        )
+        self.assertEqual(regressions, [])
+
+    def test_flags_slowdowns(self):
+        regressions = bench.compare(
+            self.baseline, self._current(0.0013, 1), threshold=0.2
+        )
+        self.assertEqual(len(regressions), 1)
+        self.assertIn("get_order", regressions[0])
+
+    def test_flags_extra_queries(self):
+        regressions = bench.compare(
+            self.baseline, self._current(0.001, 2), threshold=0.2
+        )
+        self.assertEqual(len(regressions), 1)
+        self.assertIn("queries", regressions[0])
+
+    def test_skips_benchmarks_missing_from_baseline(self):
+        regressions = bench.compare({}, self._current(1, 10), threshold=0.2)
+        self.assertEqual(regressions, [])
@@ -0,0 +1,212 @@
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from commerce import caching
+
+from . import test_util
+
+
+@override_settings(
+    ORDER_CACHE_ENABLED=True,
+    CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "test-order-cache",
+        }
+    },
+)
+class TestOrderCache(APITestCase):
+    """ Reads served from the cache skip all queries but the 3 that load
+    the session, the user and the advertiser.
+    """
+
+    def setUp(self):
+        cache.clear()
+        caching.reset_stats()
+
+        self.advertiser = test_util.create_fake_advertiser()
+        self.client.login(
+            username=self.advertiser.user.username,
+            password=self.advertiser.user.test_password,
+        )
+        self.order = test_util.create_fake_order(
+            advertiser_id=self.advertiser.pk
+        )
+
+    def test_detail_is_cached(self):
+        url = f"/order/{self.order.pk}"
+        first = self.client.get(url)
+
+        with self.assertNumQueries(3):
+            second = self.client.get(url)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second["ETag"], first["ETag"])
+        self.assertEqual(caching.stats(), {"hits": 1, "misses": 1})
+
+    def test_detail_not_modified_from_cache(self):
+        url = f"/order/{self.order.pk}"
+        etag = self.client.get(url)["ETag"]
+
+        with self.assertNumQueries(3):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_update_invalidates_detail(self):
+        url = f"/order/{self.order.pk}"
+        self.client.get(url)
+
+        self.client.patch(url, {"status": "finished"}, format="json")
+
+        response = self.client.get(url)
+        self.assertEqual(response.json()["status"], "finished")
+
+    def test_delete_invalidates_detail(self):
+        url = f"/order/{self.order.pk}"
+        self.client.get(url)
+
+        self.client.delete(url)
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 404)
+
+    def test_not_found_is_cached(self):
+        url = f"/order/{self.order.pk + 100}"
+        self.client.get(url)
+
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 404)
+
+    def test_list_is_cached(self):
+        self.client.get("/order/")
+
+        with self.assertNumQueries(3):
+            response = self.client.get("/order/")
+        self.assertEqual(len(response.json()["results"]), 1)
+
+    def test_create_invalidates_list(self):
+        self.client.get("/order/")
+
+        data = {
+            "item": {"name": "engine", "description": "engine c3po"},
+            "shipping_address": {"state": "SP"},
+        }
+        self.client.post("/order/", data, format="json")
+
+        response = self.client.get("/order/")
+        self.assertEqual(len(response.json()["results"]), 2)
+
+    def test_bulk_finish_invalidates_list(self):
+        self.client.get("/order/")
+
+        self.client.post(
+            "/order/bulk/finish/", {"ids": [self.order.pk]}, format="json"
+        )
+
+        response = self.client.get("/order/")
+        self.assertEqual(response.json()["results"][0]["status"], "finished")
+
+    def test_list_pages_are_cached_apart(self):
+        test_util.create_fake_order(advertiser_id=self.advertiser.pk)
+        self.client.get("/order/", {"page_size": 1})
+
+        response = self.client.get("/order/")
+        self.assertEqual(len(response.json()["results"]), 2)
+
+    def test_saves_outside_services_invalidate(self):
+        url = f"/order/{self.order.pk}"
+        self.client.get(url)
+        self.client.get("/order/")
+
+        # As the admin does.
+        self.order.status = "finished"
+        self.order.save()
+
+        self.assertEqual(self.client.get(url).json()["status"], "finished")
+        response = self.client.get("/order/")
+        self.assertEqual(response.json()["results"][0]["status"], "finished")
+
+    def test_item_and_address_saves_invalidate(self):
+        url = f"/order/{self.order.pk}"
+        self.client.get(url)
+
+        self.order.item.name = "droid"
+        self.order.item.save()
+        self.assertEqual(self.client.get(url).json()["item"]["name"], "droid")
+
+        self.order.shipping_address.city = "Mos Eisley"
+        self.order.shipping_address.save()
+        response = self.client.get(url)
+        self.assertEqual(
+            response.json()["shipping_address"]["city"], "Mos Eisley"
+        )
+
+    @override_settings(ALLOWED_HOSTS=["testserver", "other.example"])
+    def test_list_pages_are_cached_per_host(self):
+        test_util.create_fake_order(advertiser_id=self.advertiser.pk)
+        self.client.get("/order/", {"page_size": 1})
+
+        response = self.client.get(
+            "/order/", {"page_size": 1}, HTTP_HOST="other.example"
+        )
+        self.assertTrue(
+            response.json()["next"].startswith("http://other.example/")
+        )
+
+    def test_superuser_list_invalidated_by_advertiser_write(self):
+        admin = test_util.create_fake_advertiser()
+        admin.user.is_superuser = True
+        admin.user.save()
+        self.client.login(
+            username=admin.user.username, password=admin.user.test_password
+        )
+        self.client.get("/order/")
+
+        self.client.login(
+            username=self.advertiser.user.username,
+            password=self.advertiser.user.test_password,
+        )
+        self.client.patch(
+            f"/order/{self.order.pk}", {"status": "finished"}, format="json"
+        )
+
+        self.client.login(
+            username=admin.user.username, password=admin.user.test_password
+        )
+        response = self.client.get("/order/")
+        self.assertEqual(response.json()["results"][0]["status"], "finished")
+
+    def test_advertisers_do_not_share_entries(self):
+        self.client.get(f"/order/{self.order.pk}")
+
+        other = test_util.create_fake_advertiser()
+        self.client.login(
+            username=other.user.username, password=other.user.test_password
+        )
+        response = self.client.get(f"/order/{self.order.pk}")
+        self.assertEqual(response.status_code, 404)
+
+
+class TestOrderCacheStats(APITestCase):
+    def test_admin_reads_stats(self):
+        admin = test_util.create_fake_advertiser()
+        admin.user.is_staff = True
+        admin.user.save()
+        self.client.login(
+            username=admin.user.username, password=admin.user.test_password
+        )
+
+        response = self.client.get("/order/cache/stats/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()), {"enabled", "hits", "misses"})
+
+    def test_advertiser_is_forbidden(self):
+        advertiser = test_util.create_fake_advertiser()
+        self.client.login(
+            username=advertiser.user.username,
+            password=advertiser.user.test_password,
+        )
+
+        response = self.client.get("/order/cache/stats/")
+        self.assertEqual(response.status_code, 403)
@@ -0,0 +1,212 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from django.conf import settings
+from django.core import management
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.db import utils
+from django.test import override_settings
+
+from commerce import db, listings, models, services
+
+from . import test_util
+
+
+class TestSQLiteTuning(unittest.TestCase):
+    writers = 4
+    writes = 50
+    readers = 4
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        database = dict(
+            settings.DATABASES["default"],
+            NAME=os.path.join(self.directory, "stress.sqlite3"),
+        )
+        self.connections = utils.ConnectionHandler({"default": database})
+
+        with self.connections["default"].cursor() as cursor:
+            cursor.execute(
+                "CREATE TABLE stress (id INTEGER PRIMARY KEY, value TEXT)"
+            )
+        self.connections["default"].close()
+
+    def tearDown(self):
+        self.connections.close_all()
+        shutil.rmtree(self.directory)
+
+    def _pragma(self, name):
+        with self.connections["default"].cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+
+    def test_applies_pragmas(self):
+        self.assertEqual(self._pragma("journal_mode"), "wal")
+        # 0 off, 1 normal, 2 full, 3 extra.
+        self.assertEqual(self._pragma("synchronous"), 1)
+        self.assertEqual(
+            self._pragma("cache_size"), settings.SQLITE_CACHE_SIZE
+        )
+        self.assertEqual(
+            self._pragma("busy_timeout"),
+            settings.DATABASES["default"]["OPTIONS"]["timeout"] * 1000,
+        )
+
+    def test_rejects_unknown_journal_mode(self):
+        with override_settings(SQLITE_JOURNAL_MODE="fast"):
+            with self.assertRaises(ImproperlyConfigured):
+                db.sqlite_pragmas()
+
+    def test_mixed_readers_and_writers_make_progress(self):
+        errors = []
+        reads = []
+        writing = threading.Event()
+        writing.set()
+
+        def write(writer):
+            try:
+                for index in range(self.writes):
+                    with self.connections["default"].cursor() as cursor:
+                        cursor.execute(
+                            "INSERT INTO stress (value) VALUES (%s)",
+                            [f"{writer}-{index}"],
+                        )
+            except Exception as error:
+                errors.append(error)
+            finally:
+                self.connections.close_all()
+
+        def read():
+            count = 0
+            try:
+                while writing.is_set():
+                    with self.connections["default"].cursor() as cursor:
+                        cursor.execute("SELECT COUNT(*) FROM stress")
+                        cursor.fetchone()
+                    count += 1
+            except Exception as error:
+                errors.append(error)
+            finally:
+                reads.append(count)
+                self.connections.close_all()
+
+        writer_threads = [
+            threading.Thread(target=write, args=(writer,))
+            for writer in range(self.writers)
+        ]
+        reader_threads = [
+            threading.Thread(target=read) for _ in range(self.readers)
+        ]
+        for thread in reader_threads + writer_threads:
+            thread.start()
+        for thread in writer_threads:
+            thread.join()
+        writing.clear()
+        for thread in reader_threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertTrue(all(reads))
+        with self.connections["default"].cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM stress")
+            self.assertEqual(cursor.fetchone()[0], self.writers * self.writes)
+
+
+class TestServicesUnderConcurrency(unittest.TestCase):
+    """ Runs the write services from several threads against a database
+    file, as concurrent requests do. The test database is in memory, so
+    the "default" alias points at the file for the threads started here.
+    """
+
+    workers = 4
+    rounds = 10
+    orders = 5
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.databases = connections.databases["default"]
+        connections.databases["default"] = dict(
+            self.databases,
+            NAME=os.path.join(self.directory, "services.sqlite3"),
+        )
+        self._run(management.call_command, "migrate", verbosity=0)
+        self.advertisers = [
+            self._run(test_util.create_fake_advertiser)
+            for _ in range(self.workers)
+        ]
+
+    def tearDown(self):
+        connections.databases["default"] = self.databases
+        shutil.rmtree(self.directory)
+
+    def _run(self, function, *args, **kwargs):
+        # Threads have their own connections, to the database file.
+        results = []
+
+        def target():
+            try:
+                results.append(function(*args, **kwargs))
+            finally:
+                connections.close_all()
+
+        thread = threading.Thread(target=target)
+        thread.start()
+        thread.join()
+        return results[0]
+
+    def test_bulk_create_and_finish_orders(self):
+        errors = []
+        created = []
+        start = threading.Barrier(self.workers)
+
+        def work(advertiser):
+            try:
+                start.wait()
+                for index in range(self.rounds):
+                    orders = services.bulk_create_orders(
+                        [test_util.fake_order_data("SP")] * self.orders,
+                        advertiser,
+                    )
+                    created.extend(order.pk for order in orders)
+                    if index % 2:
+                        services.finish_orders(
+                            advertiser, ids=[order.pk for order in orders]
+                        )
+                    else:
+                        services.finish_orders(
+                            advertiser,
+                            filters={"shipping_address__state": "SP"},
+                        )
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connections.close_all()
+
+        threads = [
+            threading.Thread(target=work, args=(advertiser,))
+            for advertiser in self.advertisers
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        total = self.workers * self.rounds * self.orders
+        self.assertEqual(len(set(created)), total)
+        self.assertEqual(self._run(self._statuses), {"finished": total})
+        self.assertEqual(self._run(test_util.rollup_drift), {})
+        self.assertEqual(
+            self._run(listings.check),
+            {"missing": [], "stale": [], "orphaned": []},
+        )
+
+    def _statuses(self):
+        statuses = {}
+        for order in models.Order.objects.all():
+            statuses[order.status] = statuses.get(order.status, 0) + 1
+        return statuses
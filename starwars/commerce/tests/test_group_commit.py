@@ -0,0 +1,160 @@
+import threading
+from unittest import mock
+
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from rest_framework.test import APITestCase
+
+from commerce import group_commit, models
+
+from . import test_util
+
+
+class TestGroupCommitter(TransactionTestCase):
+    def _submit_concurrently(self, committer, funcs):
+        results = [None] * len(funcs)
+        errors = [None] * len(funcs)
+
+        def submit(index, func):
+            try:
+                results[index] = committer.submit(func, index)
+            except Exception as error:
+                errors[index] = error
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=submit, args=(index, func))
+            for index, func in enumerate(funcs)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results, errors
+
+    def _create_item(self, index):
+        return models.Item.objects.create(
+            name=f"item {index}", description="xyz"
+        ).pk
+
+    def _fail(self, index):
+        models.Item.objects.create(name="failed", description="xyz")
+        raise ValueError(index)
+
+    def test_returns_each_result(self):
+        committer = group_commit.GroupCommitter(window=0.05, max_batch=4)
+
+        results, errors = self._submit_concurrently(
+            committer, [self._create_item] * 10
+        )
+
+        self.assertEqual(errors, [None] * 10)
+        self.assertEqual(
+            [models.Item.objects.get(pk=pk).name for pk in results],
+            [f"item {index}" for index in range(10)],
+        )
+
+    def test_shares_commits(self):
+        committer = group_commit.GroupCommitter(window=1, max_batch=8)
+
+        with mock.patch.object(
+            committer, "_commit", wraps=committer._commit
+        ) as commit:
+            self._submit_concurrently(committer, [self._create_item] * 8)
+
+        self.assertEqual(models.Item.objects.count(), 8)
+        self.assertLess(commit.call_count, 8)
+
+    def test_isolates_failures(self):
+        committer = group_commit.GroupCommitter(window=0.05, max_batch=8)
+
+        results, errors = self._submit_concurrently(
+            committer, [self._create_item, self._fail, self._create_item]
+        )
+
+        self.assertIsInstance(errors[1], ValueError)
+        self.assertEqual(errors[0], None)
+        self.assertEqual(errors[2], None)
+        self.assertEqual(models.Item.objects.count(), 2)
+        self.assertFalse(models.Item.objects.filter(name="failed").exists())
+
+    def test_follower_times_out(self):
+        committer = group_commit.GroupCommitter(
+            window=0, max_batch=8, timeout=0.1
+        )
+        release = threading.Event()
+
+        def block(index):
+            release.wait(5)
+            return self._create_item(index)
+
+        def lead():
+            try:
+                committer.submit(block, 0)
+            finally:
+                connection.close()
+
+        leader = threading.Thread(target=lead)
+        leader.start()
+        while not committer._leading:
+            pass
+
+        with self.assertRaises(TimeoutError):
+            committer.submit(self._create_item, 1)
+        release.set()
+        leader.join()
+
+        self.assertEqual(
+            list(models.Item.objects.values_list("name", flat=True)),
+            ["item 0"],
+        )
+        self.assertFalse(committer._pending)
+        self.assertIsNotNone(committer.submit(self._create_item, 2))
+
+    def test_failing_leader_wakes_its_followers(self):
+        committer = group_commit.GroupCommitter(
+            window=5, max_batch=2, timeout=5
+        )
+
+        with mock.patch.object(
+            committer, "_commit", side_effect=RuntimeError("lost")
+        ):
+            results, errors = self._submit_concurrently(
+                committer, [self._create_item] * 2
+            )
+
+        self.assertEqual(results, [None, None])
+        self.assertEqual([str(error) for error in errors], ["lost", "lost"])
+        self.assertFalse(committer._leading)
+
+
+@override_settings(
+    ORDER_GROUP_COMMIT_ENABLED=True, ORDER_GROUP_COMMIT_WINDOW=0
+)
+class TestCreateOrderGroupCommit(APITestCase):
+    def test_saves_on_db(self):
+        advertiser = test_util.create_fake_advertiser()
+        self.client.login(
+            username=advertiser.user.username,
+            password=advertiser.user.test_password,
+        )
+        data = {
+            "item": {"name": "engine", "description": "engine c3po"},
+            "shipping_address": {
+                "state": "SP",
+                "address": "Fake Address",
+                "neighborhood": "Fake Neighborhood",
+                "number": "111",
+                "complement": "Fake Complement",
+                "city": "Fake City",
+                "cep": "Fake Cep",
+            },
+        }
+
+        response = self.client.post("/order/", data, format="json")
+
+        self.assertEqual(response.status_code, 201)
+        order = models.Order.objects.get(pk=response.json()["id"])
+        self.assertEqual(order.advertiser_id, advertiser.pk)
+        self.assertEqual(order.item.name, "engine")
@@ -0,0 +1,251 @@
+import io
+import random
+from unittest import mock
+
+from django.core import management
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from commerce import listings, models, seeding, services
+
+from . import test_util
+
+
+@override_settings(ORDER_LISTING_ENABLED=True)
+class ListingTestCase(test_util.InStepAssertions, APITestCase):
+    def setUp(self):
+        self.advertiser = test_util.create_fake_advertiser()
+        self.client.login(
+            username=self.advertiser.user.username,
+            password=self.advertiser.user.test_password,
+        )
+
+    def _create(self, state="SP", cep="01000-000"):
+        response = self.client.post(
+            "/order/", test_util.fake_order_data(state, cep), format="json"
+        )
+        return response.json()["id"]
+
+
+class TestListingMaintenance(ListingTestCase):
+    def test_adds_created_orders(self):
+        order_id = self._create("RJ")
+
+        listing = models.OrderListing.objects.get()
+        self.assertEqual(listing.pk, order_id)
+        self.assertEqual(listing.state, "RJ")
+        self.assertEqual(listing.item_name, "engine")
+        self.assertInStep()
+
+    def test_adds_bulk_created_orders(self):
+        self.client.post(
+            "/order/bulk/",
+            [test_util.fake_order_data("SP"), test_util.fake_order_data("BA")],
+            format="json",
+        )
+
+        self.assertEqual(models.OrderListing.objects.count(), 2)
+        self.assertInStep()
+
+    def test_saves_updated_orders(self):
+        order_id = self._create("SP")
+
+        self.client.put(
+            f"/order/{order_id}",
+            test_util.fake_order_data("MG"),
+            format="json",
+        )
+        self.client.patch(
+            f"/order/{order_id}", {"status": "finished"}, format="json"
+        )
+
+        listing = models.OrderListing.objects.get()
+        self.assertEqual(listing.state, "MG")
+        self.assertEqual(listing.status, models.Order.STATUS_FINISHED)
+        self.assertInStep()
+
+    def test_updates_finished_orders(self):
+        order_ids = [self._create() for _ in range(3)]
+
+        self.client.post(
+            "/order/bulk/finish/", {"ids": order_ids[:2]}, format="json"
+        )
+
+        finished = models.OrderListing.objects.filter(
+            status=models.Order.STATUS_FINISHED
+        )
+        self.assertEqual(
+            sorted(finished.values_list("pk", flat=True)), order_ids[:2]
+        )
+        self.assertInStep()
+
+    def test_removes_deleted_orders(self):
+        order_id = self._create()
+        self._create()
+
+        self.client.delete(f"/order/{order_id}")
+
+        self.assertFalse(models.OrderListing.objects.filter(pk=order_id))
+        self.assertInStep()
+
+    def test_rolls_back_the_order_with_its_listing(self):
+        order = services.create_order(
+            test_util.fake_order_data(), self.advertiser
+        )
+        with mock.patch.object(listings, "save", side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                services.update_order(order, {"item": {"name": "droid"}})
+
+        self.assertEqual(models.Item.objects.get().name, "engine")
+        self.assertInStep()
+
+    def test_copies_seeded_orders(self):
+        seeding.seed_orders(
+            [self.advertiser.pk], 300, batch_size=100, rng=random.Random(1)
+        )
+
+        self.assertEqual(models.OrderListing.objects.count(), 300)
+        self.assertInStep()
+
+    @override_settings(ORDER_LISTING_ENABLED=False)
+    def test_keeps_listings_when_disabled(self):
+        order_id = self._create()
+        self.client.patch(
+            f"/order/{order_id}", {"status": "finished"}, format="json"
+        )
+
+        self.assertEqual(models.OrderListing.objects.get().pk, order_id)
+        self.assertInStep()
+
+    def test_migration_copies_existing_orders(self):
+        self._create()
+        test_util.create_fake_order(advertiser_id=self.advertiser.pk)
+        models.OrderListing.objects.update(city="Elsewhere")
+
+        test_util.run_data_migration("0008_backfill_order_listings")
+
+        self.assertInStep(rollup_table=False)
+
+
+class TestListingCommands(ListingTestCase):
+    def test_check_reports_problems(self):
+        missing = test_util.create_fake_order(advertiser_id=self.advertiser.pk)
+        stale = self._create()
+        models.OrderListing.objects.filter(pk=stale).update(city="Elsewhere")
+
+        stdout = io.StringIO()
+        with self.assertRaises(management.CommandError):
+            management.call_command("check_order_listings", stdout=stdout)
+
+        self.assertIn(f"1 missing: {missing.pk}", stdout.getvalue())
+        self.assertIn(f"1 stale: {stale}", stdout.getvalue())
+
+    def test_check_accepts_consistent_listings(self):
+        self._create()
+
+        stdout = io.StringIO()
+        management.call_command("check_order_listings", stdout=stdout)
+
+        self.assertIn("consistent", stdout.getvalue())
+
+    def test_rebuild_copies_every_order(self):
+        self._create()
+        # Written outside of the services, so not listed.
+        test_util.create_fake_order(advertiser_id=self.advertiser.pk)
+        models.OrderListing.objects.update(status="stale")
+
+        stdout = io.StringIO()
+        management.call_command("rebuild_order_listings", stdout=stdout)
+
+        self.assertInStep(rollup_table=False)
+        self.assertIn("Rebuilt 2 order listings.", stdout.getvalue())
+
+
+class TestListOrdersFromListings(ListingTestCase):
+    def test_lists_flattened_orders(self):
+        order_id = self._create("RJ", "20000-000")
+
+        response = self.client.get("/order/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()["results"],
+            [
+                {
+                    "id": order_id,
+                    "item": {"name": "engine"},
+                    "shipping_address": {
+                        "state": "RJ",
+                        "city": "Fake City",
+                        "cep": "20000-000",
+                    },
+                    "status": "open",
+                }
+            ],
+        )
+
+    def test_filters_listings(self):
+        self._create("RJ", "20000-000")
+        sp_order_id = self._create("SP", "01000-000")
+
+        response = self.client.get(
+            "/order/", {"shipping_address__state": "SP", "cep": "01"}
+        )
+
+        results = response.json()["results"]
+        self.assertEqual([order["id"] for order in results], [sp_order_id])
+
+    def test_paginates_listings(self):
+        order_ids = [self._create() for _ in range(3)]
+
+        first = self.client.get("/order/", {"page_size": 2}).json()
+        second = self.client.get(first["next"]).json()
+
+        seen = [order["id"] for order in first["results"] + second["results"]]
+        self.assertEqual(seen, order_ids)
+
+    def test_hides_other_advertisers_orders(self):
+        other = test_util.create_fake_advertiser()
+        services.create_order(test_util.fake_order_data(), other)
+
+        response = self.client.get("/order/")
+
+        self.assertEqual(response.json()["results"], [])
+
+    def test_reads_one_table(self):
+        for _ in range(5):
+            self._create()
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get("/order/")
+
+        self.assertEqual(len(response.json()["results"]), 5)
+        # session, user, advertiser and the page.
+        self.assertEqual(len(context.captured_queries), 4)
+        for query in context.captured_queries:
+            self.assertNotIn("JOIN", query["sql"])
+
+    @override_settings(
+        ORDER_CACHE_ENABLED=True,
+        CACHES={
+            "default": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                "LOCATION": "test-listing-cache",
+            }
+        },
+    )
+    def test_caches_pages_per_table(self):
+        cache.clear()
+        self._create()
+        self.client.get("/order/")
+
+        with self.settings(ORDER_LISTING_ENABLED=False):
+            response = self.client.get("/order/")
+
+        self.assertEqual(
+            response.json()["results"][0]["item"]["description"],
+            "engine c3po",
+        )
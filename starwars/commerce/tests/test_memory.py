@@ -0,0 +1,113 @@
+import json
+import threading
+import unittest
+
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from commerce import bench, memory
+
+from . import test_util
+
+
+class TestTrace(unittest.TestCase):
+    def test_reports_peak_and_sites(self):
+        with memory.trace(top=5) as trace:
+            kept = bytearray(2 * 1024 * 1024)
+
+        # Give or take what the garbage collector freed meanwhile.
+        self.assertGreater(trace.peak_bytes, len(kept) * 0.9)
+        self.assertGreater(trace.allocated_bytes, len(kept) * 0.9)
+        self.assertIn("test_memory.py", trace.live_at_end[0]["site"])
+        self.assertGreaterEqual(trace.live_at_end[0]["size_bytes"], len(kept))
+
+    def test_peak_counts_freed_memory(self):
+        with memory.trace(top=5) as trace:
+            bytearray(2 * 1024 * 1024)
+
+        self.assertGreater(trace.peak_bytes, 1.8 * 1024 * 1024)
+        self.assertLess(trace.allocated_bytes, 1024 * 1024)
+        self.assertFalse(
+            [
+                site
+                for site in trace.live_at_end
+                if site["size_bytes"] > 1024 * 1024
+            ]
+        )
+
+    def test_skips_while_another_trace_runs(self):
+        tracing = threading.Event()
+        done = threading.Event()
+
+        def run():
+            with memory.trace(top=1):
+                tracing.set()
+                done.wait()
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        tracing.wait()
+        try:
+            with memory.trace(top=1, blocking=False) as trace:
+                self.assertIsNone(trace)
+        finally:
+            done.set()
+            thread.join()
+
+
+@override_settings(MEMORY_TRACE_ENABLED=True, MEMORY_TRACE_SAMPLE_RATE=1)
+class TestMemoryTraceMiddleware(APITestCase):
+    def setUp(self):
+        self.advertiser = test_util.create_fake_advertiser()
+        self.client.login(
+            username=self.advertiser.user.username,
+            password=self.advertiser.user.test_password,
+        )
+        test_util.create_fake_order(advertiser_id=self.advertiser.pk)
+
+    def test_logs_traced_requests(self):
+        with self.assertLogs("commerce.memory", "INFO") as logs:
+            self.client.get("/order/")
+
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual(entry["view"], "OrderAPIView")
+        self.assertEqual(entry["status"], 200)
+        self.assertGreater(entry["peak_bytes"], 0)
+        self.assertTrue(entry["live_at_end"])
+
+    @override_settings(MEMORY_TRACE_SAMPLE_RATE=0)
+    def test_samples_requests(self):
+        with self.assertRaises(AssertionError):
+            with self.assertLogs("commerce.memory", "INFO"):
+                self.client.get("/order/")
+
+
+class TestRunMemorySuite(APITestCase):
+    def test_traces_every_benchmark(self):
+        results = bench.run_memory_suite([20], top=3)
+
+        self.assertEqual(set(results["20"]), set(bench.MEMORY_SUITE))
+        for result in results["20"].values():
+            self.assertGreater(result["peak_bytes"], 0)
+            self.assertLessEqual(len(result["live_at_end"]), 3)
+
+
+class TestCompareMemory(unittest.TestCase):
+    def setUp(self):
+        self.baseline = {"1000": {"order_list": {"peak_bytes": 1000}}}
+
+    def _current(self, peak_bytes):
+        return {"1000": {"order_list": {"peak_bytes": peak_bytes}}}
+
+    def test_accepts_peaks_within_threshold(self):
+        regressions = bench.compare_memory(
+            self.baseline, self._current(1100), threshold=0.2
+        )
+        self.assertEqual(regressions, [])
+
+    def test_flags_grown_peaks(self):
+        regressions = bench.compare_memory(
+            self.baseline, self._current(1300), threshold=0.2
+        )
+        self.assertEqual(len(regressions), 1)
+        self.assertIn("order_list", regressions[0])
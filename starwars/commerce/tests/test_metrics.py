@@ -0,0 +1,267 @@
+import fcntl
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from commerce import metrics
+
+from . import test_util
+
+
+class TestMetrics(APITestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.settings = override_settings(
+            METRICS_DIR=self.directory, METRICS_FLUSH_INTERVAL=0
+        )
+        self.settings.enable()
+
+        self.advertiser = test_util.create_fake_advertiser()
+        self.client.login(
+            username=self.advertiser.user.username,
+            password=self.advertiser.user.test_password,
+        )
+        self.order = test_util.create_fake_order(
+            advertiser_id=self.advertiser.pk
+        )
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.directory)
+
+    def _scrape(self):
+        admin = test_util.create_fake_advertiser()
+        admin.user.is_staff = True
+        admin.user.save()
+        self.client.login(
+            username=admin.user.username, password=admin.user.test_password
+        )
+        response = self.client.get("/metrics/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], metrics.CONTENT_TYPE)
+        return response.content.decode()
+
+    def _value(self, text, sample):
+        match = re.search(rf"^{re.escape(sample)} (\S+)$", text, re.M)
+        self.assertIsNotNone(match, sample)
+        return float(match.group(1))
+
+    def test_counts_requests_by_view(self):
+        self.client.get(f"/order/{self.order.pk}")
+        self.client.get(f"/order/{self.order.pk}")
+        self.client.get(f"/order/{self.order.pk + 1}")
+
+        text = self._scrape()
+
+        labels = 'method="GET",status="200",view="OrderAPIView"'
+        self.assertEqual(
+            self._value(text, f"commerce_http_requests_total{{{labels}}}"), 2
+        )
+        labels = 'method="GET",status="404",view="OrderAPIView"'
+        self.assertEqual(
+            self._value(text, f"commerce_http_requests_total{{{labels}}}"), 1
+        )
+
+    def test_observes_latency_and_queries(self):
+        self.client.get(f"/order/{self.order.pk}")
+
+        text = self._scrape()
+
+        labels = 'method="GET",view="OrderAPIView"'
+        self.assertEqual(
+            self._value(
+                text,
+                f"commerce_http_request_duration_seconds_count{{{labels}}}",
+            ),
+            1,
+        )
+        self.assertEqual(
+            self._value(
+                text, f"commerce_http_request_queries_sum{{{labels}}}"
+            ),
+            5,
+        )
+        # Buckets are cumulative: 5 queries fall in le="5.0" and above.
+        self.assertEqual(
+            self._value(
+                text,
+                "commerce_http_request_queries_bucket"
+                f'{{{labels},le="2.0"}}',
+            ),
+            0,
+        )
+        self.assertEqual(
+            self._value(
+                text,
+                "commerce_http_request_queries_bucket"
+                f'{{{labels},le="5.0"}}',
+            ),
+            1,
+        )
+        self.assertEqual(
+            self._value(
+                text,
+                "commerce_http_request_queries_bucket"
+                f'{{{labels},le="+Inf"}}',
+            ),
+            1,
+        )
+
+    def test_labels_unmatched_urls(self):
+        self.client.get("/nowhere/")
+
+        text = self._scrape()
+
+        labels = 'method="GET",status="404",view="unmatched"'
+        self.assertEqual(
+            self._value(text, f"commerce_http_requests_total{{{labels}}}"), 1
+        )
+
+    def test_adds_up_other_processes(self):
+        self.client.get(f"/order/{self.order.pk}")
+        labels = {"method": "GET", "status": "200", "view": "OrderAPIView"}
+        in_flight = {"method": "GET", "view": "OrderAPIView"}
+        for pid, name in ((os.getpid(), "alive"), (2 ** 22 + 1, "dead")):
+            with open(os.path.join(self.directory, f"{name}.json"), "w") as f:
+                json.dump(
+                    {
+                        "pid": pid,
+                        "counters": [
+                            ["commerce_http_requests_total", labels, 10]
+                        ],
+                        "histograms": [],
+                        "gauges": [
+                            ["commerce_http_requests_in_flight", in_flight, 3]
+                        ],
+                    },
+                    f,
+                )
+
+        text = self._scrape()
+
+        sample = (
+            'commerce_http_requests_total{method="GET",status="200",'
+            'view="OrderAPIView"}'
+        )
+        self.assertEqual(self._value(text, sample), 21)
+        # The dead process' requests are not in flight any more.
+        sample = (
+            'commerce_http_requests_in_flight{method="GET",'
+            'view="OrderAPIView"}'
+        )
+        self.assertEqual(self._value(text, sample), 3)
+
+    def _write(self, name, pid, requests, **extra):
+        labels = {"method": "GET", "status": "200", "view": "OrderAPIView"}
+        with open(os.path.join(self.directory, name), "w") as f:
+            json.dump(
+                {
+                    "pid": pid,
+                    "counters": [
+                        ["commerce_http_requests_total", labels, requests]
+                    ],
+                    "histograms": [],
+                    "gauges": [],
+                    **extra,
+                },
+                f,
+            )
+
+    def test_merges_dead_processes(self):
+        sample = (
+            'commerce_http_requests_total{method="GET",status="200",'
+            'view="OrderAPIView"}'
+        )
+        self._write("1-1.json", 2 ** 22 + 1, 10)
+        self._write("2-1.json", 2 ** 22 + 2, 5)
+        self._write("3-1.json", os.getpid(), 1)
+
+        first = self._value(self._scrape(), sample)
+        second = self._value(self._scrape(), sample)
+
+        self.assertEqual(first, second)
+        self.assertEqual(first, 16)
+        files = set(os.listdir(self.directory))
+        self.assertFalse({"1-1.json", "2-1.json"} & files)
+        self.assertTrue({"3-1.json", metrics.ARCHIVE} <= files)
+
+    def test_skips_merged_files_left_behind(self):
+        self._write(metrics.ARCHIVE, None, 10, merged=["1-1.json"])
+        self._write("1-1.json", 2 ** 22 + 1, 10)
+
+        text = metrics.collect(self.directory)
+        self.assertEqual(metrics.compact(self.directory), 1)
+
+        self.assertIn(" 10\n", text)
+        self.assertEqual(metrics.collect(self.directory), text)
+        self.assertFalse(
+            os.path.exists(os.path.join(self.directory, "1-1.json"))
+        )
+
+    def test_collect_waits_for_compact(self):
+        self._write("1-1.json", 2 ** 22 + 1, 10)
+        texts = []
+        with open(os.path.join(self.directory, metrics.LOCK), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            thread = threading.Thread(
+                target=lambda: texts.append(metrics.collect(self.directory))
+            )
+            thread.start()
+            thread.join(0.2)
+
+            self.assertTrue(thread.is_alive())
+        thread.join()
+
+        self.assertEqual(len(texts), 1)
+
+    def test_describes_every_metric(self):
+        text = self._scrape()
+
+        for name, (kind, _) in metrics.METRICS.items():
+            self.assertIn(f"# TYPE {name} {kind}\n", text)
+
+    def test_advertiser_is_forbidden(self):
+        response = self.client.get("/metrics/")
+
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(METRICS_SCRAPE_TOKEN="scrape-secret")
+    def test_scrape_token_reads_metrics_only(self):
+        self.client.logout()
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer scrape-secret")
+
+        response = self.client.get("/metrics/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            "# TYPE commerce_http_requests_total", response.content.decode()
+        )
+
+        response = self.client.get(f"/order/{self.order.pk}")
+        self.assertEqual(response.status_code, 401)
+
+    @override_settings(METRICS_SCRAPE_TOKEN="scrape-secret")
+    def test_rejects_other_scrape_tokens(self):
+        self.client.logout()
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer scrape-secreT")
+
+        response = self.client.get("/metrics/")
+        self.assertEqual(response.status_code, 401)
+
+    def test_scrape_token_is_off_by_default(self):
+        self.client.logout()
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer ")
+
+        response = self.client.get("/metrics/")
+        self.assertEqual(response.status_code, 401)
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_can_be_disabled(self):
+        self.client.get(f"/order/{self.order.pk}")
+
+        self.assertEqual(os.listdir(self.directory), [])
@@ -1,3 +1,7 @@
+import json
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APITestCase
 from commerce import models
 
@@ -200,12 +204,315 @@ class TestReadOrder(TestOrderBase):
                 "status": order2.status,
             },
         ]
-        self.assertEqual(response.json(), expected_value)
+        self.assertEqual(response.json()["results"], expected_value)
 
     def test_list_order_is_empity(self):
         self._create_and_log_in_user()
         response = self.client.get("/order/", {}, format="json")
-        self.assertEqual(response.json(), [])
+        self.assertEqual(response.json()["results"], [])
+
+
+class TestListOrderPagination(TestOrderBase):
+    def _ids(self, response):
+        return [order["id"] for order in response.json()["results"]]
+
+    def test_first_page_has_next_cursor(self):
+        advertiser = self._create_and_log_in_user()
+        orders = [
+            test_util.create_fake_order(advertiser_id=advertiser.pk)
+            for _ in range(3)
+        ]
+
+        response = self.client.get("/order/", {"page_size": 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._ids(response), [orders[0].pk, orders[1].pk])
+        self.assertIsNotNone(response.json()["next"])
+        self.assertIsNone(response.json()["previous"])
+
+    def test_follow_next_and_previous_cursors(self):
+        advertiser = self._create_and_log_in_user()
+        orders = [
+            test_util.create_fake_order(advertiser_id=advertiser.pk)
+            for _ in range(5)
+        ]
+
+        first_page = self.client.get("/order/", {"page_size": 2})
+        second_page = self.client.get(first_page.json()["next"])
+        self.assertEqual(self._ids(second_page), [orders[2].pk, orders[3].pk])
+
+        third_page = self.client.get(second_page.json()["next"])
+        self.assertEqual(self._ids(third_page), [orders[4].pk])
+        self.assertIsNone(third_page.json()["next"])
+
+        previous_page = self.client.get(third_page.json()["previous"])
+        self.assertEqual(
+            self._ids(previous_page), [orders[2].pk, orders[3].pk]
+        )
+
+    def test_breaks_ties_on_same_created_at(self):
+        advertiser = self._create_and_log_in_user()
+        orders = [
+            test_util.create_fake_order(advertiser_id=advertiser.pk)
+            for _ in range(3)
+        ]
+        models.Order.objects.update(created_at=orders[0].created_at)
+
+        first_page = self.client.get("/order/", {"page_size": 2})
+        second_page = self.client.get(first_page.json()["next"])
+        self.assertEqual(self._ids(second_page), [orders[2].pk])
+
+    def test_page_size_is_capped(self):
+        advertiser = self._create_and_log_in_user()
+        for _ in range(3):
+            test_util.create_fake_order(advertiser_id=advertiser.pk)
+
+        with self.settings(ORDER_MAX_PAGE_SIZE=2):
+            response = self.client.get("/order/", {"page_size": 100})
+        self.assertEqual(len(response.json()["results"]), 2)
+
+    def test_invalid_cursor_returns_404(self):
+        self._create_and_log_in_user()
+        response = self.client.get("/order/", {"cursor": "invalid"})
+        self.assertEqual(response.status_code, 404)
+
+
+class TestListOrderFilters(TestOrderBase):
+    def setUp(self):
+        super().setUp()
+        self.advertiser = self._create_and_log_in_user()
+        self.order_sp = self._create_order("SP", "01310-100")
+        self.order_rj = self._create_order("RJ", "20040-002")
+        self.order_rj.status = models.Order.STATUS_FINISHED
+        self.order_rj.save()
+
+    def _create_order(self, state, cep):
+        order = test_util.create_fake_order(advertiser_id=self.advertiser.pk)
+        order.shipping_address.state = state
+        order.shipping_address.cep = cep
+        order.shipping_address.save()
+        return order
+
+    def _ids(self, params):
+        response = self.client.get("/order/", params)
+        self.assertEqual(response.status_code, 200)
+        return [order["id"] for order in response.json()["results"]]
+
+    def test_filter_by_status(self):
+        self.assertEqual(self._ids({"status": "finished"}), [self.order_rj.pk])
+
+    def test_filter_by_state(self):
+        self.assertEqual(
+            self._ids({"shipping_address__state": "SP"}), [self.order_sp.pk]
+        )
+
+    def test_filter_by_cep_prefix(self):
+        self.assertEqual(self._ids({"cep": "013"}), [self.order_sp.pk])
+        self.assertEqual(self._ids({"cep": "2004"}), [self.order_rj.pk])
+        self.assertEqual(self._ids({"cep": "0131"}), [self.order_sp.pk])
+        self.assertEqual(self._ids({"cep": "9"}), [])
+
+    def test_filter_by_created_at_range(self):
+        self.assertEqual(
+            self._ids(
+                {
+                    "created_after": self.order_rj.created_at.isoformat(),
+                    "created_before": "2100-01-01T00:00:00Z",
+                }
+            ),
+            [self.order_rj.pk],
+        )
+
+    def test_filter_by_last_change_range(self):
+        self.assertEqual(
+            self._ids({"changed_before": self.order_rj.last_change}),
+            [self.order_sp.pk],
+        )
+
+    def test_sort_descending(self):
+        self.assertEqual(
+            self._ids({"ordering": "-created_at"}),
+            [self.order_rj.pk, self.order_sp.pk],
+        )
+
+    def test_sort_by_last_change(self):
+        self.order_sp.save()
+        self.assertEqual(
+            self._ids({"ordering": "-last_change"}),
+            [self.order_sp.pk, self.order_rj.pk],
+        )
+
+    def test_paginate_descending(self):
+        third = self._create_order("SP", "01310-200")
+
+        first_page = self.client.get(
+            "/order/", {"ordering": "-created_at", "page_size": 2}
+        )
+        second_page = self.client.get(first_page.json()["next"])
+        self.assertEqual(
+            [order["id"] for order in second_page.json()["results"]],
+            [self.order_sp.pk],
+        )
+
+        previous_page = self.client.get(second_page.json()["previous"])
+        self.assertEqual(
+            [order["id"] for order in previous_page.json()["results"]],
+            [third.pk, self.order_rj.pk],
+        )
+
+    def test_cursor_from_other_ordering_is_invalid(self):
+        first_page = self.client.get("/order/", {"page_size": 1})
+        cursor = first_page.json()["next"].split("cursor=")[1]
+
+        response = self.client.get(
+            "/order/", {"ordering": "-created_at", "cursor": cursor}
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_invalid_filter_returns_400(self):
+        response = self.client.get("/order/", {"status": "lost"})
+        self.assertEqual(response.status_code, 400)
+
+
+class TestConditionalOrder(TestOrderBase):
+    def setUp(self):
+        super().setUp()
+        self.advertiser = self._create_and_log_in_user()
+        self.order = test_util.create_fake_order(
+            advertiser_id=self.advertiser.pk
+        )
+
+    def test_detail_has_validators(self):
+        response = self.client.get(f"/order/{self.order.pk}")
+        self.assertIn("ETag", response)
+        self.assertIn("Last-Modified", response)
+
+    def test_detail_if_none_match_returns_304(self):
+        url = f"/order/{self.order.pk}"
+        etag = self.client.get(url)["ETag"]
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_detail_if_modified_since_returns_304(self):
+        url = f"/order/{self.order.pk}"
+        last_modified = self.client.get(url)["Last-Modified"]
+
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_detail_changed_returns_200(self):
+        url = f"/order/{self.order.pk}"
+        etag = self.client.get(url)["ETag"]
+
+        self.client.patch(url, {"status": "finished"}, format="json")
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_list_if_none_match_returns_304(self):
+        etag = self.client.get("/order/")["ETag"]
+
+        response = self.client.get("/order/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_list_changes_after_create_and_delete(self):
+        etag = self.client.get("/order/")["ETag"]
+
+        self.client.post("/order/", self.data, format="json")
+        response = self.client.get("/order/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        etag = response["ETag"]
+        self.client.delete(f"/order/{self.order.pk}")
+        response = self.client.get("/order/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_etag_depends_on_query(self):
+        etag = self.client.get("/order/")["ETag"]
+
+        response = self.client.get(
+            "/order/", {"status": "finished"}, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_has_no_last_modified(self):
+        response = self.client.get("/order/")
+
+        self.assertIn("ETag", response)
+        self.assertNotIn("Last-Modified", response)
+
+    def test_list_changes_when_an_order_leaves_the_filter(self):
+        self.order.shipping_address.state = "SP"
+        self.order.shipping_address.save()
+        url = "/order/?shipping_address__state=SP"
+        etag = self.client.get(url)["ETag"]
+
+        self.order.shipping_address.state = "RJ"
+        self.order.shipping_address.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["results"], [])
+
+    def test_list_skips_aggregates(self):
+        with CaptureQueriesContext(connection) as context:
+            self.client.get("/order/", HTTP_IF_NONE_MATCH='"stale"')
+
+        for query in context.captured_queries:
+            self.assertNotIn("COUNT(", query["sql"])
+
+
+class TestStreamOrders(TestOrderBase):
+    def _lines(self, response):
+        content = b"".join(response.streaming_content).decode("utf-8")
+        return [json.loads(line) for line in content.splitlines()]
+
+    def test_stream_with_accept_header(self):
+        advertiser = self._create_and_log_in_user()
+        orders = [
+            test_util.create_fake_order(advertiser_id=advertiser.pk)
+            for _ in range(3)
+        ]
+
+        response = self.client.get(
+            "/order/", HTTP_ACCEPT="application/x-ndjson"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertEqual(
+            [order["id"] for order in self._lines(response)],
+            [order.pk for order in orders],
+        )
+
+    def test_stream_with_format_query_param(self):
+        advertiser = self._create_and_log_in_user()
+        order = test_util.create_fake_order(advertiser_id=advertiser.pk)
+
+        response = self.client.get("/order/", {"format": "ndjson"})
+        self.assertTrue(response.streaming)
+        self.assertEqual(self._lines(response)[0]["id"], order.pk)
+
+    def test_stream_yields_one_fragment_per_chunk(self):
+        advertiser = self._create_and_log_in_user()
+        for _ in range(5):
+            test_util.create_fake_order(advertiser_id=advertiser.pk)
+
+        with self.settings(ORDER_STREAM_CHUNK_SIZE=2):
+            response = self.client.get("/order/", {"format": "ndjson"})
+            fragments = list(response.streaming_content)
+        self.assertEqual(len(fragments), 3)
+
+    def test_stream_is_not_paginated(self):
+        advertiser = self._create_and_log_in_user()
+        for _ in range(3):
+            test_util.create_fake_order(advertiser_id=advertiser.pk)
+
+        with self.settings(ORDER_MAX_PAGE_SIZE=1):
+            response = self.client.get("/order/", {"format": "ndjson"})
+            self.assertEqual(len(self._lines(response)), 3)
 
 
 class TestDeleteOrder(TestOrderBase):
@@ -0,0 +1,246 @@
+from rest_framework.test import APITestCase
+from commerce import models, services
+
+from . import test_util
+
+
+class TestOrderBulkBase(APITestCase):
+    def setUp(self):
+        self.data = {
+            "item": {"name": "engine", "description": "engine c3po"},
+            "shipping_address": {
+                "state": "SP",
+                "address": "Fake Address",
+                "neighborhood": "Fake Neighborhood",
+                "number": "111",
+                "complement": "Fake Complement",
+                "city": "Fake City",
+                "cep": "Fake Cep",
+            },
+        }
+
+    def _create_and_log_in_user(self):
+        advertiser = test_util.create_fake_advertiser()
+        self.client.login(
+            username=advertiser.user.username,
+            password=advertiser.user.test_password,
+        )
+        return advertiser
+
+
+class TestBulkCreateOrder(TestOrderBulkBase):
+    def test_returns_201(self):
+        self._create_and_log_in_user()
+
+        response = self.client.post(
+            "/order/bulk/", [self.data, self.data], format="json"
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def test_saves_on_db(self):
+        advertiser = self._create_and_log_in_user()
+
+        response = self.client.post(
+            "/order/bulk/", [self.data] * 3, format="json"
+        )
+
+        orders = models.Order.objects.order_by("id")
+        self.assertEqual(
+            [order["id"] for order in response.json()],
+            [order.pk for order in orders],
+        )
+        for order in orders:
+            self.assertEqual(order.advertiser, advertiser)
+            self.assertEqual(order.status, "open")
+            self.assertEqual(order.item.name, "engine")
+            self.assertEqual(order.shipping_address.state, "SP")
+
+    def test_keeps_existing_orders(self):
+        advertiser = self._create_and_log_in_user()
+        order = test_util.create_fake_order(advertiser_id=advertiser.pk)
+
+        self.client.post("/order/bulk/", [self.data] * 2, format="json")
+
+        self.assertEqual(models.Order.objects.count(), 3)
+        order.refresh_from_db()
+        self.assertEqual(order.item.name, "xyz")
+
+    def test_never_reuses_deleted_ids(self):
+        self._create_and_log_in_user()
+        response = self.client.post(
+            "/order/bulk/", [self.data] * 2, format="json"
+        )
+        last_id = response.json()[-1]["id"]
+        self.client.delete(f"/order/{last_id}")
+
+        response = self.client.post(
+            "/order/bulk/", [self.data] * 2, format="json"
+        )
+
+        self.assertEqual(
+            [order["id"] for order in response.json()],
+            [last_id + 1, last_id + 2],
+        )
+        # Single creates carry on after the reserved ids.
+        response = self.client.post("/order/", self.data, format="json")
+        self.assertEqual(response.json()["id"], last_id + 3)
+
+    def test_invalid_order_returns_errors_per_row(self):
+        self._create_and_log_in_user()
+        invalid_data = {"item": {"name": "engine"}}
+
+        response = self.client.post(
+            "/order/bulk/", [self.data, invalid_data], format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+
+        errors = response.json()
+        self.assertEqual(errors[0], {})
+        self.assertIn("shipping_address", errors[1])
+        self.assertEqual(models.Order.objects.count(), 0)
+        self.assertEqual(models.Item.objects.count(), 0)
+
+    def test_too_many_orders_returns_400(self):
+        self._create_and_log_in_user()
+
+        with self.settings(ORDER_BULK_MAX_SIZE=2):
+            response = self.client.post(
+                "/order/bulk/", [self.data] * 3, format="json"
+            )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(models.Order.objects.count(), 0)
+
+    def test_runs_constant_number_of_queries(self):
+        advertiser = self._create_and_log_in_user()
+        # Creates the key sequences, as on any database in use.
+        test_util.create_fake_order(advertiser_id=advertiser.pk)
+
+        # session, user, advertiser, savepoint, 3 batched inserts, 3 key
+        # reservations of 2 queries on backends that cannot return the
+        # inserted rows, the order rollup upsert, the order listing insert and
+        # the savepoint release.
+        with self.assertNumQueries(16):
+            self.client.post("/order/bulk/", [self.data] * 20, format="json")
+
+    def test_user_not_logged_returns_401(self):
+        response = self.client.post("/order/bulk/", [self.data], format="json")
+        self.assertEqual(response.status_code, 401)
+
+
+class TestBulkFinishOrder(TestOrderBulkBase):
+    def test_finish_by_ids(self):
+        advertiser = self._create_and_log_in_user()
+        orders = [
+            test_util.create_fake_order(advertiser_id=advertiser.pk)
+            for _ in range(3)
+        ]
+
+        response = self.client.post(
+            "/order/bulk/finish/",
+            {"ids": [orders[0].pk, orders[1].pk]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"updated": 2})
+
+        statuses = [
+            order.status for order in models.Order.objects.order_by("id")
+        ]
+        self.assertEqual(statuses, ["finished", "finished", "open"])
+
+    def test_finish_by_filter(self):
+        advertiser = self._create_and_log_in_user()
+        order_sp = test_util.create_fake_order(advertiser_id=advertiser.pk)
+        order_sp.shipping_address.state = "SP"
+        order_sp.shipping_address.save()
+        order_rj = test_util.create_fake_order(advertiser_id=advertiser.pk)
+
+        response = self.client.post(
+            "/order/bulk/finish/",
+            {"filter": {"shipping_address__state": "SP"}},
+            format="json",
+        )
+        self.assertEqual(response.json(), {"updated": 1})
+
+        order_sp.refresh_from_db()
+        order_rj.refresh_from_db()
+        self.assertEqual(order_sp.status, "finished")
+        self.assertEqual(order_rj.status, "open")
+
+    def test_updates_last_change(self):
+        advertiser = self._create_and_log_in_user()
+        order = test_util.create_fake_order(advertiser_id=advertiser.pk)
+        last_change = order.last_change
+
+        self.client.post(
+            "/order/bulk/finish/", {"ids": [order.pk]}, format="json"
+        )
+
+        order.refresh_from_db()
+        self.assertGreater(order.last_change, last_change)
+
+    def test_only_counts_open_orders(self):
+        advertiser = self._create_and_log_in_user()
+        order = test_util.create_fake_order(advertiser_id=advertiser.pk)
+        order.status = models.Order.STATUS_FINISHED
+        order.save()
+
+        response = self.client.post(
+            "/order/bulk/finish/", {"ids": [order.pk]}, format="json"
+        )
+        self.assertEqual(response.json(), {"updated": 0})
+
+    def test_ignores_orders_of_other_advertisers(self):
+        order = test_util.create_fake_order()
+        self._create_and_log_in_user()
+
+        response = self.client.post(
+            "/order/bulk/finish/", {"ids": [order.pk]}, format="json"
+        )
+        self.assertEqual(response.json(), {"updated": 0})
+
+        order.refresh_from_db()
+        self.assertEqual(order.status, "open")
+
+    def test_runs_a_single_update(self):
+        advertiser = self._create_and_log_in_user()
+        orders = [
+            test_util.create_fake_order(advertiser_id=advertiser.pk)
+            for _ in range(10)
+        ]
+
+        # session, user, advertiser, savepoint, the rollup counts, the
+        # listing UPDATE, the order UPDATE, the rollup upsert and the
+        # savepoint release.
+        with self.assertNumQueries(9):
+            self.client.post(
+                "/order/bulk/finish/",
+                {"ids": [order.pk for order in orders]},
+                format="json",
+            )
+
+    def test_requires_ids_or_filter(self):
+        self._create_and_log_in_user()
+
+        response = self.client.post("/order/bulk/finish/", {}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+    def test_rejects_empty_filter(self):
+        advertiser = self._create_and_log_in_user()
+        order = test_util.create_fake_order(advertiser_id=advertiser.pk)
+
+        response = self.client.post(
+            "/order/bulk/finish/", {"filter": {}}, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("filter", response.json())
+
+        order.refresh_from_db()
+        self.assertEqual(order.status, "open")
+
+    def test_service_finishes_nothing_without_selection(self):
+        advertiser = self._create_and_log_in_user()
+        test_util.create_fake_order(advertiser_id=advertiser.pk)
+
+        self.assertEqual(services.finish_orders(advertiser, filters={}), 0)
+        self.assertFalse(models.Order.objects.filter(status="finished"))
@@ -0,0 +1,133 @@
+import os
+import pstats
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import override_settings
+from rest_framework import renderers
+from rest_framework.test import APITestCase
+
+from commerce import profiling
+
+from . import test_util
+
+
+class TestProfiling(APITestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.settings = override_settings(
+            PROFILING_ENABLED=True,
+            PROFILING_DIR=self.directory,
+            PROFILING_MIN_INTERVAL=0,
+        )
+        self.settings.enable()
+        profiling._last_started = None
+
+        self.advertiser = test_util.create_fake_advertiser()
+        self.order = test_util.create_fake_order(
+            advertiser_id=self.advertiser.pk
+        )
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.directory)
+
+    def _login(self, superuser=True):
+        self.advertiser.user.is_superuser = superuser
+        self.advertiser.user.save()
+        self.client.login(
+            username=self.advertiser.user.username,
+            password=self.advertiser.user.test_password,
+        )
+
+    def _profiles(self):
+        return sorted(
+            name
+            for name in os.listdir(self.directory)
+            if name.endswith(".prof")
+        )
+
+    def test_profiles_on_header(self):
+        self._login()
+
+        response = self.client.get("/order/", HTTP_X_PROFILE="1")
+
+        self.assertEqual(response.status_code, 200)
+        name = response["X-Profile-Id"]
+        self.assertIn("OrderAPIView-get", name)
+        self.assertEqual(self._profiles(), [f"{name}.prof"])
+        path = os.path.join(self.directory, name)
+        stats = pstats.Stats(f"{path}.prof")
+        self.assertGreater(stats.total_calls, 0)
+        with open(f"{path}.txt") as file:
+            summary = file.read()
+        self.assertIn("GET /order/ -> 200", summary)
+        self.assertIn("function calls", summary)
+
+    def test_profiles_on_query_param(self):
+        self._login()
+
+        response = self.client.get(f"/order/{self.order.pk}?profile=1")
+
+        self.assertTrue(response.has_header("X-Profile-Id"))
+        self.assertEqual(len(self._profiles()), 1)
+
+    def test_ignores_flag_of_other_users(self):
+        self._login(superuser=False)
+
+        response = self.client.get("/order/", HTTP_X_PROFILE="1")
+
+        self.assertFalse(response.has_header("X-Profile-Id"))
+        self.assertEqual(self._profiles(), [])
+
+    @override_settings(PROFILING_ENABLED=False)
+    def test_is_off_when_disabled(self):
+        self._login()
+
+        response = self.client.get("/order/", HTTP_X_PROFILE="1")
+
+        self.assertFalse(response.has_header("X-Profile-Id"))
+        self.assertEqual(self._profiles(), [])
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_samples_requests(self):
+        self._login(superuser=False)
+
+        response = self.client.get("/order/")
+
+        self.assertTrue(response.has_header("X-Profile-Id"))
+
+    @override_settings(PROFILING_MIN_INTERVAL=3600)
+    def test_limits_frequency(self):
+        self._login()
+
+        for _ in range(3):
+            self.client.get("/order/", HTTP_X_PROFILE="1")
+
+        self.assertEqual(len(self._profiles()), 1)
+
+    @override_settings(PROFILING_MAX_FILES=2)
+    def test_keeps_newest_profiles(self):
+        self._login()
+
+        names = [
+            self.client.get("/order/", HTTP_X_PROFILE="1")["X-Profile-Id"]
+            for _ in range(3)
+        ]
+
+        self.assertEqual(self._profiles(), [f"{n}.prof" for n in names[1:]])
+        self.assertEqual(len(os.listdir(self.directory)), 4)
+
+    def test_releases_the_lock_when_rendering_fails(self):
+        self._login()
+
+        with mock.patch.object(
+            renderers.JSONRenderer, "render", side_effect=RuntimeError
+        ):
+            with self.assertRaises(RuntimeError):
+                self.client.get("/order/", HTTP_X_PROFILE="1")
+
+        self.assertFalse(profiling._lock.locked())
+        response = self.client.get("/order/", HTTP_X_PROFILE="1")
+        self.assertTrue(response.has_header("X-Profile-Id"))
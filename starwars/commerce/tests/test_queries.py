@@ -0,0 +1,114 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from commerce import listings
+
+from . import test_util
+
+
+class TestOrderQueryCount(APITestCase):
+    """ Order endpoints must run a constant number of queries.
+
+    Every request pays 2 queries to load the session and the user, and
+    each transaction 2 more for its savepoint inside the test case. Reads
+    pay 1 more to check the version for conditional requests.
+    """
+
+    def setUp(self):
+        self.data = {
+            "item": {"name": "engine", "description": "engine c3po"},
+            "shipping_address": {
+                "state": "SP",
+                "address": "Fake Address",
+                "neighborhood": "Fake Neighborhood",
+                "number": "111",
+                "complement": "Fake Complement",
+                "city": "Fake City",
+                "cep": "Fake Cep",
+            },
+        }
+        self.advertiser = test_util.create_fake_advertiser()
+        self.client.login(
+            username=self.advertiser.user.username,
+            password=self.advertiser.user.test_password,
+        )
+
+    def _create_orders(self, quantity):
+        orders = [
+            test_util.create_fake_order(advertiser_id=self.advertiser.pk)
+            for _ in range(quantity)
+        ]
+        listings.add(orders)
+        return orders
+
+    def test_list_orders(self):
+        # session, user, advertiser and the page.
+        self._create_orders(1)
+        with self.assertNumQueries(4):
+            self.client.get("/order/")
+
+        self._create_orders(10)
+        with self.assertNumQueries(4):
+            response = self.client.get("/order/")
+        self.assertEqual(len(response.json()["results"]), 11)
+
+    def test_list_orders_as_superuser(self):
+        self.advertiser.user.is_superuser = True
+        self.advertiser.user.save()
+        for _ in range(5):
+            test_util.create_fake_order()
+
+        with self.assertNumQueries(4):
+            response = self.client.get("/order/")
+        self.assertEqual(len(response.json()["results"]), 5)
+
+    def test_get_order(self):
+        order = self._create_orders(1)[0]
+        with self.assertNumQueries(5):
+            self.client.get(f"/order/{order.pk}")
+
+    def test_get_order_not_modified(self):
+        order = self._create_orders(1)[0]
+        etag = self.client.get(f"/order/{order.pk}")["ETag"]
+
+        with self.assertNumQueries(4):
+            self.client.get(f"/order/{order.pk}", HTTP_IF_NONE_MATCH=etag)
+
+    def test_create_order(self):
+        # Including the order rollup upsert and the order listing insert.
+        with self.assertNumQueries(10):
+            self.client.post("/order/", self.data, format="json")
+
+    def test_update_order(self):
+        order = self._create_orders(1)[0]
+        # Including a savepoint, its release, the re-read of the order in
+        # it, the order rollup upsert and the order listing update.
+        with self.assertNumQueries(12):
+            self.client.put(f"/order/{order.pk}", self.data, format="json")
+
+    def test_patch_order(self):
+        order = self._create_orders(1)[0]
+        with self.assertNumQueries(10):
+            self.client.patch(
+                f"/order/{order.pk}", {"status": "finished"}, format="json"
+            )
+
+    def test_delete_order(self):
+        order = self._create_orders(1)[0]
+        # Including the re-read of the order in the transaction and the
+        # cascade to the order listing.
+        with self.assertNumQueries(10):
+            self.client.delete(f"/order/{order.pk}")
+
+    def test_resolves_advertiser_once_per_request(self):
+        order = self._create_orders(1)[0]
+        with CaptureQueriesContext(connection) as context:
+            self.client.put(f"/order/{order.pk}", self.data, format="json")
+
+        advertiser_queries = [
+            query
+            for query in context.captured_queries
+            if 'FROM "commerce_advertiser"' in query["sql"]
+        ]
+        self.assertEqual(len(advertiser_queries), 1)
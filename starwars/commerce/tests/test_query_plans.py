@@ -0,0 +1,205 @@
+import random
+import unittest
+
+from django.db import connection
+from django.test import TestCase
+
+from commerce import models, seeding, services
+
+from . import test_util
+
+
+@unittest.skipUnless(
+    connection.vendor == "sqlite", "EXPLAIN QUERY PLAN is SQLite syntax."
+)
+class TestOrderQueryPlans(TestCase):
+    """ Hot service queries must never fall back to a full table scan.
+
+    A scan of a whole index reads every row too, so only index searches
+    and covering index scans pass, besides the scans a test allows
+    explicitly. Thousands of seeded and analyzed orders make the planner
+    choose as it would in production.
+    """
+
+    # Pages every order in list order, stopping at the page size.
+    CREATED_SCAN = "SCAN commerce_order USING INDEX order_created_idx"
+
+    @classmethod
+    def setUpTestData(cls):
+        advertisers = [test_util.create_fake_advertiser() for _ in range(5)]
+        seeding.seed_orders(
+            [advertiser.pk for advertiser in advertisers],
+            3000,
+            rng=random.Random(7),
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def setUp(self):
+        self.advertiser = test_util.create_fake_advertiser()
+        self.orders = [
+            test_util.create_fake_order(advertiser_id=self.advertiser.pk)
+            for _ in range(3)
+        ]
+        self.order = self.orders[0]
+        self.data = {
+            "item": {"name": "engine", "description": "engine c3po"},
+            "shipping_address": {"state": "SP"},
+        }
+
+    def _capture_queries(self, func):
+        queries = []
+
+        def capture(execute, sql, params, many, context):
+            queries.append((sql, params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(capture):
+            func()
+        return queries
+
+    def _explain(self, sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertNoFullScan(self, func, allowed=()):
+        queries = self._capture_queries(func)
+        self.assertTrue(queries)
+
+        for sql, params in queries:
+            if not sql.startswith(("SELECT", "UPDATE", "DELETE")):
+                continue
+
+            for detail in self._explain(sql, params):
+                if not detail.startswith("SCAN"):
+                    continue
+                if "USING COVERING INDEX" in detail:
+                    continue
+                # One row per table, read when reserving ids.
+                if detail == "SCAN sqlite_sequence":
+                    continue
+                self.assertIn(detail, allowed, f"Full scan\n{sql}")
+
+    def test_rejects_full_index_scans(self):
+        with self.assertRaises(AssertionError):
+            self.assertNoFullScan(
+                lambda: list(models.Order.objects.order_by("created_at"))
+            )
+
+    def test_get_order(self):
+        self.assertNoFullScan(
+            lambda: services.get_order(self.order.pk, self.advertiser)
+        )
+
+    def test_list_orders(self):
+        self.assertNoFullScan(
+            lambda: list(
+                services.list_orders(self.advertiser).order_by(
+                    "created_at", "id"
+                )[:50]
+            )
+        )
+
+    def test_list_orders_next_page(self):
+        self.assertNoFullScan(
+            lambda: list(
+                services.list_orders(self.advertiser)
+                .filter(created_at__gte=self.order.created_at)
+                .order_by("created_at", "id")[:50]
+            )
+        )
+
+    def test_list_orders_as_superuser(self):
+        self.advertiser.user.is_superuser = True
+        self.assertNoFullScan(
+            lambda: list(
+                services.list_orders(self.advertiser).order_by(
+                    "created_at", "id"
+                )[:50]
+            ),
+            allowed=[self.CREATED_SCAN],
+        )
+
+    def test_list_orders_by_status(self):
+        self.assertNoFullScan(
+            lambda: list(
+                services.list_orders(self.advertiser)
+                .filter(status=models.Order.STATUS_OPEN)
+                .order_by("-created_at")[:50]
+            )
+        )
+
+    def test_list_orders_filtered(self):
+        filters = {
+            "status": models.Order.STATUS_OPEN,
+            "shipping_address__state": "SP",
+            "cep": "013",
+            "changed_after": self.order.last_change,
+        }
+        self.assertNoFullScan(
+            lambda: list(
+                services.list_orders(self.advertiser, filters).order_by(
+                    "-last_change", "-id"
+                )[:50]
+            )
+        )
+
+    def test_list_orders_filtered_as_superuser(self):
+        self.advertiser.user.is_superuser = True
+        for filters in [
+            {"shipping_address__state": "SP"},
+            {"cep": "013"},
+            {"changed_after": self.order.last_change},
+        ]:
+            self.assertNoFullScan(
+                lambda: list(
+                    services.list_orders(self.advertiser, filters).order_by(
+                        "created_at", "id"
+                    )[:50]
+                ),
+                allowed=[self.CREATED_SCAN],
+            )
+
+    def test_orders_changed_since(self):
+        self.assertNoFullScan(
+            lambda: list(
+                models.Order.objects.filter(
+                    last_change__gte=self.order.last_change
+                )
+            )
+        )
+
+    def test_get_advertiser_by_user(self):
+        self.assertNoFullScan(
+            lambda: services.get_advertiser_by_user(self.advertiser.user)
+        )
+
+    def test_create_order(self):
+        self.assertNoFullScan(
+            lambda: services.create_order(self.data, self.advertiser)
+        )
+
+    def test_bulk_create_orders(self):
+        self.assertNoFullScan(
+            lambda: services.bulk_create_orders([self.data], self.advertiser)
+        )
+
+    def test_update_order(self):
+        self.assertNoFullScan(
+            lambda: services.update_order(
+                self.order, {"status": models.Order.STATUS_FINISHED}
+            )
+        )
+
+    def test_finish_orders(self):
+        self.assertNoFullScan(
+            lambda: services.finish_orders(
+                self.advertiser, ids=[order.pk for order in self.orders]
+            )
+        )
+
+    def test_delete_order(self):
+        self.assertNoFullScan(
+            lambda: services.delete_order(self.order.pk, self.advertiser)
+        )
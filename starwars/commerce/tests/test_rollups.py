@@ -0,0 +1,271 @@
+import datetime
+import io
+import random
+from unittest import mock
+
+from django.core import management
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from commerce import models, seeding, services
+
+from . import test_util
+
+
+class RollupTestCase(test_util.InStepAssertions, APITestCase):
+    def _log_in(self, advertiser):
+        self.client.login(
+            username=advertiser.user.username,
+            password=advertiser.user.test_password,
+        )
+
+
+class TestRollupMaintenance(RollupTestCase):
+    def setUp(self):
+        self.advertiser = test_util.create_fake_advertiser()
+        self._log_in(self.advertiser)
+
+    def _create(self, state="SP"):
+        response = self.client.post(
+            "/order/", test_util.fake_order_data(state), format="json"
+        )
+        return response.json()["id"]
+
+    def test_counts_created_orders(self):
+        self._create("SP")
+        self._create("SP")
+        self._create("RJ")
+
+        self.assertInStep()
+        self.assertEqual(models.OrderRollup.objects.count(), 2)
+
+    def test_counts_bulk_created_orders(self):
+        self.client.post(
+            "/order/bulk/",
+            [
+                test_util.fake_order_data("SP"),
+                test_util.fake_order_data("BA"),
+                test_util.fake_order_data("SP"),
+            ],
+            format="json",
+        )
+
+        self.assertInStep()
+
+    def test_moves_updated_orders(self):
+        order_id = self._create("SP")
+
+        self.client.put(
+            f"/order/{order_id}",
+            test_util.fake_order_data("MG"),
+            format="json",
+        )
+        self.assertInStep()
+
+        self.client.patch(
+            f"/order/{order_id}", {"status": "finished"}, format="json"
+        )
+        self.assertInStep()
+
+    def test_moves_orders_changed_since_they_were_read(self):
+        order = services.create_order(
+            test_util.fake_order_data("SP"), self.advertiser
+        )
+        stale = services.get_order(order.pk, self.advertiser)
+        services.update_order(order, {"status": "finished"})
+
+        services.update_order(stale, {"item": {"name": "droid"}})
+
+        self.assertInStep()
+
+    def test_removes_orders_changed_since_they_were_read(self):
+        order = services.create_order(
+            test_util.fake_order_data("SP"), self.advertiser
+        )
+        get_order = services.get_order
+
+        def get_and_finish(order_id, advertiser):
+            stale = get_order(order_id, advertiser)
+            services.update_order(
+                get_order(order_id, advertiser), {"status": "finished"}
+            )
+            return stale
+
+        with mock.patch.object(services, "get_order", get_and_finish):
+            services.delete_order(order.pk, self.advertiser)
+
+        self.assertInStep()
+        self.assertFalse(models.OrderRollup.objects.exclude(total=0))
+
+    def test_moves_finished_orders(self):
+        order_ids = [self._create("SP") for _ in range(3)]
+        self._create("RJ")
+
+        self.client.post(
+            "/order/bulk/finish/", {"ids": order_ids[:2]}, format="json"
+        )
+        self.assertInStep()
+
+        self.client.post(
+            "/order/bulk/finish/",
+            {"filter": {"shipping_address__state": "RJ"}},
+            format="json",
+        )
+        self.assertInStep()
+
+    def test_removes_deleted_orders(self):
+        order_id = self._create("SP")
+        self._create("SP")
+
+        self.client.delete(f"/order/{order_id}")
+
+        self.assertInStep()
+
+    def test_counts_orders_without_state(self):
+        services.create_order(
+            {
+                "item": {"name": "engine", "description": "engine"},
+                "shipping_address": {"city": "Nowhere"},
+            },
+            self.advertiser,
+        )
+
+        self.assertInStep()
+        self.assertEqual(models.OrderRollup.objects.get().state, "")
+
+    def test_counts_seeded_orders(self):
+        seeding.seed_orders(
+            [self.advertiser.pk], 300, batch_size=100, rng=random.Random(1)
+        )
+
+        self.assertInStep()
+
+    @override_settings(TIME_ZONE="America/Sao_Paulo")
+    def test_counts_seeded_orders_by_local_day(self):
+        seeding.seed_orders(
+            [self.advertiser.pk], 300, days=30, rng=random.Random(2)
+        )
+
+        self.assertInStep()
+
+    def test_rebuild_command_recounts(self):
+        self._create("SP")
+        # Written outside of the services, so not counted.
+        test_util.create_fake_order(advertiser_id=self.advertiser.pk)
+        models.OrderRollup.objects.update(total=42)
+
+        stdout = io.StringIO()
+        management.call_command("rebuild_order_rollups", stdout=stdout)
+
+        self.assertInStep(listing_table=False)
+        self.assertIn("Rebuilt 2 order rollups.", stdout.getvalue())
+
+    def test_migration_counts_existing_orders(self):
+        self._create("SP")
+        test_util.create_fake_order(advertiser_id=self.advertiser.pk)
+        models.OrderRollup.objects.update(total=42)
+
+        test_util.run_data_migration("0007_backfill_order_rollups")
+
+        self.assertInStep(listing_table=False)
+
+
+class TestOrderStats(RollupTestCase):
+    def setUp(self):
+        self.advertiser = test_util.create_fake_advertiser()
+        self.other = test_util.create_fake_advertiser()
+        for state in ("SP", "SP", "RJ"):
+            services.create_order(
+                test_util.fake_order_data(state), self.advertiser
+            )
+        services.create_order(test_util.fake_order_data("BA"), self.other)
+        order = services.create_order(
+            test_util.fake_order_data("SP"), self.advertiser
+        )
+        services.update_order(order, {"status": "finished"})
+        self.today = timezone.localdate()
+
+    def _stats(self, **params):
+        response = self.client.get("/order/stats/", params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_groups_by_every_dimension(self):
+        self._log_in(self.advertiser)
+
+        stats = self._stats()
+
+        day = self.today.isoformat()
+        self.assertEqual(
+            stats["results"],
+            [
+                {"status": "finished", "state": "SP", "day": day, "count": 1},
+                {"status": "open", "state": "RJ", "day": day, "count": 1},
+                {"status": "open", "state": "SP", "day": day, "count": 2},
+            ],
+        )
+        self.assertEqual(stats["total"], 4)
+
+    def test_groups_by_chosen_dimensions(self):
+        self._log_in(self.advertiser)
+
+        stats = self._stats(group_by="state", status="open")
+
+        self.assertEqual(
+            stats["results"],
+            [{"state": "RJ", "count": 1}, {"state": "SP", "count": 2}],
+        )
+
+    def test_counts_everything_without_dimensions(self):
+        self._log_in(self.advertiser)
+
+        stats = self._stats(group_by="")
+
+        self.assertEqual(stats["results"], [{"count": 4}])
+
+    def test_filters_days(self):
+        self._log_in(self.advertiser)
+        tomorrow = self.today + datetime.timedelta(days=1)
+
+        self.assertEqual(self._stats(day_after=tomorrow)["total"], 0)
+        self.assertEqual(self._stats(day_before=tomorrow)["total"], 4)
+
+    def test_superuser_counts_every_advertiser(self):
+        self.other.user.is_superuser = True
+        self.other.user.save()
+        self._log_in(self.other)
+
+        stats = self._stats(group_by="status")
+
+        self.assertEqual(
+            stats["results"],
+            [
+                {"status": "finished", "count": 1},
+                {"status": "open", "count": 4},
+            ],
+        )
+
+    def test_reads_buckets_not_orders(self):
+        self._log_in(self.advertiser)
+        for _ in range(20):
+            services.create_order(
+                test_util.fake_order_data("SP"), self.advertiser
+            )
+
+        # session, user, advertiser and the rollups.
+        with self.assertNumQueries(4):
+            self.client.get("/order/stats/")
+
+    def test_rejects_unknown_dimensions(self):
+        self._log_in(self.advertiser)
+
+        response = self.client.get("/order/stats/", {"group_by": "city"})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("group_by", response.json())
+
+    def test_user_not_logged_returns_401(self):
+        response = self.client.get("/order/stats/")
+
+        self.assertEqual(response.status_code, 401)
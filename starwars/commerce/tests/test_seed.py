@@ -0,0 +1,135 @@
+import io
+import random
+from unittest import mock
+
+from django.core import management
+from django.db import connection
+from rest_framework.test import APITestCase
+
+from commerce import models, seeding
+
+
+class TestSeedCommerce(APITestCase):
+    def _seed(self, *args):
+        stdout = io.StringIO()
+        management.call_command("seed_commerce", *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def _indexes(self, model):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, model._meta.db_table
+            )
+        return {name for name, value in constraints.items() if value["index"]}
+
+    def test_saves_on_db(self):
+        output = self._seed(
+            "--advertisers", "3", "--orders", "250", "--batch-size", "100"
+        )
+
+        self.assertIn("Seeded 3 advertisers and 250 orders", output)
+        self.assertEqual(models.Advertiser.objects.count(), 3)
+        self.assertEqual(models.Order.objects.count(), 250)
+        self.assertEqual(models.Item.objects.count(), 250)
+        self.assertEqual(models.Address.objects.count(), 250)
+
+    def test_generates_valid_orders(self):
+        self._seed("--advertisers", "3", "--orders", "200", "--days", "30")
+
+        states = {state for state, _ in models.Address.STATE_CHOICES}
+        for order in models.Order.objects.select_related("shipping_address"):
+            self.assertIn(order.status, dict(models.Order.STATUS_CHOICES))
+            self.assertIn(order.shipping_address.state, states)
+            self.assertGreaterEqual(order.last_change, order.created_at)
+
+        created = list(
+            models.Order.objects.order_by("pk").values_list(
+                "created_at", flat=True
+            )
+        )
+        self.assertEqual(created, sorted(created))
+
+    def test_shares_the_password(self):
+        self._seed("--advertisers", "2", "--orders", "0", "--password", "x1")
+
+        for advertiser in models.Advertiser.objects.select_related("user"):
+            self.assertTrue(advertiser.user.check_password("x1"))
+
+    def test_restores_indexes(self):
+        indexes = {
+            model: self._indexes(model)
+            for model in seeding.BULK_INDEXED_MODELS
+        }
+
+        self._seed("--advertisers", "1", "--orders", "50")
+
+        for model, names in indexes.items():
+            self.assertEqual(self._indexes(model), names)
+
+    def test_keeps_foreign_key_indexes(self):
+        meta_indexes = {index.name for index in models.Order._meta.indexes}
+        seen = []
+        insert = seeding._insert
+
+        def insert_and_look(model, fields, rows):
+            seen.append(self._indexes(models.Order))
+            insert(model, fields, rows)
+
+        advertiser_ids = seeding.seed_advertisers(1, "x", random.Random(1))
+        with mock.patch.object(seeding, "_insert", insert_and_look):
+            seeding.seed_orders(advertiser_ids, 10, rng=random.Random(1))
+
+        during = seen[-1]
+        self.assertFalse(during & meta_indexes)
+        self.assertEqual(during, self._indexes(models.Order) - meta_indexes)
+        self.assertTrue(during)
+
+    def test_restore_indexes_command(self):
+        editor = connection.schema_editor()
+        for index in models.Order._meta.indexes:
+            editor.remove_index(models.Order, index)
+
+        output = self._seed("--restore-indexes")
+
+        count = len(models.Order._meta.indexes)
+        self.assertIn(f"Restored {count} indexes.", output)
+        self.assertTrue(
+            {index.name for index in models.Order._meta.indexes}
+            <= self._indexes(models.Order)
+        )
+
+    def test_never_reuses_deleted_ids(self):
+        advertiser_ids = seeding.seed_advertisers(1, "x", random.Random(1))
+        seeding.seed_orders(advertiser_ids, 10, rng=random.Random(1))
+        last_id = models.Order.objects.order_by("pk").last().pk
+        models.Order.objects.filter(pk__gt=last_id - 5).delete()
+
+        seeding.seed_orders(advertiser_ids, 2, rng=random.Random(1))
+
+        self.assertEqual(
+            list(
+                models.Order.objects.filter(pk__gt=last_id - 5).values_list(
+                    "pk", flat=True
+                )
+            ),
+            [last_id + 1, last_id + 2],
+        )
+
+    def test_is_reproducible(self):
+        advertiser_ids = seeding.seed_advertisers(2, "x", random.Random(1))
+        seeding.seed_orders(advertiser_ids, 20, rng=random.Random(7))
+        first = list(
+            models.Order.objects.order_by("pk").values_list(
+                "advertiser_id", "status", "shipping_address__state"
+            )
+        )
+        models.Order.objects.all().delete()
+
+        seeding.seed_orders(advertiser_ids, 20, rng=random.Random(7))
+        second = list(
+            models.Order.objects.order_by("pk").values_list(
+                "advertiser_id", "status", "shipping_address__state"
+            )
+        )
+
+        self.assertEqual(first, second)
@@ -0,0 +1,174 @@
+import io
+import json
+import logging.handlers
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core import management
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from commerce import services, slowlog
+
+from . import test_util
+
+
+@override_settings(
+    SLOW_QUERY_LOG_ENABLED=True,
+    SLOW_QUERY_THRESHOLD_MS=0,
+    SLOW_QUERY_EXPLAIN_SAMPLE_RATE=1,
+)
+class TestSlowLog(TestCase):
+    def setUp(self):
+        connection.ensure_connection()
+        slowlog.install(None, connection)
+        self.addCleanup(
+            connection.execute_wrappers.remove, slowlog.execute_wrapper
+        )
+
+        self.advertiser = test_util.create_fake_advertiser()
+        self.order = test_util.create_fake_order(
+            advertiser_id=self.advertiser.pk
+        )
+
+    def _entries(self, logs):
+        return [json.loads(record.getMessage()) for record in logs.records]
+
+    def test_is_installed_once_and_first(self):
+        connection.ensure_connection()
+        slowlog.install(None, connection)
+
+        self.assertIs(connection.execute_wrappers[0], slowlog.execute_wrapper)
+        self.assertEqual(
+            connection.execute_wrappers.count(slowlog.execute_wrapper), 1
+        )
+
+    def test_logs_query_with_caller_and_plan(self):
+        with self.assertLogs("commerce.slowlog", "INFO") as logs:
+            services.get_order(self.order.pk, self.advertiser)
+
+        entry = self._entries(logs)[-1]
+        self.assertIn('FROM "commerce_order"', entry["sql"])
+        self.assertEqual(entry["params"], {"count": 2, "types": ["int"] * 2})
+        self.assertEqual(entry["caller"], "services.get_order")
+        self.assertGreaterEqual(entry["duration_ms"], 0)
+        self.assertTrue(entry["plan"])
+        self.assertTrue(
+            any("commerce_order" in line for line in entry["plan"])
+        )
+
+    def test_never_logs_parameter_values(self):
+        with self.assertLogs("commerce.slowlog", "INFO") as logs:
+            services.bulk_create_orders(
+                [test_util.fake_order_data()] * 30, self.advertiser
+            )
+
+        entries = self._entries(logs)
+        self.assertNotIn("Fake Address", json.dumps(entries))
+        insert = next(
+            entry["params"]
+            for entry in entries
+            if entry["sql"].startswith('INSERT INTO "commerce_address"')
+        )
+        self.assertGreater(insert["count"], slowlog.PARAMS_LIMIT)
+        self.assertEqual(len(insert["types"]), slowlog.PARAMS_LIMIT)
+
+    def test_describes_executemany_rows(self):
+        self.assertEqual(
+            slowlog.describe([(1, "a"), (2, "b")], many=True),
+            {"rows": 2, "count": 2, "types": ["int", "str"]},
+        )
+
+    def test_explain_is_not_logged(self):
+        with self.assertLogs("commerce.slowlog", "INFO") as logs:
+            services.get_order(self.order.pk, self.advertiser)
+
+        self.assertFalse(
+            any("EXPLAIN" in entry["sql"] for entry in self._entries(logs))
+        )
+
+    @override_settings(SLOW_QUERY_EXPLAIN_SAMPLE_RATE=0)
+    def test_samples_plans(self):
+        with self.assertLogs("commerce.slowlog", "INFO") as logs:
+            services.get_order(self.order.pk, self.advertiser)
+
+        self.assertIsNone(self._entries(logs)[-1]["plan"])
+
+    def test_log_file_is_rotated_outside_the_workers(self):
+        handlers = logging.getLogger("commerce.slowlog").handlers
+
+        self.assertEqual(
+            [type(handler) for handler in handlers],
+            [logging.handlers.WatchedFileHandler],
+        )
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=60000)
+    def test_skips_fast_queries(self):
+        with mock.patch.object(slowlog.logger, "info") as info:
+            services.get_order(self.order.pk, self.advertiser)
+
+        info.assert_not_called()
+
+
+class TestSlowQueriesCommand(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "slow.log")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _write(self, path, entries):
+        with open(path, "w") as file:
+            for entry in entries:
+                file.write(json.dumps(entry) + "\n")
+
+    def _entry(self, sql, duration_ms, caller=None):
+        return {"sql": sql, "duration_ms": duration_ms, "caller": caller}
+
+    def _report(self, *args):
+        stdout = io.StringIO()
+        management.call_command(
+            "slow_queries", "--file", self.path, *args, stdout=stdout
+        )
+        return stdout.getvalue()
+
+    def test_ranks_by_total_time(self):
+        self._write(
+            self.path,
+            [
+                self._entry("SELECT a", 300, "services.get_order"),
+                self._entry("SELECT b WHERE id IN (%s, %s)", 150),
+                self._entry("SELECT b WHERE id IN (%s, %s, %s)", 250),
+            ],
+        )
+        # Rotated files are read too.
+        self._write(f"{self.path}.1", [self._entry("SELECT c", 120)])
+
+        output = self._report()
+
+        lines = output.splitlines()
+        self.assertIn("SELECT b WHERE id IN (%s, ...)", lines[2])
+        self.assertRegex(lines[1], r"400\.0\s+2\s+200\.0\s+250\.0")
+        self.assertIn("SELECT a", lines[4])
+        self.assertIn("from services.get_order", lines[5])
+        self.assertIn("SELECT c", lines[7])
+        self.assertIn("3 distinct slow queries.", output)
+
+    def test_limits_rows(self):
+        self._write(
+            self.path,
+            [self._entry("SELECT a", 300), self._entry("SELECT b", 100)],
+        )
+
+        output = self._report("--limit", "1")
+
+        self.assertIn("SELECT a", output)
+        self.assertNotIn("SELECT b", output)
+
+    def test_reports_empty_log(self):
+        output = self._report()
+
+        self.assertIn("No slow queries logged.", output)
@@ -0,0 +1,143 @@
+import json
+import re
+
+from django.test import override_settings
+from rest_framework import serializers as drf_serializers
+from rest_framework.test import APITestCase
+
+from commerce import serializers, timing
+
+from . import test_util
+
+
+@override_settings(SERVER_TIMING_ENABLED=True)
+class TestServerTiming(APITestCase):
+    def setUp(self):
+        self.advertiser = test_util.create_fake_advertiser()
+        self.client.login(
+            username=self.advertiser.user.username,
+            password=self.advertiser.user.test_password,
+        )
+        self.order = test_util.create_fake_order(
+            advertiser_id=self.advertiser.pk
+        )
+
+    def _metrics(self, response):
+        return {
+            metric.split(";")[0]: metric
+            for metric in response["Server-Timing"].split(", ")
+        }
+
+    def test_reports_every_phase(self):
+        response = self.client.get(f"/order/{self.order.pk}")
+
+        metrics = self._metrics(response)
+        self.assertEqual(
+            set(metrics), {"auth", "db", "serialize", "render", "total"}
+        )
+        for metric in metrics.values():
+            self.assertRegex(metric, r";dur=\d+\.\d{2}")
+
+    def test_counts_queries(self):
+        with self.assertNumQueries(5):
+            response = self.client.get(f"/order/{self.order.pk}")
+
+        queries = re.search(
+            r'desc="(\d+) queries"', self._metrics(response)["db"]
+        )
+        self.assertEqual(int(queries.group(1)), 5)
+
+    def test_times_list_serializers(self):
+        response = self.client.get("/order/")
+
+        self.assertIn("serialize", self._metrics(response))
+
+    @override_settings(SERVER_TIMING_ENABLED=False)
+    def test_can_be_disabled(self):
+        response = self.client.get(f"/order/{self.order.pk}")
+
+        self.assertFalse(response.has_header("Server-Timing"))
+
+    @override_settings(SERVER_TIMING_LOG_SAMPLE_RATE=1)
+    def test_logs_sampled_requests(self):
+        with self.assertLogs("commerce.timing", "INFO") as logs:
+            self.client.get(f"/order/{self.order.pk}")
+
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual(entry["path"], f"/order/{self.order.pk}")
+        self.assertEqual(entry["status"], 200)
+        self.assertEqual(entry["queries"], 5)
+        self.assertIn("total_ms", entry)
+
+    @override_settings(
+        SERVER_TIMING_ENABLED=False, SERVER_TIMING_LOG_SAMPLE_RATE=1
+    )
+    def test_does_not_log_when_disabled(self):
+        with self.assertRaises(AssertionError):
+            with self.assertLogs("commerce.timing", "INFO"):
+                self.client.get(f"/order/{self.order.pk}")
+
+    def test_does_not_log_by_default(self):
+        with self.assertRaises(AssertionError):
+            with self.assertLogs("commerce.timing", "INFO"):
+                self.client.get(f"/order/{self.order.pk}")
+
+
+class TestTimedSerializers(APITestCase):
+    def test_is_off_by_default(self):
+        advertiser = test_util.create_fake_advertiser()
+        self.client.login(
+            username=advertiser.user.username,
+            password=advertiser.user.test_password,
+        )
+
+        response = self.client.get("/order/")
+
+        self.assertFalse(response.has_header("Server-Timing"))
+
+    def test_many_passes_arguments_to_the_child(self):
+        serializer = serializers.ItemSerializer(
+            data=[{"name": "engine"}],
+            many=True,
+            partial=True,
+            context={"key": "value"},
+        )
+
+        self.assertIsInstance(serializer, timing.TimedListSerializer)
+        self.assertTrue(serializer.child.partial)
+        self.assertEqual(serializer.child.context, {"key": "value"})
+        self.assertTrue(serializer.is_valid())
+
+    def test_many_honours_list_serializer_class(self):
+        class ListSerializer(drf_serializers.ListSerializer):
+            pass
+
+        class ItemSerializer(serializers.ItemSerializer):
+            class Meta(serializers.ItemSerializer.Meta):
+                list_serializer_class = ListSerializer
+
+        serializer = ItemSerializer([], many=True)
+
+        self.assertIs(type(serializer), ListSerializer)
+
+
+class TestMeasure(APITestCase):
+    def test_does_nothing_outside_requests(self):
+        self.assertIsNone(timing.current())
+        with timing.measure("serialize"):
+            pass
+
+    def test_does_not_count_nested_measures_twice(self):
+        timings = timing.start()
+        try:
+            serializers.OrderFilterSerializer(
+                data={"status": "open"}
+            ).is_valid()
+            with timing.measure("serialize"):
+                with timing.measure("serialize"):
+                    pass
+        finally:
+            timing.stop(timings)
+
+        self.assertEqual(list(timings.durations), ["serialize"])
+        self.assertLess(timings.durations["serialize"], timings.total)
@@ -0,0 +1,177 @@
+""" Timing
+
+This module is responsible to break the time of a request down into
+authentication, database, serialization and rendering. The middleware
+starts a Timings for each request, and the hooks spread over the views,
+serializers and database connections add to it; without one they cost a
+context variable lookup.
+"""
+
+import contextlib
+import contextvars
+import time
+import typing
+
+from rest_framework import serializers
+
+
+_current = contextvars.ContextVar("commerce_timings", default=None)
+
+
+class Timings:
+    """ Timings
+
+    Durations of one request, by name, plus the number of queries.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total = None
+        self.durations = {}
+        self.queries = 0
+        self.token = None
+        self._active = set()
+
+    def add(self, name: str, seconds: float):
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+
+    @contextlib.contextmanager
+    def measure(self, name: str):
+        # Nested measures of the same name are already being counted.
+        if name in self._active:
+            yield
+            return
+
+        self._active.add(name)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+            self._active.discard(name)
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        """ Execute Wrapper.
+
+        Installed with connection.execute_wrapper, counts every query.
+        """
+
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.add("db", time.perf_counter() - started)
+            self.queries += 1
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+
+    def as_dict(self) -> typing.Dict[str, typing.Any]:
+        """ As Dict.
+
+        Returns:
+            The durations in milliseconds and the query count.
+        """
+
+        data = {
+            f"{name}_ms": round(seconds * 1000, 3)
+            for name, seconds in self.durations.items()
+        }
+        data["queries"] = self.queries
+        if self.total is not None:
+            data["total_ms"] = round(self.total * 1000, 3)
+        return data
+
+    def header(self) -> str:
+        """ Header.
+
+        Returns:
+            The value of a Server-Timing header, durations in milliseconds.
+        """
+
+        metrics = []
+        for name, seconds in self.durations.items():
+            metric = f"{name};dur={seconds * 1000:.2f}"
+            if name == "db":
+                metric += f';desc="{self.queries} queries"'
+            metrics.append(metric)
+        if self.total is not None:
+            metrics.append(f"total;dur={self.total * 1000:.2f}")
+        return ", ".join(metrics)
+
+
+def start() -> Timings:
+    """ Start.
+
+    Returns:
+        A new Timings, current until stop is called.
+    """
+
+    timings = Timings()
+    timings.token = _current.set(timings)
+    return timings
+
+
+def stop(timings: Timings):
+    timings.finish()
+    _current.reset(timings.token)
+
+
+def current() -> Timings:
+    return _current.get()
+
+
+def measure(name: str):
+    """ Measure.
+
+    Args:
+        name: Metric name, e.g. "serialize".
+
+    Returns:
+        A context manager adding its duration to the current Timings, or
+        doing nothing outside a timed request.
+    """
+
+    timings = _current.get()
+    if timings is None:
+        return contextlib.nullcontext()
+    return timings.measure(name)
+
+
+class TimedListSerializer(serializers.ListSerializer):
+    def is_valid(self, raise_exception=False):
+        with measure("serialize"):
+            return super().is_valid(raise_exception=raise_exception)
+
+    @property
+    def data(self):
+        with measure("serialize"):
+            return super().data
+
+
+class TimedSerializerMixin:
+    """ Timed Serializer Mixin
+
+    Adds validation and serialization to the "serialize" metric, also
+    when the serializer is created with many=True.
+    """
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        # ListSerializer.many_init hands every argument (partial, context,
+        # ...) to the child and honours Meta.list_serializer_class. Only a
+        # plain ListSerializer is swapped for TimedListSerializer, which
+        # adds no state of its own.
+        list_serializer = super().many_init(*args, **kwargs)
+        if type(list_serializer) is serializers.ListSerializer:
+            list_serializer.__class__ = TimedListSerializer
+        return list_serializer
+
+    def is_valid(self, raise_exception=False):
+        with measure("serialize"):
+            return super().is_valid(raise_exception=raise_exception)
+
+    @property
+    def data(self):
+        with measure("serialize"):
+            return super().data
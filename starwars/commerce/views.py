@@ -3,44 +3,107 @@
 This module is responsible to handle all interactions to the API.
 """
 
+import json
+import time
+
+from django import http
+from django.conf import settings
 from django.utils.decorators import method_decorator
 from django.contrib.auth import decorators
 
-from rest_framework import authentication
 from rest_framework import views
 from rest_framework import response
 from rest_framework import status
 from rest_framework import permissions
-
-from . import serializers, services
+from rest_framework.utils import encoders
+
+from . import (
+    authentication,
+    caching,
+    conditional,
+    metrics,
+    pagination,
+    profiling,
+    serializers,
+    services,
+    streaming,
+    timing,
+)
 
 
-class CsrfExemptSessionAuthentication(authentication.SessionAuthentication):
-    """ CSRF Exempt Session Authentication
+class RestBaseView(views.APIView):
+    """ Rest Base View
 
-    Note:
-        The purpose of it is disable the CSRF token.
+    It is responsible to authentication.
     """
 
-    def enforce_csrf(self, request):
-        """ Enforce CSRF.
+    authentication_classes = [
+        authentication.TokenAuthentication,
+        authentication.BasicAuthentication,
+        authentication.CsrfExemptSessionAuthentication,
+    ]
+
+    def initial(self, request, *args, **kwargs):
+        """ Initial.
+
+        Sets `request.advertiser`, filled by the authentication classes
+        once the user is authenticated.
 
         Args:
             request: Request.
         """
-        pass
 
+        request.advertiser = None
+        super().initial(request, *args, **kwargs)
+        request.profile = profiling.start(request, type(self).__name__)
 
-class RestBaseView(views.APIView):
-    """ Rest Base View
+    def perform_authentication(self, request):
+        with timing.measure("auth"):
+            super().perform_authentication(request)
 
-    It is responsible to authentication.
-    """
+    def finalize_response(self, request, response, *args, **kwargs):
+        """ Finalize Response.
 
-    authentication_classes = [
-        authentication.BasicAuthentication,
-        CsrfExemptSessionAuthentication,
-    ]
+        Times the rendering, which happens once the view has returned, and
+        stops the profile, if any, once rendered. A response that is never
+        rendered has its profile stopped by profiling.finish.
+
+        Args:
+            request: Request.
+            response: Response returned by the handler.
+
+        Returns:
+            The response.
+        """
+
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+
+        timings = timing.current()
+        if timings is not None and hasattr(
+            response, "add_post_render_callback"
+        ):
+            started = time.perf_counter()
+            response.add_post_render_callback(
+                lambda rendered: timings.add(
+                    "render", time.perf_counter() - started
+                )
+            )
+
+        profile = getattr(request, "profile", None)
+        if profile is not None:
+            profile.status_code = response.status_code
+            response["X-Profile-Id"] = profile.name
+            if hasattr(response, "add_post_render_callback"):
+                response.add_post_render_callback(
+                    lambda rendered: profiling.stop(
+                        profile, request, rendered.status_code
+                    )
+                )
+            else:
+                profiling.stop(profile, request, response.status_code)
+        return response
 
 
 class UserAuthView(RestBaseView):
@@ -62,18 +125,16 @@ class UserAuthView(RestBaseView):
             is not valid.
         """
 
-        serializer = serializers.UserLoginSerializer(data=request.data)
+        serializer = serializers.UserLoginSerializer(
+            data=request.data, context={"request": request}
+        )
 
         if not serializer.is_valid():
             return response.Response(
                 serializer.errors, status=status.HTTP_400_BAD_REQUEST
             )
 
-        user = services.user_login(
-            request,
-            username=serializer.data["username"],
-            password=serializer.data["password"],
-        )
+        user = services.user_login(request, serializer.validated_data["user"])
         user_detail = serializers.UserDetailSerializer(user)
 
         return response.Response(user_detail.data, status=status.HTTP_200_OK)
@@ -92,6 +153,69 @@ class UserAuthView(RestBaseView):
         return response.Response({}, status=status.HTTP_204_NO_CONTENT)
 
 
+class AccessTokenView(RestBaseView):
+    """ Access Token View
+
+    It is responsible to issue and revoke bearer tokens.
+    """
+
+    def post(self, request):
+        """ Issue Token
+
+        Args:
+            request: Request with username and password.
+
+        Returns:
+            - The token and serializers.UserDetailSerializer +
+            HTTP_201_CREATED if request.data is valid.
+            - serializer.errors + HTTP_400_BAD_REQUEST if request.data
+            is not valid.
+        """
+
+        serializer = serializers.UserLoginSerializer(
+            data=request.data, context={"request": request}
+        )
+        if not serializer.is_valid():
+            return response.Response(
+                serializer.errors, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        user = serializer.validated_data["user"]
+        token = services.create_access_token(user)
+        user_detail = serializers.UserDetailSerializer(user)
+
+        return response.Response(
+            {"token": token, "user": user_detail.data},
+            status=status.HTTP_201_CREATED,
+        )
+
+    def delete(self, request):
+        """ Revoke Token
+
+        Args:
+            request: Request authenticated by the token to revoke.
+
+        Returns:
+            - HTTP_204_NO_CONTENT
+            - HTTP_400_BAD_REQUEST if the request has no bearer token.
+        """
+
+        if not request.user.is_authenticated:
+            self.permission_denied(request)
+
+        if not isinstance(
+            request.successful_authenticator,
+            authentication.TokenAuthentication,
+        ):
+            return response.Response(
+                {"detail": "Bearer token required."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        authentication.TokenAuthentication.revoke(request.auth)
+        return response.Response({}, status=status.HTTP_204_NO_CONTENT)
+
+
 class OrderAPIView(RestBaseView):
     """ Order API View
 
@@ -99,6 +223,9 @@ class OrderAPIView(RestBaseView):
     """
 
     permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = views.APIView.renderer_classes + [
+        streaming.NDJSONRenderer
+    ]
 
     def _detail(self, request, order_id: int):
         """ Get Order
@@ -112,13 +239,51 @@ class OrderAPIView(RestBaseView):
             is valid.
             - HTTP_404_BAD_REQUEST if request.data or user/advertiser
             is not valid.
+            - HTTP_304_NOT_MODIFIED if the client copy is still fresh.
         """
-        order = services.get_order(order_id, request.user.pk)
-        if not order:
+
+        key, entry = caching.lookup(
+            request.advertiser,
+            "detail",
+            order_id,
+            request.accepted_media_type,
+        )
+        if entry == caching.NOT_FOUND:
             return response.Response({}, status=status.HTTP_404_NOT_FOUND)
 
-        serializer = serializers.OrderSerializer(order)
-        return response.Response(serializer.data, status=status.HTTP_200_OK)
+        if entry is None:
+            version = services.get_order_version(order_id, request.advertiser)
+            if not version:
+                caching.store_not_found(key)
+                return response.Response({}, status=status.HTTP_404_NOT_FOUND)
+
+            entry = {
+                "version": [
+                    version["id"],
+                    version["last_change"].isoformat(),
+                    request.accepted_media_type,
+                ],
+                "last_modified": version["last_change"],
+            }
+
+        validators = conditional.Validators(
+            *entry["version"], last_modified=entry["last_modified"]
+        )
+        not_modified = validators.not_modified(request)
+        if not_modified:
+            return not_modified
+
+        if "data" not in entry:
+            order = services.get_order(order_id, request.advertiser)
+            if not order:
+                return response.Response({}, status=status.HTTP_404_NOT_FOUND)
+
+            entry["data"] = serializers.OrderSerializer(order).data
+            caching.store(key, entry)
+
+        return validators.apply(
+            response.Response(entry["data"], status=status.HTTP_200_OK)
+        )
 
     def _list(self, request):
         """ List Orders
@@ -127,18 +292,91 @@ class OrderAPIView(RestBaseView):
             request: Request.
 
         Returns:
-            - typing.List[serializers.OrderSerializer] + HTTP_200_OK if
-            user/advertiser has orders.
-            - Empity List [] if user/advertiser  has no orders.
+            - A page of serializers.OrderSerializer with next/previous
+            cursors + HTTP_200_OK, serializers.OrderListingSerializer
+            with settings.ORDER_LISTING_ENABLED.
+            - Empity results [] if user/advertiser has no orders.
+            - Every order streamed as NDJSON if the client asked for
+            `application/x-ndjson`.
+            - HTTP_304_NOT_MODIFIED if the client copy is still fresh,
+            by ETag only.
         """
 
-        orders = services.list_orders(request.user.pk)
-        serialized_orders = []
-        for order in orders:
-            serializer = serializers.OrderSerializer(order)
-            serialized_orders.append(serializer.data)
+        query = serializers.OrderListQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return response.Response(
+                query.errors, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        ordering = query.validated_data.pop("ordering")
+        if settings.ORDER_LISTING_ENABLED:
+            orders = services.list_order_listings(
+                request.advertiser, filters=query.validated_data
+            )
+            serializer_class = serializers.OrderListingSerializer
+        else:
+            orders = services.list_orders(
+                request.advertiser, filters=query.validated_data
+            )
+            serializer_class = serializers.OrderSerializer
+
+        paginator = pagination.OrderCursorPagination(ordering)
+        if streaming.is_requested(request):
+            # A full export reads every order anyway, so one aggregate more
+            # is cheap. Deletions do not move last_change, so it only goes
+            # into the ETag, not into Last-Modified.
+            version = services.get_orders_version(orders)
+            validators = conditional.Validators(
+                request.user.pk,
+                version["count"],
+                version["last_change"] and version["last_change"].isoformat(),
+                request.get_full_path(),
+                request.accepted_media_type,
+            )
+            not_modified = validators.not_modified(request)
+            if not_modified:
+                return not_modified
+
+            return validators.apply(
+                streaming.stream_queryset(
+                    paginator.order_queryset(orders),
+                    serializer_class,
+                    chunk_size=settings.ORDER_STREAM_CHUNK_SIZE,
+                )
+            )
 
-        return response.Response(serialized_orders, status=status.HTTP_200_OK)
+        # Pages link to the next ones with absolute URLs.
+        key, entry = caching.lookup(
+            request.advertiser,
+            "list",
+            serializer_class.__name__,
+            request.build_absolute_uri(),
+            request.accepted_media_type,
+        )
+        if entry is None:
+            # Pages are cheap with keyset pagination, so the ETag hashes
+            # the page itself instead of aggregating every matching order.
+            page = paginator.paginate_queryset(orders, request, view=self)
+            serializer = serializer_class(page, many=True)
+            data = paginator.get_paginated_response(serializer.data).data
+            entry = {
+                "version": [
+                    request.user.pk,
+                    request.accepted_media_type,
+                    json.dumps(data, cls=encoders.JSONEncoder),
+                ],
+                "data": data,
+            }
+            caching.store(key, entry)
+
+        validators = conditional.Validators(*entry["version"])
+        not_modified = validators.not_modified(request)
+        if not_modified:
+            return not_modified
+
+        return validators.apply(
+            response.Response(entry["data"], status=status.HTTP_200_OK)
+        )
 
     def get(self, request, order_id: int = None):
         """ Handle Get Request
@@ -172,7 +410,8 @@ class OrderAPIView(RestBaseView):
             )
 
         order = services.create_order(
-            validated_data=serializer.validated_data, user_id=request.user.pk
+            validated_data=serializer.validated_data,
+            advertiser=request.advertiser,
         )
         serializer = serializers.OrderSerializer(order)
         return response.Response(
@@ -194,7 +433,7 @@ class OrderAPIView(RestBaseView):
             is not valid.
         """
 
-        order = services.get_order(order_id, request.user.pk)
+        order = services.get_order(order_id, request.advertiser)
         if not order:
             return response.Response({}, status=status.HTTP_404_NOT_FOUND)
 
@@ -207,9 +446,7 @@ class OrderAPIView(RestBaseView):
             )
 
         updated_order = services.update_order(
-            order_id=order.pk,
-            validated_data=serializer.validated_data,
-            user_id=request.user.pk,
+            order=order, validated_data=serializer.validated_data
         )
         serializer = serializers.OrderSerializer(updated_order)
 
@@ -228,7 +465,7 @@ class OrderAPIView(RestBaseView):
             - HTTP_404_NOT_FOUND if has no order.
         """
 
-        deleted_order = services.delete_order(order_id, request.user.pk)
+        deleted_order = services.delete_order(order_id, request.advertiser)
         if not deleted_order:
             return response.Response({}, status=status.HTTP_404_NOT_FOUND)
 
@@ -250,7 +487,7 @@ class OrderAPIView(RestBaseView):
             is not valid.
         """
 
-        order = services.get_order(order_id, request.user.pk)
+        order = services.get_order(order_id, request.advertiser)
         if not order:
             return response.Response({}, status=status.HTTP_404_NOT_FOUND)
 
@@ -263,15 +500,203 @@ class OrderAPIView(RestBaseView):
             )
 
         updated_order = services.update_order(
-            order_id=order.pk,
-            validated_data=serializer.validated_data,
-            user_id=request.user.pk,
+            order=order, validated_data=serializer.validated_data
         )
         serializer = serializers.OrderSerializer(updated_order)
 
         return response.Response(serializer.data, status=status.HTTP_200_OK)
 
 
+class OrderBulkAPIView(RestBaseView):
+    """ Order Bulk API View
+
+    It is responsible to handle orders in batches.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        """ Bulk Create Orders
+
+        Args:
+            request: Request with a list of orders.
+
+        Returns:
+            - typing.List[serializers.OrderSerializer] + HTTP_201_CREATED if
+            every order is valid.
+            - A list with serializer.errors per order +
+            HTTP_400_BAD_REQUEST if any order is not valid. Nothing is
+            saved in that case.
+        """
+
+        if (
+            isinstance(request.data, list)
+            and len(request.data) > settings.ORDER_BULK_MAX_SIZE
+        ):
+            return response.Response(
+                {
+                    "non_field_errors": [
+                        "Ensure this list has at most "
+                        f"{settings.ORDER_BULK_MAX_SIZE} orders."
+                    ]
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        serializer = serializers.OrderCreateSerializer(
+            data=request.data, many=True
+        )
+        if not serializer.is_valid():
+            return response.Response(
+                serializer.errors, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        orders = services.bulk_create_orders(
+            validated_data_list=serializer.validated_data,
+            advertiser=request.advertiser,
+        )
+        serializer = serializers.OrderSerializer(orders, many=True)
+        return response.Response(
+            serializer.data, status=status.HTTP_201_CREATED
+        )
+
+
+class OrderBulkFinishAPIView(RestBaseView):
+    """ Order Bulk Finish API View
+
+    It is responsible to finish orders in batches.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        """ Bulk Finish Orders
+
+        Args:
+            request: Request with order `ids` and/or a `filter`.
+
+        Returns:
+            - {"updated": <number of orders finished>} + HTTP_200_OK if
+            request.data is valid.
+            - serializer.errors + HTTP_400_BAD_REQUEST if request.data
+            is not valid.
+        """
+
+        serializer = serializers.OrderBulkFinishSerializer(data=request.data)
+        if not serializer.is_valid():
+            return response.Response(
+                serializer.errors, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        updated = services.finish_orders(
+            advertiser=request.advertiser,
+            ids=serializer.validated_data.get("ids"),
+            filters=serializer.validated_data.get("filter"),
+        )
+        return response.Response(
+            {"updated": updated}, status=status.HTTP_200_OK
+        )
+
+
+class OrderStatsAPIView(RestBaseView):
+    """ Order Stats API View
+
+    It is responsible to count orders by status, state and day.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        """ Get Order Stats
+
+        Args:
+            request: Request with `group_by`, a comma separated list out of
+            status, state and day, and optional `status`, `state`,
+            `day_after` and `day_before` filters.
+
+        Returns:
+            - {"results": [{<group_by values>, "count"}], "total"} +
+            HTTP_200_OK if the query is valid.
+            - serializer.errors + HTTP_400_BAD_REQUEST if the query is not
+            valid.
+        """
+
+        query = serializers.OrderStatsQuerySerializer(
+            data=request.query_params
+        )
+        if not query.is_valid():
+            return response.Response(
+                query.errors, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        group_by = query.validated_data.pop("group_by")
+        stats = services.get_order_stats(
+            request.advertiser, group_by, filters=query.validated_data
+        )
+        return response.Response(
+            {
+                "results": stats,
+                "total": sum(group["count"] for group in stats),
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class OrderCacheStatsAPIView(RestBaseView):
+    """ Order Cache Stats API View
+
+    It is responsible to expose the order cache counters.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        """ Get Order Cache Stats
+
+        Args:
+            request: Request.
+
+        Returns:
+            - Hits and misses counted by this worker process + HTTP_200_OK.
+        """
+
+        data = {"enabled": settings.ORDER_CACHE_ENABLED, **caching.stats()}
+        return response.Response(data, status=status.HTTP_200_OK)
+
+
+class MetricsAPIView(RestBaseView):
+    """ Metrics API View
+
+    It is responsible to expose the request metrics of every worker, to
+    staff or to the holder of settings.METRICS_SCRAPE_TOKEN.
+    """
+
+    authentication_classes = [
+        authentication.MetricsScrapeAuthentication,
+        *RestBaseView.authentication_classes,
+    ]
+    permission_classes = [
+        permissions.IsAdminUser | authentication.IsMetricsScraper
+    ]
+
+    def get(self, request):
+        """ Get Metrics
+
+        Args:
+            request: Request.
+
+        Returns:
+            - The metrics in the Prometheus text format + HTTP_200_OK.
+        """
+
+        metrics.get_registry().flush(force=True)
+        metrics.compact(settings.METRICS_DIR)
+        return http.HttpResponse(
+            metrics.collect(settings.METRICS_DIR),
+            content_type=metrics.CONTENT_TYPE,
+        )
+
+
 class AdvertiserAPIView(RestBaseView):
     """ Advertiser API View
 
@@ -288,8 +713,7 @@ class AdvertiserAPIView(RestBaseView):
         Returns:
             - serializers.AdvertiserGetSerializer + HTTP_200_OK
         """
-        advertiser = services.get_advertiser_by_user_id(request.user.pk)
-        serializer = serializers.AdvertiserGetSerializer(advertiser)
+        serializer = serializers.AdvertiserGetSerializer(request.advertiser)
         return response.Response(serializer.data, status=status.HTTP_200_OK)
 
     def post(self, request):
@@ -313,11 +737,7 @@ class AdvertiserAPIView(RestBaseView):
 
         advertiser = serializer.save()
 
-        services.user_login(
-            request,
-            username=request.data["user"]["username"],
-            password=request.data["user"]["password"],
-        )
+        services.user_login(request, advertiser.user)
 
         serializer = serializers.AdvertiserGetSerializer(advertiser)
         return response.Response(
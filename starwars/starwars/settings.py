@@ -11,7 +11,9 @@ https://docs.djangoproject.com/en/3.0/ref/settings/
 """
 
 import os
+import tempfile
 
+from django.core.exceptions import ImproperlyConfigured
 from environs import Env
 from dotenv import load_dotenv
 from dotenv import find_dotenv
@@ -49,10 +51,13 @@ INSTALLED_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
     "rest_framework",
-    "commerce",
+    "commerce.apps.CommerceConfig",
 ]
 
 MIDDLEWARE = [
+    "commerce.middleware.ServerTimingMiddleware",
+    "commerce.middleware.MetricsMiddleware",
+    "commerce.middleware.MemoryTraceMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -88,11 +93,60 @@ WSGI_APPLICATION = "starwars.wsgi.application"
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.sqlite3",
+        # django.db.backends.sqlite3 with IMMEDIATE transactions, see
+        # commerce/backends/sqlite3/base.py.
+        "ENGINE": "commerce.backends.sqlite3",
         "NAME": os.path.join(BASE_DIR, "db.sqlite3"),
+        # Seconds a connection is kept open and reused, 0 closes it after
+        # every request.
+        "CONN_MAX_AGE": env.int("DB_CONN_MAX_AGE", 60),
+        "OPTIONS": {
+            # Seconds to wait on a locked database before failing.
+            "timeout": env.int("SQLITE_TIMEOUT", 20),
+        },
     }
 }
 
+# Pragmas run on every new SQLite connection, see commerce/db.py.
+SQLITE_JOURNAL_MODE = env("SQLITE_JOURNAL_MODE", "wal")
+SQLITE_SYNCHRONOUS = env("SQLITE_SYNCHRONOUS", "normal")
+SQLITE_MMAP_SIZE = env.int("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)
+# Negative values are KiB, positive ones pages.
+SQLITE_CACHE_SIZE = env.int("SQLITE_CACHE_SIZE", -64 * 1024)
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.0/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": env(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": env("CACHE_LOCATION", ""),
+    }
+}
+
+
+# Sessions
+# https://docs.djangoproject.com/en/3.0/topics/http/sessions/
+
+SESSION_ENGINES = {
+    "db": "django.contrib.sessions.backends.db",
+    "cached_db": "django.contrib.sessions.backends.cached_db",
+    "signed_cookies": "django.contrib.sessions.backends.signed_cookies",
+}
+
+SESSION_BACKEND = env("SESSION_BACKEND", "db")
+if SESSION_BACKEND not in SESSION_ENGINES:
+    raise ImproperlyConfigured(
+        f"SESSION_BACKEND must be one of: {', '.join(SESSION_ENGINES)}"
+    )
+
+SESSION_ENGINE = SESSION_ENGINES[SESSION_BACKEND]
+SESSION_CACHE_ALIAS = env("SESSION_CACHE_ALIAS", "default")
+SESSION_PRUNE_BATCH_SIZE = env.int("SESSION_PRUNE_BATCH_SIZE", 1000)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
@@ -134,3 +188,145 @@ STATIC_URL = "/static/"
 
 
 ACCOUNT_DEFAULT_HTTP_PROTOCOL = env("ACCOUNT_DEFAULT_HTTP_PROTOCOL", "http")
+
+
+# Slow queries, see commerce/slowlog.py. Off by default; the log keeps
+# the SQL, and only the count and types of its parameters. Their plan
+# is captured for a sample of them, as EXPLAIN runs the query planner
+# again. Every worker appends to the log file, so it is rotated outside
+# of the processes (e.g. logrotate), and each one reopens it once it
+# was moved.
+
+SLOW_QUERY_LOG_ENABLED = env.bool("SLOW_QUERY_LOG_ENABLED", False)
+SLOW_QUERY_THRESHOLD_MS = env.float("SLOW_QUERY_THRESHOLD_MS", 100)
+SLOW_QUERY_EXPLAIN_SAMPLE_RATE = env.float(
+    "SLOW_QUERY_EXPLAIN_SAMPLE_RATE", 0.1
+)
+SLOW_QUERY_LOG_FILE = env(
+    "SLOW_QUERY_LOG_FILE",
+    os.path.join(tempfile.gettempdir(), "starwars-slow-queries.log"),
+)
+
+
+# Logging
+# https://docs.djangoproject.com/en/3.0/topics/logging/
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {"message": {"format": "%(message)s"}},
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+        "slow_queries": {
+            "class": "logging.handlers.WatchedFileHandler",
+            "filename": SLOW_QUERY_LOG_FILE,
+            "formatter": "message",
+            "delay": True,
+        },
+    },
+    "loggers": {
+        "commerce": {
+            "handlers": ["console"],
+            "level": env("COMMERCE_LOG_LEVEL", "INFO"),
+        },
+        "commerce.slowlog": {
+            "handlers": ["slow_queries"],
+            "level": "INFO",
+            "propagate": False,
+        },
+    },
+}
+
+
+# Request timing, see commerce/middleware.py.
+
+SERVER_TIMING_ENABLED = env.bool("SERVER_TIMING_ENABLED", False)
+SERVER_TIMING_LOG_SAMPLE_RATE = env.float("SERVER_TIMING_LOG_SAMPLE_RATE", 0.0)
+
+
+# Metrics, see commerce/metrics.py. Every worker writes its file to
+# METRICS_DIR, which must be shared by the workers. The files of dead
+# workers are merged into one on each scrape.
+
+METRICS_ENABLED = env.bool("METRICS_ENABLED", True)
+METRICS_DIR = env(
+    "METRICS_DIR", os.path.join(tempfile.gettempdir(), "starwars-metrics")
+)
+METRICS_FLUSH_INTERVAL = env.float("METRICS_FLUSH_INTERVAL", 1.0)
+# A bearer token that never expires, for the scrape config. Off if empty.
+METRICS_SCRAPE_TOKEN = env("METRICS_SCRAPE_TOKEN", "")
+
+# Test runs write their metrics to a directory of their own, see
+# commerce/tests/runner.py.
+TEST_RUNNER = "commerce.tests.runner.TestRunner"
+
+
+# Profiling, see commerce/profiling.py. Superusers profile a request with
+# the X-Profile: 1 header or ?profile=1, once enabled.
+
+PROFILING_ENABLED = env.bool("PROFILING_ENABLED", False)
+PROFILING_SAMPLE_RATE = env.float("PROFILING_SAMPLE_RATE", 0.0)
+PROFILING_MIN_INTERVAL = env.float("PROFILING_MIN_INTERVAL", 10.0)
+PROFILING_DIR = env(
+    "PROFILING_DIR", os.path.join(tempfile.gettempdir(), "starwars-profiles")
+)
+PROFILING_MAX_FILES = env.int("PROFILING_MAX_FILES", 50)
+PROFILING_TOP = env.int("PROFILING_TOP", 40)
+
+
+# Memory tracing, see commerce/memory.py. tracemalloc slows the process
+# down while tracing, so the middleware traces a sample of the requests,
+# one at a time, and logs them to the "commerce.memory" logger.
+
+MEMORY_TRACE_ENABLED = env.bool("MEMORY_TRACE_ENABLED", False)
+MEMORY_TRACE_SAMPLE_RATE = env.float("MEMORY_TRACE_SAMPLE_RATE", 0.01)
+MEMORY_TRACE_FRAMES = env.int("MEMORY_TRACE_FRAMES", 1)
+MEMORY_TRACE_TOP = env.int("MEMORY_TRACE_TOP", 10)
+
+
+# API authentication
+
+ACCESS_TOKEN_TTL = env.int("ACCESS_TOKEN_TTL", 60 * 60 * 24)
+ACCESS_TOKEN_CACHE_TTL = env.int("ACCESS_TOKEN_CACHE_TTL", 60)
+ACCESS_TOKEN_CACHE_MAXSIZE = env.int("ACCESS_TOKEN_CACHE_MAXSIZE", 10000)
+
+
+# Orders API
+
+ORDER_PAGE_SIZE = env.int("ORDER_PAGE_SIZE", 50)
+ORDER_MAX_PAGE_SIZE = env.int("ORDER_MAX_PAGE_SIZE", 500)
+ORDER_STREAM_CHUNK_SIZE = env.int("ORDER_STREAM_CHUNK_SIZE", 500)
+ORDER_BULK_MAX_SIZE = env.int("ORDER_BULK_MAX_SIZE", 5000)
+
+# Share one commit among concurrent order creations, see
+# commerce/group_commit.py. The window and the timeout are in seconds.
+ORDER_GROUP_COMMIT_ENABLED = env.bool("ORDER_GROUP_COMMIT_ENABLED", False)
+ORDER_GROUP_COMMIT_WINDOW = env.float("ORDER_GROUP_COMMIT_WINDOW", 0.002)
+ORDER_GROUP_COMMIT_MAX_BATCH = env.int("ORDER_GROUP_COMMIT_MAX_BATCH", 64)
+ORDER_GROUP_COMMIT_TIMEOUT = env.float("ORDER_GROUP_COMMIT_TIMEOUT", 30)
+
+# Cache order reads, see commerce/caching.py. Writes bump generations in
+# the cache, which every worker must see, so a cache private to a process
+# (the default LocMemCache) is rejected.
+ORDER_CACHE_ENABLED = env.bool("ORDER_CACHE_ENABLED", False)
+ORDER_CACHE_ALIAS = env("ORDER_CACHE_ALIAS", "default")
+ORDER_CACHE_TIMEOUT = env.int("ORDER_CACHE_TIMEOUT", 300)
+ORDER_CACHE_NOT_FOUND_TIMEOUT = env.int("ORDER_CACHE_NOT_FOUND_TIMEOUT", 5)
+ORDER_CACHE_LOCAL_BACKENDS = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+if ORDER_CACHE_ENABLED and (
+    ORDER_CACHE_ALIAS not in CACHES
+    or CACHES[ORDER_CACHE_ALIAS]["BACKEND"] in ORDER_CACHE_LOCAL_BACKENDS
+):
+    raise ImproperlyConfigured(
+        "ORDER_CACHE_ENABLED needs ORDER_CACHE_ALIAS to be a cache shared "
+        "by every worker, e.g. CACHE_BACKEND="
+        "django.core.cache.backends.memcached.MemcachedCache"
+    )
+
+# List orders from models.OrderListing, see commerce/listings.py. The
+# listings are written with every order either way, so it can be turned
+# on and off at any time.
+ORDER_LISTING_ENABLED = env.bool("ORDER_LISTING_ENABLED", False)
@@ -22,6 +22,12 @@ urlpatterns = [
     path("admin/", admin.site.urls),
     path("order/", views.OrderAPIView.as_view()),
     path("order/<int:order_id>", views.OrderAPIView.as_view()),
+    path("order/bulk/", views.OrderBulkAPIView.as_view()),
+    path("order/bulk/finish/", views.OrderBulkFinishAPIView.as_view()),
+    path("order/stats/", views.OrderStatsAPIView.as_view()),
+    path("order/cache/stats/", views.OrderCacheStatsAPIView.as_view()),
+    path("metrics/", views.MetricsAPIView.as_view()),
     path("advertiser/", views.AdvertiserAPIView.as_view()),
     path("user-auth/", views.UserAuthView.as_view()),
+    path("user-auth/token/", views.AccessTokenView.as_view()),
 ]